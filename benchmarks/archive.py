@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: archive.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+"""Measures the size and the write and read throughput of the archive.
+
+Run as ``python benchmarks/archive.py [DIRECTORY]``. For the PLC and HVAC
+register maps the script archives a full night (``HOURS`` hours) of scans at
+``RATE`` Hz, alternating scans of all the registers and of the fast poll tier,
+to a temporary directory (or ``DIRECTORY``). It prints the size of each record
+and of the file, the time spent in `.ArchiveWriter.write` (the cost in the
+event loop), the time for the writer thread to write all the records to disk,
+and the time to open the file and decode the time series of every register.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import tempfile
+import time
+
+import numpy
+
+from lvmecp import config
+from lvmecp.archive import ArchiveReader, ArchiveWriter
+from lvmecp.modbus import Modbus
+from lvmecp.planner import BIT_MODES
+from lvmecp.snapshot import RegisterSnapshot
+
+
+RATE = 10
+
+HOURS = 12
+
+
+def random_images(modbus: Modbus, names: list[str], rng: numpy.random.Generator):
+    """Returns a plan for some registers and random images for it."""
+
+    plan = modbus.get_plan(names)
+
+    images: dict[str, numpy.ndarray] = {}
+    for mode, size in plan.sizes.items():
+        if mode in BIT_MODES:
+            images[mode] = rng.integers(0, 256, (size + 7) // 8, dtype=numpy.uint8)
+        else:
+            images[mode] = rng.integers(0, 1000, size, dtype=numpy.uint16)
+
+    return plan, images
+
+
+async def main(directory: str):
+    rng = numpy.random.default_rng(0)
+
+    n_scans = RATE * HOURS * 3600
+
+    # Start of the night at LCO, well after the SJD rollover.
+    start = (60000 - 40587) * 86400
+
+    print(f"Scans: {n_scans} ({HOURS} h at {RATE} Hz)")
+    print(
+        f"{'server':>6} {'record (B)':>11} {'file (MB)':>10} {'write (us)':>11} "
+        f"{'disk (s)':>9} {'records/s':>10} {'read (ms)':>10}"
+    )
+
+    for key in ("modbus", "hvac"):
+        modbus = Modbus(config[key])
+
+        fast_age = modbus.poll_tiers["fast"]
+        fast = [name for name, reg in modbus.items() if reg.max_age == fast_age]
+
+        scans = [
+            random_images(modbus, list(modbus), rng),
+            random_images(modbus, fast or list(modbus)[:10], rng),
+        ]
+
+        # The queue holds the whole night so that the cost of write() and the
+        # throughput of the thread are measured separately.
+        writer = ArchiveWriter(modbus.plan, directory, name=key, queue_size=n_scans)
+        writer.start()
+
+        write_time = 0.0
+        for ii in range(n_scans):
+            plan, images = scans[ii % 2]
+            snapshot = RegisterSnapshot(plan, images, timestamp=start + ii / RATE)
+
+            t0 = time.perf_counter()
+            writer.write(snapshot)
+            write_time += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        await writer.close()
+        disk_time = time.perf_counter() - t0 + write_time
+
+        assert writer.path is not None
+        assert writer.stats["records"] == n_scans
+
+        t0 = time.perf_counter()
+        with ArchiveReader(writer.path) as reader:
+            for name in reader.names:
+                reader.get(name)
+        read_time = time.perf_counter() - t0
+
+        print(
+            f"{key:>6} {writer.record_dtype.itemsize:>11} "
+            f"{writer.path.stat().st_size / 1024**2:>10.1f} "
+            f"{write_time / n_scans * 1e6:>11.2f} {disk_time:>9.2f} "
+            f"{n_scans / disk_time:>10.0f} {read_time * 1e3:>10.1f}"
+        )
+
+        await modbus.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        asyncio.run(main(sys.argv[1]))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(main(directory))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: backends.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+"""Compares the cost of a scan with the pymodbus and native client backends.
+
+Run as ``python benchmarks/backends.py``. The PLC simulator is started in a
+separate process and the blocks of the full read plan of the PLC are read
+``N_SCANS`` times with each backend, holding the connection for the whole
+scan so that only the cost of the client is measured. For each backend the
+script prints the user and system CPU time of the client process per scan
+(the system time is mostly spent in socket calls), the peak memory during a
+scan (which includes the receive buffer of the asyncio transport), and the
+number of memory blocks allocated during a scan that are alive while its
+snapshot is, as traced by :mod:`tracemalloc`.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import tracemalloc
+
+from lvmecp import config
+from lvmecp.modbus import Modbus
+from lvmecp.simulator import Simulator
+from lvmecp.snapshot import RegisterSnapshot
+
+
+N_SCANS = 2000
+PORT = 5030
+
+
+def run_simulator():
+    """Runs the PLC simulator."""
+
+    simulator = Simulator(
+        config["modbus"]["registers"],
+        port=PORT,
+        overrides=config["simulator"]["overrides"],
+    )
+
+    asyncio.run(simulator.start())
+
+
+async def scan(modbus: Modbus) -> RegisterSnapshot:
+    """Reads all the blocks of the plan and returns a snapshot."""
+
+    plan = modbus.plan
+    data = [await modbus._read_block(block) for block in plan.blocks]
+
+    return RegisterSnapshot.from_blocks(plan, data)
+
+
+async def measure(backend: str) -> tuple[float, float, float, int]:
+    """Returns the user and system CPU time per scan, in us, and the allocations."""
+
+    modbus = Modbus(
+        {
+            **config["modbus"],
+            "host": "127.0.0.1",
+            "port": PORT,
+            "backend": backend,
+        }
+    )
+
+    await modbus.connect()
+
+    # Warm up.
+    for _ in range(10):
+        await scan(modbus)
+
+    start = os.times()
+    for _ in range(N_SCANS):
+        await scan(modbus)
+    end = os.times()
+
+    user = (end.user - start.user) / N_SCANS
+    system = (end.system - start.system) / N_SCANS
+
+    tracemalloc.start()
+    await scan(modbus)
+
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    current = tracemalloc.get_traced_memory()[0]
+
+    snapshot = await scan(modbus)
+
+    peak = tracemalloc.get_traced_memory()[1] - current
+    after = tracemalloc.take_snapshot()
+
+    tracemalloc.stop()
+    del snapshot
+
+    exclude = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(exclude).compare_to(
+        before.filter_traces(exclude),
+        "filename",
+    )
+    n_blocks = sum(stat.count_diff for stat in stats)
+
+    await modbus.disconnect()
+    await modbus.close()
+
+    return user * 1e6, system * 1e6, peak, n_blocks
+
+
+async def main():
+    process = multiprocessing.Process(target=run_simulator, daemon=True)
+    process.start()
+    await asyncio.sleep(1)
+
+    modbus = Modbus(config["modbus"])
+    print(f"Registers: {len(modbus)}, blocks: {modbus.plan.n_requests}")
+    print(
+        f"{'backend':<10} {'user us/scan':>13} {'sys us/scan':>12} "
+        f"{'peak (kB)':>10} {'blocks':>7}"
+    )
+
+    try:
+        for backend in ["pymodbus", "native"]:
+            user, system, peak, n_blocks = await measure(backend)
+            print(
+                f"{backend:<10} {user:>13.1f} {system:>12.1f} "
+                f"{peak / 1024:>10.1f} {n_blocks:>7}"
+            )
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: bits.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+"""Measures the memory used to store the coils and discrete inputs of a scan.
+
+Run as ``python benchmarks/bits.py``. For each path, ``N_SCANS`` scans of fake
+data for the full read plan of the PLC are processed and the coil and discrete
+input images of all of them are kept alive, as a cache or a history of scans would. The
+``bool`` path stores one byte per bit in a boolean array, which is how the
+bits were stored before they were packed. The ``packed`` paths build a
+`.RegisterSnapshot`, which packs eight bits per byte, from the lists of
+booleans returned by pymodbus or from the packed bytes returned by the native
+client.
+
+For each path the script prints the time per scan (including looking up all
+the single-bit registers by name), and the memory and number of blocks alive
+after the ``N_SCANS`` scans and the peak memory during them, as traced by
+:mod:`tracemalloc`.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import timeit
+import tracemalloc
+
+from typing import Any, Callable
+
+import numpy
+
+from lvmecp import config
+from lvmecp.modbus import Modbus
+from lvmecp.planner import ReadPlan
+from lvmecp.snapshot import RegisterSnapshot
+
+
+N_SCANS = 1000
+
+
+def fake_block_data(plan: ReadPlan, packed: bool = False) -> list[Any]:
+    """Returns block data with the shape that pymodbus or the native client return."""
+
+    data: list[Any] = []
+    for block in plan.blocks:
+        if not block.is_bits:
+            data.append([ii % 1000 for ii in range(block.count)])
+            continue
+
+        # pymodbus pads the bits to a multiple of eight.
+        count = 8 * ((block.count + 7) // 8)
+        bits = [bool(ii % 3) for ii in range(count)]
+
+        if packed:
+            data.append(numpy.packbits(bits, bitorder="little").tobytes())
+        else:
+            data.append(bits)
+
+    return data
+
+
+def bool_path(plan: ReadPlan, data: list[Any]) -> dict[str, numpy.ndarray]:
+    """Stores the bits of a scan as boolean arrays."""
+
+    images: dict[str, numpy.ndarray] = {}
+    for mode, size in plan.sizes.items():
+        if mode in ("coil", "discrete_input"):
+            images[mode] = numpy.zeros(size, dtype=numpy.bool_)
+
+    for block, offset, block_data in zip(plan.blocks, plan.offsets, data):
+        if block.is_bits:
+            count = block.count
+            images[block.mode][offset : offset + count] = block_data[:count]
+
+    for mode, byte in plan.index.values():
+        if mode in images:
+            images[mode][byte].item()
+
+    return images
+
+
+def packed_path(plan: ReadPlan, data: list[Any]) -> dict[str, numpy.ndarray]:
+    """Stores the bits of a scan packed in a `.RegisterSnapshot`."""
+
+    snapshot = RegisterSnapshot.from_blocks(plan, data)
+
+    for name in plan.bit_index:
+        snapshot[name]
+
+    images = snapshot.images
+
+    return {mode: images[mode] for mode in ("coil", "discrete_input") if mode in images}
+
+
+def measure(func: Callable[[], Any]) -> tuple[float, int, int, int]:
+    """Runs ``N_SCANS`` scans and keeps their results.
+
+    Returns the time per scan in microseconds, the memory, in bytes, and number
+    of blocks still allocated after the scans, and the peak memory during them.
+
+    """
+
+    func()  # Warm up caches.
+
+    elapsed = min(timeit.repeat(func, number=N_SCANS, repeat=5)) / N_SCANS
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    kept = [func() for _ in range(N_SCANS)]
+
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del kept
+
+    exclude = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(exclude).compare_to(
+        before.filter_traces(exclude),
+        "filename",
+    )
+
+    size = sum(stat.size_diff for stat in stats)
+    n_blocks = sum(stat.count_diff for stat in stats)
+
+    return elapsed * 1e6, size, n_blocks, peak
+
+
+async def main():
+    modbus = Modbus(config["modbus"])
+    plan = modbus.plan
+
+    n_bits = sum(block.count for block in plan.blocks if block.is_bits)
+    print(f"Bits per scan: {n_bits}, scans: {N_SCANS}")
+    print(
+        f"{'path':<16} {'us/scan':>9} {'kept (kB)':>10} "
+        f"{'B/scan':>7} {'blocks':>7} {'peak (kB)':>10}"
+    )
+
+    lists = fake_block_data(plan)
+    packed = fake_block_data(plan, packed=True)
+
+    paths = {
+        "bool": lambda: bool_path(plan, lists),
+        "packed (lists)": lambda: packed_path(plan, lists),
+        "packed (bytes)": lambda: packed_path(plan, packed),
+    }
+
+    for name, func in paths.items():
+        us, size, n_blocks, peak = measure(func)
+        print(
+            f"{name:<16} {us:>9.1f} {size / 1024:>10.1f} "
+            f"{size / N_SCANS:>7.0f} {n_blocks:>7} {peak / 1024:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
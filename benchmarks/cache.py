@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: cache.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+"""Measures the freshness checks of the register cache with larger register maps.
+
+Run as ``python benchmarks/cache.py``. The register map of the PLC is replicated
+``scale`` times at consecutive addresses, a snapshot with all the registers is
+added to the `.RegisterCache`, and then a few registers are refreshed, so the
+watermark of the oldest entry needs to be recomputed once. For each scale the
+script prints the time to check whether all the registers are fresh (as
+`.Modbus.read_all` does), to find the stale registers, and to get a cached view
+of the dome registers of the first copy.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import timeit
+from time import monotonic
+
+from lvmecp import config
+from lvmecp.modbus import Modbus
+from lvmecp.snapshot import RegisterSnapshot
+
+
+SCALES = [1, 10, 100]
+
+N_CALLS = 10000
+
+
+def create_modbus(scale: int) -> Modbus:
+    """Returns a `.Modbus` with ``scale`` copies of the register map."""
+
+    modbus_config = config["modbus"]
+    base_registers = modbus_config["registers"]
+
+    registers = {}
+    for ii in range(scale):
+        for name, register in base_registers.items():
+            # Keep the original names for the first copy.
+            new_name = name if ii == 0 else f"{name}_{ii}"
+            registers[new_name] = {
+                **register,
+                "address": register["address"] + ii * 1024,
+                "bits": None,
+            }
+
+    return Modbus({**modbus_config, "registers": registers})
+
+
+async def main():
+    print(
+        f"{'registers':>10} {'read_all (us)':>14} {'stale (us)':>11} {'view (us)':>10}"
+    )
+
+    for scale in SCALES:
+        modbus = create_modbus(scale)
+        cache = modbus.cache
+
+        cache.update(RegisterSnapshot(modbus.plan, {}, monotonic=monotonic()))
+        base_names = config["modbus"]["registers"]
+        dome = [name for name in modbus.groups["dome"] if name in base_names]
+        cache.update(RegisterSnapshot(modbus.get_plan(dome), {}))
+
+        timings = []
+        for func in (
+            lambda: cache.is_fresh(timeout=10),
+            lambda: cache.stale(timeout=10),
+            lambda: modbus.get_cached(dome),
+        ):
+            elapsed = min(timeit.repeat(func, number=N_CALLS, repeat=3)) / N_CALLS
+            timings.append(elapsed * 1e6)
+
+        print(
+            f"{len(modbus):>10} {timings[0]:>14.2f} "
+            f"{timings[1]:>11.2f} {timings[2]:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
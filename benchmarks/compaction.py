@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: compaction.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+"""Measures the compression ratio and the read time of compacted archives.
+
+Run as ``python benchmarks/compaction.py [DIRECTORY]``. The script archives a
+full night (``HOURS`` hours) of HVAC scans at ``RATE`` Hz to a temporary
+directory (or ``DIRECTORY``). The float registers follow slow random walks and
+the coils change state a few times per night, which is roughly what the real
+sensors do. It then compacts the archive with several float precisions and
+prints the size of the files, the time to compact the archive, and the time to
+load every register for the whole night and one register for one hour, for
+both the archive and the compacted file.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import tempfile
+import time
+
+import numpy
+
+from lvmecp import config
+from lvmecp.archive import ArchiveReader, ArchiveWriter
+from lvmecp.compaction import CompactReader, compact
+from lvmecp.modbus import Modbus
+from lvmecp.snapshot import RegisterSnapshot
+
+
+RATE = 10
+
+HOURS = 12
+
+#: Average number of changes of each coil per night.
+COIL_CHANGES = 5
+
+PRECISIONS = [1e-3, 1e-2, 1e-1]
+
+
+def random_night(modbus: Modbus, n_scans: int, rng: numpy.random.Generator):
+    """Returns the holding register and coil images of each scan."""
+
+    sizes = modbus.plan.sizes
+    words = numpy.zeros((n_scans, sizes["holding_register"]), dtype=numpy.uint16)
+    bits = numpy.zeros((n_scans, sizes["coil"]), dtype=numpy.bool_)
+
+    for name in modbus:
+        mode, position = modbus.plan.index[name]
+
+        if mode == "coil":
+            flips = rng.random(n_scans) < COIL_CHANGES / n_scans
+            bits[:, position] = numpy.cumsum(flips) % 2 == 1
+            continue
+
+        # A random walk of float32 values stored as big-endian bytes with the
+        # least significant word first.
+        walk = 15 + numpy.cumsum(rng.normal(0, 1e-3, n_scans))
+        value_words = walk.astype(">f4").view(">u2").reshape(n_scans, 2)
+        words[:, position : position + 2] = value_words[:, ::-1]
+
+    coils = numpy.packbits(bits, axis=1, bitorder="little")
+
+    return words, coils
+
+
+async def main(directory: str):
+    rng = numpy.random.default_rng(0)
+
+    n_scans = RATE * HOURS * 3600
+    start = (60000 - 40587) * 86400
+
+    modbus = Modbus(config["hvac"])
+    words, coils = random_night(modbus, n_scans, rng)
+
+    writer = ArchiveWriter(modbus.plan, directory, name="hvac", queue_size=n_scans)
+    writer.start()
+
+    for ii in range(n_scans):
+        images = {"holding_register": words[ii], "coil": coils[ii]}
+        writer.write(RegisterSnapshot(modbus.plan, images, start + ii / RATE))
+
+    await writer.close()
+    await modbus.close()
+
+    path = writer.path
+    assert path is not None
+
+    name = next(name for name in modbus if modbus[name].mode == "holding_register")
+    hour = (start + 3600, start + 7200)
+
+    t0 = time.perf_counter()
+    with ArchiveReader(path) as reader:
+        for register in reader.names:
+            reader.get(register)
+    read_all = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ArchiveReader(path) as reader:
+        reader.get(name, *hour)
+    read_hour = time.perf_counter() - t0
+
+    print(f"Scans: {n_scans} ({HOURS} h at {RATE} Hz)")
+    print(
+        f"{'precision':>9} {'file (MB)':>10} {'ratio':>7} {'compact (s)':>12} "
+        f"{'load (ms)':>10} {'1 h (ms)':>9}"
+    )
+    print(
+        f"{'archive':>9} {path.stat().st_size / 1024**2:>10.2f} {1:>7.1f} "
+        f"{'':>12} {read_all * 1e3:>10.1f} {read_hour * 1e3:>9.1f}"
+    )
+
+    for precision in PRECISIONS:
+        output = path.with_name(f"{path.stem}-{precision:g}.ecpz")
+
+        t0 = time.perf_counter()
+        compact(path, output, precision=precision)
+        compact_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with CompactReader(output) as reader:
+            reader.load()
+        load_all = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with CompactReader(output) as reader:
+            reader.get(name, *hour)
+        load_hour = time.perf_counter() - t0
+
+        size = output.stat().st_size
+        print(
+            f"{precision:>9g} {size / 1024**2:>10.2f} "
+            f"{path.stat().st_size / size:>7.1f} {compact_time:>12.2f} "
+            f"{load_all * 1e3:>10.1f} {load_hour * 1e3:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        asyncio.run(main(sys.argv[1]))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(main(directory))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: decoding.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+"""Compares the batch decoding of 32-bit registers with per-register decoding.
+
+Run as ``python benchmarks/decoding.py``. The HVAC register map is replicated
+``SCALE`` times at consecutive addresses and fake words are generated for the
+whole map. The per-register path decodes each ``float_32bit`` register with
+`.ModbusRegister.decode`, which unpacks each value with :mod:`struct`. The
+batch path decodes all the registers with the `.BatchDecoder` of the plan in
+one vectorised pass. The script prints the time to decode all the
+registers of a scan for each path.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import timeit
+
+import numpy
+
+from lvmecp import config
+from lvmecp.modbus import Modbus
+
+
+#: Number of copies of the HVAC register map.
+SCALE = 10
+
+N_SCANS = 200
+
+
+def create_modbus(scale: int = SCALE) -> Modbus:
+    """Returns a `.Modbus` with ``scale`` copies of the HVAC registers."""
+
+    hvac_config = config["hvac"]
+    hvac_registers = hvac_config["registers"]
+
+    size = max(reg["address"] + reg.get("count", 1) for reg in hvac_registers.values())
+
+    registers = {
+        f"{name}_{ii}": {**register, "address": register["address"] + ii * size}
+        for ii in range(scale)
+        for name, register in hvac_registers.items()
+    }
+
+    return Modbus({**hvac_config, "registers": registers})
+
+
+async def main():
+    modbus = create_modbus()
+    plan = modbus.plan
+
+    rng = numpy.random.default_rng(0)
+    images = {
+        mode: rng.integers(0x3F00, 0x4100, size, dtype=numpy.uint16)
+        for mode, size in plan.sizes.items()
+    }
+
+    registers = [modbus[name] for name in plan.decoder.names]
+
+    def per_register():
+        values = {}
+        for register in registers:
+            mode, start = plan.index[register.name]
+            words = images[mode][start : start + register.count].tolist()
+            values[register.name] = register.decode(words)
+        return values
+
+    def batch():
+        return plan.decoder.decode(images)
+
+    # Both paths return the same values.
+    expected = per_register()
+    decoded = batch()
+    assert all(abs(decoded[name] - expected[name]) < 1e-9 for name in expected)
+
+    print(f"Registers: {len(registers)}, blocks: {plan.n_requests}")
+    print(f"{'path':<14} {'us/scan':>9} {'us/register':>12}")
+
+    for name, func in {"per-register": per_register, "batch": batch}.items():
+        elapsed = min(timeit.repeat(func, number=N_SCANS, repeat=5)) / N_SCANS
+        us = elapsed * 1e6
+        print(f"{name:<14} {us:>9.1f} {us / len(registers):>12.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: diff.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+"""Measures the cost of diffing consecutive scans and the size of the messages.
+
+Run as ``python benchmarks/diff.py``. The register map of the PLC is replicated
+``scale`` times at consecutive addresses and pairs of snapshots with random
+data are built from the same plan, with ``N_CHANGES`` elements changed in the
+second one. For each scale the script prints the time to find the changes by
+comparing the decoded values of all the registers (``dict``) and with
+`.diff_snapshots` (``diff``), for a quiet scan without changes and for a scan
+with changes, and the size of the JSON message with all the registers and
+with only the changed ones.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import timeit
+
+import numpy
+
+from lvmecp import config
+from lvmecp.diff import diff_snapshots
+from lvmecp.modbus import Modbus
+from lvmecp.planner import BIT_MODES
+from lvmecp.snapshot import RegisterSnapshot
+
+
+SCALES = [1, 10]
+
+N_CHANGES = 5
+
+N_CALLS = 1000
+
+
+def create_modbus(scale: int) -> Modbus:
+    """Returns a `.Modbus` with ``scale`` copies of the register map."""
+
+    modbus_config = config["modbus"]
+
+    registers = {}
+    for ii in range(scale):
+        for name, register in modbus_config["registers"].items():
+            new_name = name if ii == 0 else f"{name}_{ii}"
+            registers[new_name] = {
+                **register,
+                "address": register["address"] + ii * 1024,
+                "bits": None,
+            }
+
+    return Modbus({**modbus_config, "registers": registers})
+
+
+def random_images(modbus: Modbus, rng: numpy.random.Generator):
+    """Returns random images for the plan of a `.Modbus`."""
+
+    images: dict[str, numpy.ndarray] = {}
+    for mode, size in modbus.plan.sizes.items():
+        if mode in BIT_MODES:
+            images[mode] = rng.integers(0, 256, (size + 7) // 8, dtype=numpy.uint8)
+        else:
+            images[mode] = rng.integers(0, 1000, size, dtype=numpy.uint16)
+
+    return images
+
+
+def dict_diff(old: RegisterSnapshot, new: RegisterSnapshot):
+    """Finds the changes comparing the decoded values of all the registers."""
+
+    return {name: value for name, value in new.items() if old[name] != value}
+
+
+async def main():
+    rng = numpy.random.default_rng(0)
+
+    print(
+        f"{'registers':>10} {'path':>5} {'quiet (us)':>11} {'changes (us)':>13} "
+        f"{'full (B)':>9} {'delta (B)':>10}"
+    )
+
+    for scale in SCALES:
+        modbus = create_modbus(scale)
+        plan = modbus.plan
+
+        images = random_images(modbus, rng)
+
+        changed = {mode: image.copy() for mode, image in images.items()}
+        for _ in range(N_CHANGES):
+            mode = rng.choice(list(changed))
+            position = rng.integers(0, len(changed[mode]))
+            changed[mode][position] ^= 1
+
+        def snapshot(images: dict[str, numpy.ndarray]):
+            return RegisterSnapshot(plan, {m: i.copy() for m, i in images.items()})
+
+        old = snapshot(images)
+        quiet = snapshot(images)
+        new = snapshot(changed)
+
+        full_size = len(json.dumps({"registers": dict(new)}))
+        delta = diff_snapshots(old, new).as_dict()
+        delta_size = len(json.dumps({"registers_delta": delta}))
+
+        for name, func in (("dict", dict_diff), ("diff", diff_snapshots)):
+            timings = []
+            for other in (quiet, new):
+                elapsed = timeit.timeit(
+                    # Decode the values of new snapshots every time.
+                    lambda: func(old, RegisterSnapshot(plan, other.images)),
+                    number=N_CALLS,
+                )
+                timings.append(elapsed / N_CALLS * 1e6)
+
+            print(
+                f"{len(modbus):>10} {name:>5} {timings[0]:>11.1f} "
+                f"{timings[1]:>13.1f} {full_size:>9} {delta_size:>10}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: history.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+"""Measures the memory and the cost of appending to and querying the history.
+
+Run as ``python benchmarks/history.py``. For the PLC and HVAC register maps
+the script prints the memory used by a `.RegisterHistory` of the configured
+size, the time to append a scan of all the registers and a scan of the fast
+poll tier, and the time to query a full buffer for a word register, a coil,
+and a float, downsampled to ``N_POINTS`` points.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import timeit
+
+import numpy
+
+from lvmecp import config
+from lvmecp.modbus import Modbus
+from lvmecp.planner import BIT_MODES
+from lvmecp.snapshot import RegisterSnapshot
+
+
+N_CALLS = 10000
+
+N_POINTS = 200
+
+
+def random_snapshot(modbus: Modbus, names: list[str], rng: numpy.random.Generator):
+    """Returns a snapshot with random data for some registers."""
+
+    plan = modbus.get_plan(names)
+
+    images: dict[str, numpy.ndarray] = {}
+    for mode, size in plan.sizes.items():
+        if mode in BIT_MODES:
+            images[mode] = rng.integers(0, 256, (size + 7) // 8, dtype=numpy.uint8)
+        else:
+            images[mode] = rng.integers(0, 1000, size, dtype=numpy.uint16)
+
+    return RegisterSnapshot(plan, images)
+
+
+async def main():
+    rng = numpy.random.default_rng(0)
+
+    print(
+        f"{'server':>6} {'registers':>10} {'size':>6} {'memory (kB)':>12} "
+        f"{'full (us)':>10} {'partial (us)':>13} {'query (ms)':>11}"
+    )
+
+    for key in ("modbus", "hvac"):
+        modbus = Modbus(config[key])
+        history = modbus.history
+        assert history is not None
+
+        fast_age = modbus.poll_tiers["fast"]
+        fast = [name for name, reg in modbus.items() if reg.max_age == fast_age]
+        full = random_snapshot(modbus, list(modbus), rng)
+        partial = random_snapshot(modbus, fast or list(modbus)[:10], rng)
+
+        full_time = timeit.timeit(lambda: history.append(full), number=N_CALLS)
+        partial_time = timeit.timeit(lambda: history.append(partial), number=N_CALLS)
+
+        # Query one register of each kind in a full buffer.
+        queried = {
+            "word": next(n for n, r in modbus.items() if r.mode == "holding_register"),
+            "bit": next((n for n, r in modbus.items() if r.mode == "coil"), None),
+            "float": next((n for n, r in modbus.items() if r.codec), None),
+        }
+
+        query_times = []
+        for name in queried.values():
+            if name is not None:
+                elapsed = timeit.timeit(
+                    lambda: history.get(name, max_points=N_POINTS),
+                    number=100,
+                )
+                query_times.append(elapsed / 100 * 1e3)
+
+        print(
+            f"{key:>6} {len(modbus):>10} {history.size:>6} "
+            f"{history.nbytes / 1024:>12.1f} {full_time / N_CALLS * 1e6:>10.1f} "
+            f"{partial_time / N_CALLS * 1e6:>13.1f} {max(query_times):>11.2f}"
+        )
+
+        await modbus.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
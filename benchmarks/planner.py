@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: planner.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+"""Compares the compiled read plan with the fixed full-block scan.
+
+Run as ``python benchmarks/planner.py``. For each Modbus server in the
+configuration it prints the number of requests and the bytes on the wire
+needed to read all the registers with the old fixed scheme (1023 coils and
+holding registers in chunks of 100 words from address zero) and with the
+compiled read plan.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+
+from lvmecp import config
+from lvmecp.modbus import Modbus
+from lvmecp.planner import MBAP_SIZE, READ_REQUEST_PDU_SIZE, READ_RESPONSE_PDU_SIZE
+
+
+FIXED_COIL_COUNT = 1023
+FIXED_HR_COUNT = 100
+
+
+def fixed_scheme_cost(modbus: Modbus) -> tuple[int, int]:
+    """Returns the number of requests and bytes of the fixed scan."""
+
+    request_size = MBAP_SIZE + READ_REQUEST_PDU_SIZE
+    response_header = MBAP_SIZE + READ_RESPONSE_PDU_SIZE
+
+    n_requests = 1
+    n_bytes = request_size + response_header + math.ceil(FIXED_COIL_COUNT / 8)
+
+    hr_count = max(
+        reg.address + reg.count
+        for reg in modbus.values()
+        if reg.mode == "holding_register"
+    )
+    n_hr_reads = hr_count // FIXED_HR_COUNT + 1
+
+    n_requests += n_hr_reads
+    n_bytes += n_hr_reads * (request_size + response_header + 2 * FIXED_HR_COUNT)
+
+    return n_requests, n_bytes
+
+
+async def main():
+    print(f"{'server':<8} {'scheme':<8} {'requests':>9} {'bytes':>7}")
+
+    for key in ["modbus", "hvac"]:
+        modbus = Modbus(config[key])
+
+        fixed_requests, fixed_bytes = fixed_scheme_cost(modbus)
+        print(f"{key:<8} {'fixed':<8} {fixed_requests:>9} {fixed_bytes:>7}")
+
+        plan = modbus.plan
+        print(f"{key:<8} {'planned':<8} {plan.n_requests:>9} {plan.wire_bytes:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: snapshot.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+"""Compares register snapshots with the dictionary-based read path.
+
+Run as ``python benchmarks/snapshot.py``. For each path, fake block data for
+the full read plan of the PLC is generated for each scan and then processed
+as the actor does during a status cycle: the scan is decoded and cached, a few
+status requests read all the registers from the cache, and the dome, safety,
+and lights modules read their registers.
+
+The dictionary path decodes every register into a new dictionary, stores each
+value and the time at which it was set in a cache dictionary that checks the
+time on each lookup (as the retired ``TimedCacheDict`` did), and makes a copy
+for each status request and for each module. The snapshot path builds a
+`.RegisterSnapshot` that is shared by the status requests and uses views of it
+for the modules.
+
+For each path the script prints the time per scan and the memory and number
+of blocks allocated during the scan that are alive while its results are used,
+as traced by :mod:`tracemalloc`.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import timeit
+import tracemalloc
+from types import SimpleNamespace
+
+from typing import Any, Callable
+
+from lvmecp import config
+from lvmecp.modbus import Modbus
+from lvmecp.planner import ReadPlan
+from lvmecp.snapshot import RegisterSnapshot
+
+
+N_SCANS = 1000
+
+#: Number of status requests served from each scan.
+N_STATUS = 3
+
+MODULES = {
+    "dome": lambda modbus: modbus.groups["dome"],
+    "safety": lambda modbus: [*modbus.groups["safety"], "dome_lockout", "dome_error"],
+    "lights": lambda modbus: modbus.groups["lights"],
+}
+
+
+def fake_block_data(plan: ReadPlan) -> list[list[Any]]:
+    """Returns data with the shape that the block reads would return."""
+
+    data: list[list[Any]] = []
+    for block in plan.blocks:
+        if block.is_bits:
+            # pymodbus pads the bits to a multiple of eight.
+            count = 8 * ((block.count + 7) // 8)
+            data.append([bool(ii % 3) for ii in range(count)])
+        else:
+            data.append([ii % 1000 for ii in range(block.count)])
+
+    return data
+
+
+def dict_path(modbus: Modbus, cache: dict[str, Any], cache_time: dict[str, float]):
+    """Processes a scan as the dictionary-based read path."""
+
+    plan = modbus.plan
+    data = fake_block_data(plan)
+
+    values: dict[str, Any] = {}
+    for block, block_data in zip(plan.blocks, data):
+        for register, offset in block.registers:
+            if register.count == 1:
+                value = block_data[offset]
+            else:
+                value = block_data[offset : offset + register.count]
+            values[register.name] = register.decode(value)
+
+    for name, value in values.items():
+        cache[name] = value
+        cache_time[name] = time.time()
+
+    readers = []
+    for _ in range(N_STATUS):
+        readers.append(dict(cache))
+
+    for names in MODULES.values():
+        module_values = {
+            name: cache[name] if time.time() - cache_time[name] <= 1 else None
+            for name in names(modbus)
+        }
+        readers.append(SimpleNamespace(**module_values))
+
+    return readers
+
+
+def snapshot_path(modbus: Modbus) -> Any:
+    """Processes a scan using a `.RegisterSnapshot`."""
+
+    data = fake_block_data(modbus.plan)
+    snapshot = RegisterSnapshot.from_blocks(modbus.plan, data)
+
+    readers = []
+    for _ in range(N_STATUS):
+        readers.append(snapshot)
+
+    for names in MODULES.values():
+        readers.append(snapshot.view(names(modbus)))
+
+    # All the values are accessed at least once, as the dictionary path decodes
+    # every register.
+    for name in snapshot:
+        snapshot[name]
+
+    return readers
+
+
+def measure(func: Callable[[], Any]) -> tuple[float, float, int]:
+    """Measures the cost of processing a scan.
+
+    Returns the time per scan in microseconds, and the memory, in bytes, and
+    number of memory blocks allocated by a scan that are still alive while its
+    readers hold the results.
+
+    """
+
+    func()  # Warm up caches.
+
+    elapsed = min(timeit.repeat(func, number=N_SCANS, repeat=5)) / N_SCANS
+
+    tracemalloc.start()
+    func()
+
+    before = tracemalloc.take_snapshot()
+    kept = func()
+    after = tracemalloc.take_snapshot()
+
+    tracemalloc.stop()
+    del kept
+
+    exclude = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    before = before.filter_traces(exclude)
+    after = after.filter_traces(exclude)
+
+    stats = after.compare_to(before, "filename")
+    size = sum(stat.size_diff for stat in stats)
+    n_blocks = sum(stat.count_diff for stat in stats)
+
+    return elapsed * 1e6, size, n_blocks
+
+
+async def main():
+    modbus = Modbus(config["modbus"])
+    cache: dict[str, Any] = {}
+    cache_time: dict[str, float] = {}
+
+    print(f"Registers: {len(modbus)}, blocks: {modbus.plan.n_requests}")
+    print(f"{'path':<10} {'us/scan':>9} {'memory (kB)':>12} {'blocks':>7}")
+
+    paths = {
+        "dict": lambda: dict_path(modbus, cache, cache_time),
+        "snapshot": lambda: snapshot_path(modbus),
+    }
+
+    for name, func in paths.items():
+        us, size, n_blocks = measure(func)
+        print(f"{name:<10} {us:>9.1f} {size / 1024:>12.1f} {n_blocks:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
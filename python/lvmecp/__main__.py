@@ -99,6 +99,44 @@ async def simulator():
     await plc_simulator.start()
 
 
+@lvmecp.command()
+@click.argument(
+    "paths",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+)
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    help="Directory for the compacted files. Defaults to that of each archive.",
+)
+@click.option(
+    "--precision",
+    type=float,
+    help="Precision of the float registers.",
+)
+def compact(
+    paths: tuple[pathlib.Path, ...],
+    output_dir: pathlib.Path | None = None,
+    precision: float | None = None,
+):
+    """Compacts archive files into compressed columnar files."""
+
+    from lvmecp.compaction import PRECISION
+    from lvmecp.compaction import compact as compact_archive
+
+    if output_dir:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    for path in paths:
+        output = (output_dir or path.parent) / path.with_suffix(".ecpz").name
+        compact_archive(path, output, precision=precision or PRECISION)
+
+        ratio = path.stat().st_size / output.stat().st_size
+        click.echo(f"{path!s} -> {output!s} ({ratio:.1f}x)")
+
+
 def main():
     lvmecp(auto_envvar_prefix="LVMECP")
 
@@ -9,8 +9,11 @@
 from __future__ import annotations
 
 import asyncio
+import math
 import time
 
+from typing import TYPE_CHECKING, Any, Iterable, Mapping
+
 from lvmopstools.actor import ErrorCodesBase, LVMActor
 from lvmopstools.notifications import send_notification
 
@@ -20,9 +23,15 @@ from lvmecp import __version__, log
 from lvmecp.actor.commands import parser
 from lvmecp.maskbits import DomeStatus
 from lvmecp.plc import PLC
+from lvmecp.priority import Priority
 from lvmecp.tools import redis_client
 
 
+if TYPE_CHECKING:
+    from lvmecp.scheduler import ScanCallback, ScanScheduler
+    from lvmecp.snapshot import RegisterSnapshot, SnapshotView
+
+
 __all__ = ["ECPActor"]
 
 
@@ -53,6 +62,10 @@ class ECPActor(LVMActor):
             self.plc = plc
 
         self._emit_status_task: asyncio.Task | None = None
+
+        # The full scans, per connection, to which the status deltas are relative.
+        self.status_baseline: dict[str, RegisterSnapshot] = {}
+
         self._monitor_dome_task: asyncio.Task | None = None
         self._monitor_internet_task: asyncio.Task | None = None
 
@@ -96,17 +109,92 @@ class ECPActor(LVMActor):
 
         self._eng_mode_task = await cancel_task(self._eng_mode_task)
 
+        await self.plc.close()
+
         await super().stop(**kwargs)
         self.running = False
 
         return
 
-    async def emit_status(self, delay: float = 30.0):
-        """Emits the status on a timer."""
+    async def emit_status(self, delay: float = 30.0, keyframe_interval: float = 300.0):
+        """Emits the status every ``delay`` seconds.
 
-        while True:
-            await self.send_command(self.name, "status", internal=True)
-            await asyncio.sleep(delay)
+        All the PLC and HVAC registers are subscribed to their schedulers with
+        an interval of ``delay`` seconds, and the registers are output from the
+        scans delivered to the subscriptions, without reading them again. A
+        keyframe, with all the registers, is emitted every ``keyframe_interval``
+        seconds. In between, only the registers that changed since the last
+        status emitted are output. The rest of the status is output by the
+        ``status --no-registers`` command.
+
+        """
+
+        last_keyframe: float = -math.inf
+        hvac: SnapshotView | None = None
+
+        async def _update_hvac(view: SnapshotView | None):
+            nonlocal hvac
+
+            if view is not None:
+                hvac = view
+
+        async def _emit_status(view: SnapshotView | None):
+            nonlocal last_keyframe
+
+            now = time.monotonic()
+            keyframe = now - last_keyframe >= keyframe_interval
+            if keyframe:
+                last_keyframe = now
+
+            if view is not None:
+                views = [view] if hvac is None else [view, hvac]
+                self._write_registers(views, keyframe)
+
+            command = "status --no-registers" + ("" if keyframe else " --delta")
+            await self.send_command(self.name, command, internal=True)
+
+        await asyncio.gather(
+            self._run_subscription(
+                "status",
+                list(self.plc.modbus),
+                delay,
+                _emit_status,
+            ),
+            self._run_subscription(
+                "status",
+                list(self.plc.hvac_modbus),
+                delay,
+                _update_hvac,
+                scheduler=self.plc.hvac_scheduler,
+            ),
+        )
+
+    def _write_registers(self, views: list[SnapshotView], keyframe: bool):
+        """Outputs the registers, or the ones that changed, from some scans."""
+
+        snapshots = {key: view.snapshot for key, view in zip(("plc", "hvac"), views)}
+        changes = self.plc.get_register_changes(self.status_baseline, snapshots)
+
+        registers = {name: value for view in views for name, value in view.items()}
+        ages = {name: round(view.age, 3) for view in views for name in view}
+        quality = {name: view.quality.value for view in views for name in view}
+
+        if keyframe:
+            overrides = {**self.plc.modbus.overrides, **self.plc.hvac_modbus.overrides}
+            self.write(
+                "i",
+                registers=registers,
+                register_ages=ages,
+                register_quality=quality,
+                register_overrides=list(overrides),
+            )
+        elif len(changes) > 0:
+            self.write(
+                "i",
+                registers_delta=changes.as_dict(),
+                register_ages={name: ages[name] for name in changes.names},
+                register_quality={name: quality[name] for name in changes.names},
+            )
 
     async def monitor_internet(self, delay: float = 30.0):
         """Monitors the internet connection and set the PLC variable."""
@@ -123,11 +211,12 @@ class ECPActor(LVMActor):
                 )
                 network = beat_cmd.replies.get("network")
 
+                network_failure = self.plc.modbus["network_failure"]
                 if not network.get("internet", True) or not network.get("lco", True):
                     # No internet or LCO connection
-                    await self.plc.modbus["network_failure"].write(True)
+                    await network_failure.write(True, priority=Priority.HEARTBEAT)
                 else:
-                    await self.plc.modbus["network_failure"].write(False)
+                    await network_failure.write(False, priority=Priority.HEARTBEAT)
 
             except Exception as err:
                 log.error(f"Failed determining network status: {err}")
@@ -135,30 +224,73 @@ class ECPActor(LVMActor):
     async def monitor_dome(self, delay: float = 30.0):
         """Monitors the dome and closes during daytime."""
 
-        while True:
-            await asyncio.sleep(delay)
+        safety = self.plc.safety
+        registers = [*safety.get_registers(), *safety.bypass_registers]
+
+        await self._run_subscription(
+            "monitor_dome",
+            registers,
+            delay,
+            self._check_daytime_dome,
+            delay=delay,
+        )
 
-            closing_flags = DomeStatus.MOTOR_CLOSING | DomeStatus.CLOSED
-            is_closing = self.plc.dome.status and (self.plc.dome.status & closing_flags)
+    async def _check_daytime_dome(self, registers: Mapping[str, Any] | None):
+        """Closes the dome if it is open during daytime."""
 
-            # Check engineering mode. This includes the PLC overrides.
-            eng_mode = await self.plc.safety.engineering_mode_active()
-            if eng_mode:
-                pass
-            elif self.plc.dome.is_daytime() and not is_closing:
+        if registers is None:
+            return
+
+        closing_flags = DomeStatus.MOTOR_CLOSING | DomeStatus.CLOSED
+        is_closing = self.plc.dome.status and (self.plc.dome.status & closing_flags)
+
+        # Check engineering mode. This includes the PLC overrides.
+        eng_mode = await self.plc.safety.engineering_mode_active(registers=registers)
+        if eng_mode:
+            pass
+        elif self.plc.dome.is_daytime() and not is_closing:
+            try:
+                self.write("w", text="Dome found open during daytime. Closing.")
+                await send_notification(
+                    "Dome found open during daytime. Closing.",
+                    level="warning",
+                )
+            except Exception as err:
+                log.error(f"Failed notifying about daytime dome closure: {err}")
+            finally:
                 try:
-                    self.write("w", text="Dome found open during daytime. Closing.")
-                    await send_notification(
-                        "Dome found open during daytime. Closing.",
-                        level="warning",
-                    )
+                    await self.plc.dome.close()
                 except Exception as err:
-                    log.error(f"Failed notifying about daytime dome closure: {err}")
-                finally:
-                    try:
-                        await self.plc.dome.close()
-                    except Exception as err:
-                        self.write("e", error=f"Failed closing dome: {err}")
+                    self.write("e", error=f"Failed closing dome: {err}")
+
+    async def _run_subscription(
+        self,
+        name: str,
+        registers: Iterable[str],
+        interval: float,
+        callback: ScanCallback,
+        delay: float = 0.0,
+        scheduler: ScanScheduler | None = None,
+    ):
+        """Subscribes to a scheduler until the task is cancelled.
+
+        Uses the PLC scheduler unless ``scheduler`` is set.
+
+        """
+
+        scheduler = scheduler or self.plc.scheduler
+        subscription = scheduler.subscribe(
+            name,
+            registers,
+            interval,
+            callback,
+            delay=delay,
+        )
+
+        try:
+            await asyncio.Future()
+        finally:
+            await scheduler.unsubscribe(subscription)
 
     async def eng_mode(self, enable: bool, timeout: float | None = None):
         """Sets or returns the engineering mode."""
@@ -239,15 +371,18 @@ class ECPActor(LVMActor):
 
             self._eng_mode = False
 
-            modbus = self.plc.modbus
-            await modbus.write_register("bypass_hardware_remote", eng_mode_hw_bypass)
-            await modbus.write_register("bypass_software_remote", eng_mode_sw_bypass)
+            await self.plc.modbus.write_many(
+                {
+                    "bypass_hardware_remote": eng_mode_hw_bypass,
+                    "bypass_software_remote": eng_mode_sw_bypass,
+                }
+            )
 
     async def emit_heartbeat(self):
         """Emits a heartbeat to the PLC."""
 
         self.log.debug("Emitting heartbeat to the PLC.")
-        await self.plc.modbus["hb_set"].write(True)
+        await self.plc.modbus["hb_set"].write(True, priority=Priority.HEARTBEAT)
 
     async def _check_internal(self):
         return await super()._check_internal()
@@ -8,8 +8,6 @@
 
 from __future__ import annotations
 
-import asyncio
-
 from typing import TYPE_CHECKING
 
 from . import parser
@@ -19,11 +17,22 @@ if TYPE_CHECKING:
     from lvmecp.actor import ECPCommand
 
 
+#: Seconds to wait for the PLC to report the e-stop.
+E_STOP_TIMEOUT = 5.0
+
+
 @parser.command()
 async def emergency_stop(command: ECPCommand):
     """Trigger and emergency stop."""
 
+    modbus = command.actor.plc.modbus
+
     await command.actor.plc.safety.emergency_stop()
-    await asyncio.sleep(0.1)
+
+    # Wait until a scan shows that the e-stop is active, instead of sleeping.
+    try:
+        await modbus.wait_for("e_status", True, timeout=E_STOP_TIMEOUT, interval=0.1)
+    except TimeoutError:
+        command.warning("The e-stop status has not been confirmed by the PLC.")
 
     return command.finish(text="Emergency stop triggered.")
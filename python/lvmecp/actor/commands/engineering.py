@@ -28,7 +28,7 @@ async def get_eng_mode_status(actor: ECPActor) -> dict:
     started_at = actor._eng_mode_started_at
     duration = actor._eng_mode_duration
 
-    registers = await actor.plc.read_all_registers(use_cache=False)
+    registers = await actor.plc.modbus.read_group("engineering_mode", use_cache=False)
 
     if duration is None or started_at is None:
         ends_at = None
@@ -96,10 +96,14 @@ async def enable(
     await command.actor.eng_mode(True, timeout=timeout)
     await asyncio.sleep(0.5)  # Allow time for the e-mode task to run.
 
+    bypasses: dict[str, int | bool] = {}
     if hardware_bypass:
-        await modbus.write_register("bypass_hardware_remote", True)
+        bypasses["bypass_hardware_remote"] = True
     if software_bypass:
-        await modbus.write_register("bypass_software_remote", True)
+        bypasses["bypass_software_remote"] = True
+
+    # Adjacent bypass coils are written with a single request.
+    await modbus.write_many(bypasses)
 
     try:
         # Safe the engineering mode data to Redis so that we can recover it
@@ -124,8 +128,12 @@ async def disable(command: ECPCommand):
 
     await command.actor.eng_mode(False)
 
-    await modbus.write_register("bypass_hardware_remote", False)
-    await modbus.write_register("bypass_software_remote", False)
+    await modbus.write_many(
+        {
+            "bypass_hardware_remote": False,
+            "bypass_software_remote": False,
+        }
+    )
 
     try:
         # Safe the engineering mode data to Redis so that we can recover it
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: history.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+from time import time
+
+from typing import TYPE_CHECKING
+
+import click
+
+from . import parser
+
+
+if TYPE_CHECKING:
+    from lvmecp.actor import ECPCommand
+
+
+@parser.command()
+@click.argument("REGISTER", type=str, required=False)
+@click.option(
+    "--last",
+    type=float,
+    default=300.0,
+    show_default=True,
+    help="Seconds of history to return.",
+)
+@click.option(
+    "--points",
+    type=click.IntRange(min=2),
+    default=200,
+    show_default=True,
+    help="Maximum number of points to return.",
+)
+async def history(
+    command: ECPCommand,
+    register: str | None = None,
+    last: float = 300.0,
+    points: int = 200,
+):
+    """Returns the recent history of a register.
+
+    The values of the register in the scans of the last ``--last`` seconds are
+    output in ``register_history``, downsampled to at most ``--points`` points
+    keeping the minimum and maximum of each interval. The size and memory use
+    of the history buffers are always output.
+
+    """
+
+    plc = command.actor.plc
+    connections = {"plc": plc.modbus, "hvac": plc.hvac_modbus}
+
+    buffers = {}
+    for key, modbus in connections.items():
+        if modbus.history is not None:
+            buffers[key] = {
+                "size": modbus.history.size,
+                "n_scans": len(modbus.history),
+                "span": round(modbus.history.span, 3),
+                "nbytes": modbus.history.nbytes,
+            }
+
+    command.info(history_buffers=buffers)
+
+    if register is None:
+        return command.finish()
+
+    for modbus in connections.values():
+        if register in modbus:
+            break
+    else:
+        return command.fail(f"Register {register!r} not found.")
+
+    if modbus.history is None:
+        return command.fail(f"The history of register {register!r} is disabled.")
+
+    times, values = modbus.history.get(register, start=time() - last, max_points=points)
+
+    command.info(
+        register_history={
+            "name": register,
+            "times": times.round(3).tolist(),
+            "values": values.tolist(),
+        }
+    )
+
+    return command.finish()
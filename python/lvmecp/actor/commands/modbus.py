@@ -8,8 +8,6 @@
 
 from __future__ import annotations
 
-import asyncio
-
 from typing import TYPE_CHECKING, Literal
 
 import click
@@ -161,13 +159,15 @@ async def write(
     else:
         value = int(value)
 
-    try:
-        await register.write(value)
-    except Exception as err:
-        return command.fail(f"Error writing to register {name!r}: {err!r}")
+    # Write and read back the value without other requests in between.
+    async with command.actor.plc.modbus.session() as session:
+        try:
+            await session.write(register, value)
+        except Exception as err:
+            return command.fail(f"Error writing to register {name!r}: {err!r}")
 
-    await asyncio.sleep(0.5)
-    new_value = await register.read(use_cache=False)
+        await session.sleep(0.5)
+        new_value = (await session.read([register]))[name]
 
     return command.finish(
         register={
@@ -10,7 +10,7 @@ from __future__ import annotations
 
 import asyncio
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import click
 
@@ -28,32 +28,83 @@ if TYPE_CHECKING:
 @parser.command()
 @click.option("--no-registers", is_flag=True, help="Does not output registers.")
 @click.option("--no-cache", is_flag=True, help="Ignores the internal cache.")
+@click.option(
+    "--delta",
+    is_flag=True,
+    help="Only outputs the registers that changed since the last status.",
+)
 async def status(
     command: ECPCommand,
     no_registers: bool = False,
     no_cache: bool = False,
+    delta: bool = False,
 ):
-    """Returns the enclosure status."""
+    """Returns the enclosure status.
+
+    Unless ``--no-cache`` is used, recent values that have expired are output
+    without waiting for the PLC while they are refreshed in the background. The
+    age of the value of each register is output in ``register_ages``, and
+    whether it is ``"good"`` or ``"stale"`` in ``register_quality``.
+
+    With ``--delta``, only the registers that changed since the last status
+    emitted by the actor (see `.ECPActor.emit_status`) are output, in
+    ``registers_delta``, and the status of the modules is only output if it
+    changed. The command does not change the values to which the deltas of the
+    actor are relative.
+
+    """
 
     plc = command.actor.plc
+    use_cache = not no_cache
 
     overrides_plc = plc.modbus.overrides
     overrides_hvac = plc.hvac.modbus.overrides
     overrides = {**overrides_plc, **overrides_hvac}
 
     if no_registers is False:
-        command.info(
-            registers=(await plc.read_all_registers(use_cache=not no_cache)),
-            register_overrides=list(overrides.keys()),
+        # The values, ages, and quality all come from the scans that were read,
+        # even if a background refresh replaces the last scans in the meantime.
+        snapshots = await plc.read_snapshots(
+            use_cache=use_cache,
+            allow_stale=use_cache,
         )
+        ages = plc.get_register_ages(snapshots)
+        quality = plc.get_register_quality(snapshots)
+
+        if not delta:
+            registers: dict[str, Any] = {}
+            for snapshot in snapshots.values():
+                registers.update(snapshot)
+
+            command.info(
+                registers=registers,
+                register_ages=ages,
+                register_quality=quality,
+                register_overrides=list(overrides.keys()),
+            )
+        else:
+            changes = plc.get_register_changes(
+                command.actor.status_baseline,
+                snapshots,
+                update=False,
+            )
+            if len(changes) > 0:
+                command.info(
+                    registers_delta=changes.as_dict(),
+                    register_ages={name: ages.get(name) for name in changes.names},
+                    register_quality={
+                        name: quality.get(name) for name in changes.names
+                    },
+                )
 
     modules: list[PLCModule] = [plc.dome, plc.safety, plc.lights]
     await asyncio.gather(
         *[
             module.update(
-                force_output=True,
+                force_output=not delta,
                 command=command,
                 use_cache=True,
+                max_age=module.modbus.stale_max_age if use_cache else None,
             )
             for module in modules
         ]
@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: cache.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import math
+import time
+
+from typing import TYPE_CHECKING, Iterable, Mapping
+
+import numpy
+
+from lvmecp.snapshot import Quality
+
+
+if TYPE_CHECKING:
+    from lvmecp.planner import ReadPlan
+    from lvmecp.snapshot import RegisterSnapshot, SnapshotView
+
+
+__all__ = ["RegisterCache"]
+
+
+#: Maximum number of sets of register names whose positions are cached.
+MAX_CACHED_NAME_SETS = 256
+
+
+class RegisterCache:
+    """Tracks the latest value and the age of each register.
+
+    Values are not copied. For each register the cache keeps the most recent
+    `.RegisterSnapshot` that contains it, whose images hold the raw data, and
+    the :func:`time.monotonic` time at which it was read. The times are stored
+    in a numpy array in the order of `.names`, so the age and staleness of any
+    set of registers are computed with one vectorised operation instead of a
+    lookup per register.
+
+    The cache also keeps a watermark with the time of its oldest entry. The
+    watermark is set without scanning the entries when a snapshot updates all
+    the registers, and is only recomputed, with a single `numpy.min`, the first
+    time it is needed after a partial update. Checking whether all the
+    registers are fresh does not depend on the number of registers.
+
+    Writes only expire the registers that were written (see `.invalidate`).
+    The cache records the write generation of each register, so snapshots of
+    scans that started before a write are not used as fresh values of the
+    written registers, but can still be returned as stale values.
+
+    Parameters
+    ----------
+    max_ages
+        A mapping of register name to the maximum age, in seconds, of its
+        cached value, or :obj:`None` to use the ``timeout`` passed to the
+        freshness checks. The maximum ages are fixed when the cache is created.
+
+    """
+
+    def __init__(self, max_ages: Mapping[str, float | None]):
+        self.names = tuple(max_ages)
+        self.slots = {name: slot for slot, name in enumerate(self.names)}
+
+        size = len(self.names)
+
+        #: The maximum age of each register, or NaN to use the timeout.
+        self.max_ages = numpy.array(
+            [math.nan if age is None else age for age in max_ages.values()],
+            dtype=numpy.float64,
+        )
+
+        #: The monotonic time at which each register was last read.
+        self.monotonic = numpy.full(size, -math.inf, dtype=numpy.float64)
+
+        #: The latest snapshot that contains each register.
+        self.snapshots = numpy.full(size, None, dtype=object)
+
+        #: The write generation, increased with each write (see `.invalidate`).
+        self.generation: int = 0
+
+        #: The write generation at which each register was last written.
+        self.generations = numpy.zeros(size, dtype=numpy.int64)
+
+        self._oldest = -math.inf
+        self._oldest_valid = True
+
+        self._limits: tuple[float, numpy.ndarray, float] | None = None
+        self._plan_slots: dict[int, tuple[ReadPlan, numpy.ndarray]] = {}
+        self._name_slots: dict[tuple[str, ...], numpy.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.slots
+
+    def __repr__(self) -> str:
+        return f"<RegisterCache (n_registers={len(self)}, oldest={self.oldest_age})>"
+
+    def get_slots(self, names: Iterable[str]) -> numpy.ndarray:
+        """Returns the positions of some registers in the arrays of the cache.
+
+        Raises :obj:`KeyError` if a register is not in the cache. The positions
+        for each set of names are cached.
+
+        """
+
+        names = tuple(names)
+
+        slots = self._name_slots.get(names)
+        if slots is None:
+            slots = numpy.array([self.slots[name] for name in names], numpy.intp)
+
+            if len(self._name_slots) >= MAX_CACHED_NAME_SETS:
+                self._name_slots.clear()
+            self._name_slots[names] = slots
+
+        return slots
+
+    def get_plan_slots(self, plan: ReadPlan) -> numpy.ndarray:
+        """Returns the positions of the registers of a plan that are in the cache."""
+
+        entry = self._plan_slots.get(id(plan))
+        if entry is None or entry[0] is not plan:
+            names = [name for name in plan.by_name if name in self.slots]
+            entry = (plan, self.get_slots(names))
+            self._plan_slots[id(plan)] = entry
+
+        return entry[1]
+
+    def written_since(self, slots: numpy.ndarray, generation: int) -> numpy.ndarray:
+        """Returns whether each register has been written after a generation."""
+
+        return self.generations[slots] > generation
+
+    def update(self, snapshot: RegisterSnapshot):
+        """Records a snapshot as the latest value of the registers it contains.
+
+        Registers for which the cache already has a more recent snapshot,
+        registers written after the scan started, and registers that are not in
+        the cache, are not updated.
+
+        """
+
+        slots = self.get_plan_slots(snapshot.plan)
+        started = snapshot.monotonic
+
+        newer = slots[
+            (self.monotonic[slots] <= started)
+            & ~self.written_since(slots, snapshot.generation)
+        ]
+        if len(newer) == 0:
+            return
+
+        # Assign the snapshot from an array so that numpy does not try to
+        # unpack the mapping.
+        value = numpy.empty(1, dtype=object)
+        value[0] = snapshot
+
+        self.monotonic[newer] = started
+        self.snapshots[newer] = value
+
+        if len(newer) == len(self.names):
+            self._oldest = started
+            self._oldest_valid = True
+        else:
+            self._oldest_valid = False
+
+    def invalidate(self, names: Iterable[str] | None = None):
+        """Marks some entries (or all) as expired after they have been written.
+
+        Increases the write `.generation`. The snapshots of the registers are
+        kept, so that `.get` can still return them as stale values, but they
+        are not fresh any more, and snapshots of scans that started with an
+        earlier generation are not cached for these registers.
+
+        """
+
+        slots = slice(None) if names is None else self.get_slots(names)
+
+        self.generation += 1
+
+        self.monotonic[slots] = -math.inf
+        self.generations[slots] = self.generation
+
+        if names is None:
+            self._oldest = -math.inf
+            self._oldest_valid = True
+        else:
+            self._oldest_valid = False
+
+    @property
+    def oldest(self) -> float:
+        """The monotonic time of the oldest entry, or ``-inf`` if any is missing."""
+
+        if not self._oldest_valid:
+            self._oldest = float(self.monotonic.min(initial=math.inf))
+            self._oldest_valid = True
+
+        return self._oldest
+
+    @property
+    def oldest_age(self) -> float:
+        """The age of the oldest entry, or ``inf`` if a register has not been read."""
+
+        return time.monotonic() - self.oldest
+
+    def latest(self, name: str) -> RegisterSnapshot | None:
+        """Returns the latest snapshot that contains a register, if any."""
+
+        return self.snapshots[self.slots[name]]
+
+    def age(self, name: str) -> float:
+        """Returns the seconds since a register was read, or ``inf`` if never."""
+
+        return time.monotonic() - float(self.monotonic[self.slots[name]])
+
+    def ages(self, names: Iterable[str] | None = None) -> numpy.ndarray:
+        """Returns the age of each register in ``names`` (or of all registers)."""
+
+        if names is None:
+            return time.monotonic() - self.monotonic
+
+        return time.monotonic() - self.monotonic[self.get_slots(names)]
+
+    def limits(self, timeout: float) -> numpy.ndarray:
+        """Returns the maximum age of each register, using ``timeout`` if unset."""
+
+        if self._limits is None or self._limits[0] != timeout:
+            limits = numpy.where(numpy.isnan(self.max_ages), timeout, self.max_ages)
+            self._limits = (timeout, limits, float(limits.min(initial=timeout)))
+
+        return self._limits[1]
+
+    def get_max_age(self, names: Iterable[str] | None, timeout: float) -> float:
+        """Returns the maximum age of a value that includes all ``names``.
+
+        This is the minimum of the maximum ages of the registers. If ``names``
+        is :obj:`None`, returns the value for all the registers without
+        computing it again, unless ``timeout`` has changed.
+
+        """
+
+        limits = self.limits(timeout)
+
+        if names is None:
+            assert self._limits is not None
+            return self._limits[2]
+
+        slots = self.get_slots(names)
+        if len(slots) == 0:
+            return timeout
+
+        return float(limits[slots].min())
+
+    def stale(self, names: Iterable[str] | None = None, timeout: float = 1.0):
+        """Returns a boolean array with whether each register has expired."""
+
+        if names is None:
+            return self.ages() >= self.limits(timeout)
+
+        slots = self.get_slots(names)
+
+        return time.monotonic() - self.monotonic[slots] >= self.limits(timeout)[slots]
+
+    def is_fresh(self, names: Iterable[str] | None = None, timeout: float = 1.0):
+        """Returns whether none of the registers in ``names`` has expired.
+
+        If ``names`` is :obj:`None`, checks all the registers against the
+        watermark of the oldest entry and the smallest maximum age.
+
+        """
+
+        if names is None:
+            return self.oldest_age < self.get_max_age(None, timeout)
+
+        return not self.stale(names, timeout).any()
+
+    def get(
+        self,
+        names: Iterable[str],
+        timeout: float = 1.0,
+        max_age: float | None = None,
+    ) -> SnapshotView | None:
+        """Returns a view of a cached snapshot that contains all ``names``.
+
+        Parameters
+        ----------
+        names
+            The names of the registers.
+        timeout
+            The maximum age of the registers without a ``max_age``.
+        max_age
+            The maximum age, in seconds, that the caller accepts. If it is longer
+            than the maximum age of the registers, a snapshot older than the
+            latter, or one read before some of the registers were written, can
+            be returned, with `.Quality.STALE`.
+
+        Returns
+        -------
+        view
+            A `.SnapshotView` of the registers, or :obj:`None` if a register is
+            not in the cache or has not been read within the accepted age, or
+            if no single snapshot covers all the registers.
+
+        """
+
+        names = tuple(names)
+
+        try:
+            slots = self.get_slots(names)
+        except KeyError:
+            return None
+
+        if len(slots) == 0:
+            return None
+
+        limit = self.get_max_age(names, timeout)
+        accepted = limit if max_age is None else max(limit, max_age)
+
+        candidates: dict[int, RegisterSnapshot] = {}
+        for snapshot in self.snapshots[slots]:
+            if snapshot is None:
+                return None
+            candidates[id(snapshot)] = snapshot
+
+        for snapshot in candidates.values():
+            age = snapshot.age
+            if age >= accepted:
+                continue
+            if not snapshot.plan.names.issuperset(names):
+                continue
+
+            written = self.written_since(slots, snapshot.generation).any()
+            if written and max_age is None:
+                continue
+
+            good = age < limit and not written
+            return snapshot.view(names, quality=Quality.GOOD if good else Quality.STALE)
+
+        return None
@@ -0,0 +1,475 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: compaction.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import pathlib
+import struct
+import zlib
+
+from typing import Any, Iterable, Mapping
+
+import numpy
+
+from lvmecp.archive import ArchiveReader
+from lvmecp.decoders import FLOAT_DECIMALS
+from lvmecp.history import RegisterLayout
+
+
+__all__ = [
+    "compact",
+    "CompactReader",
+    "encode_column",
+    "decode_column",
+]
+
+
+#: Magic bytes at the start and at the end of a compacted file.
+MAGIC = b"LVMECPCZ"
+
+#: Version of the compacted format.
+VERSION = 1
+
+#: The length of the JSON directory and the magic bytes, at the end of the file.
+FOOTER = struct.Struct("<Q8s")
+
+#: Default number of records in each chunk (one hour at 10 Hz).
+CHUNK_SIZE = 36000
+
+#: Default precision of the floats. Decoded floats are already rounded to it.
+PRECISION = 10.0**-FLOAT_DECIMALS
+
+#: Precision, in seconds, of the timestamps.
+TIME_PRECISION = 1e-6
+
+#: The zlib compression level.
+COMPRESSION_LEVEL = 6
+
+#: Largest quantised value, so that the deltas of two values fit in an int64.
+MAX_QUANTISED = 2**62
+
+
+def _get_int_dtype(values: numpy.ndarray) -> numpy.dtype:
+    """Returns the smallest signed integer type that can hold some values."""
+
+    if values.size == 0:
+        return numpy.dtype(numpy.int8)
+
+    low = int(values.min())
+    high = int(values.max())
+
+    for dtype in (numpy.int8, numpy.int16, numpy.int32):
+        info = numpy.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return numpy.dtype(dtype)
+
+    return numpy.dtype(numpy.int64)
+
+
+def _get_uint_dtype(high: int) -> numpy.dtype:
+    """Returns the smallest unsigned integer type that can hold ``high``."""
+
+    for dtype in (numpy.uint8, numpy.uint16, numpy.uint32):
+        if high <= numpy.iinfo(dtype).max:
+            return numpy.dtype(dtype)
+
+    return numpy.dtype(numpy.uint64)
+
+
+def _encode_deltas(values: numpy.ndarray) -> tuple[dict[str, Any], bytes]:
+    """Encodes integers as the differences between consecutive rows."""
+
+    deltas = numpy.diff(values.astype(numpy.int64), axis=0, prepend=0)
+    dtype = _get_int_dtype(deltas)
+
+    # Column-major, so that the values of each element are contiguous.
+    data = deltas.astype(dtype).tobytes(order="F")
+
+    return {"dtype": dtype.str}, data
+
+
+def _decode_deltas(spec: dict[str, Any], data: bytes) -> numpy.ndarray:
+    """Decodes the differences between consecutive rows into values."""
+
+    shape = tuple(spec["shape"])
+    deltas = numpy.frombuffer(data, dtype=spec["dtype"]).reshape(shape, order="F")
+
+    return numpy.cumsum(deltas, axis=0, dtype=numpy.int64)
+
+
+def encode_column(
+    values: numpy.ndarray,
+    precision: float | None = PRECISION,
+) -> tuple[dict[str, Any], bytes]:
+    """Encodes an array of values of a register.
+
+    The encoding depends on the type of the values:
+
+    - Booleans are stored as the lengths of the runs of equal values (``rle``),
+      or packed eight per byte (``bits``) if that is smaller.
+    - Integers are stored as the differences between consecutive values
+      (``delta``), with the smallest integer type that holds them.
+    - Floats are divided by ``precision`` and rounded, and the resulting
+      integers are stored as differences (``quantised``). The values decoded
+      differ from the originals by at most half of ``precision``. Floats that
+      are not finite, or if ``precision`` is :obj:`None`, are stored unchanged
+      (``raw``).
+
+    Arrays with more than one dimension are encoded along the first axis. The
+    encoded data are then compressed with :mod:`zlib`.
+
+    Parameters
+    ----------
+    values
+        The values to encode.
+    precision
+        The precision of the decoded floats.
+
+    Returns
+    -------
+    column
+        A tuple with a dictionary with the parameters needed to decode the data
+        (see `.decode_column`) and the compressed data.
+
+    """
+
+    spec: dict[str, Any] = {"shape": list(values.shape)}
+
+    if values.dtype == numpy.bool_:
+        flat = values.ravel(order="F")
+
+        changes = numpy.flatnonzero(flat[1:] != flat[:-1]) + 1
+        runs = numpy.diff(changes, prepend=0, append=len(flat))
+
+        dtype = _get_uint_dtype(int(runs.max(initial=0)))
+        if len(flat) > 0 and len(runs) * dtype.itemsize < math.ceil(len(flat) / 8):
+            spec.update(encoding="rle", dtype=dtype.str, first=bool(flat[0]))
+            data = runs.astype(dtype).tobytes()
+        else:
+            spec.update(encoding="bits")
+            data = numpy.packbits(flat, bitorder="little").tobytes()
+
+    elif values.dtype.kind in "iu":
+        params, data = _encode_deltas(values)
+        spec.update(encoding="delta", value_dtype=values.dtype.str, **params)
+
+    elif (
+        values.dtype.kind == "f"
+        and precision is not None
+        and bool(numpy.isfinite(values).all())
+        and float(numpy.abs(values).max(initial=0)) / precision < MAX_QUANTISED
+    ):
+        quantised = numpy.round(values / precision)
+        params, data = _encode_deltas(quantised)
+
+        decimals = max(0, math.ceil(-math.log10(precision)))
+        spec.update(
+            encoding="quantised",
+            precision=precision,
+            decimals=decimals,
+            **params,
+        )
+
+    else:
+        spec.update(encoding="raw", dtype=values.dtype.str)
+        data = values.tobytes(order="F")
+
+    return spec, zlib.compress(data, COMPRESSION_LEVEL)
+
+
+def decode_column(spec: dict[str, Any], data: bytes | memoryview) -> numpy.ndarray:
+    """Decodes the values of a column encoded with `.encode_column`."""
+
+    data = zlib.decompress(data)
+
+    encoding = spec["encoding"]
+    shape = tuple(spec["shape"])
+    size = math.prod(shape)
+
+    if encoding == "rle":
+        runs = numpy.frombuffer(data, dtype=spec["dtype"])
+        values = (numpy.arange(len(runs)) & 1).astype(numpy.bool_) ^ spec["first"]
+        flat = numpy.repeat(values, runs)
+
+    elif encoding == "bits":
+        packed = numpy.frombuffer(data, dtype=numpy.uint8)
+        flat = numpy.unpackbits(packed, count=size, bitorder="little").view(numpy.bool_)
+
+    elif encoding == "delta":
+        return _decode_deltas(spec, data).astype(spec["value_dtype"])
+
+    elif encoding == "quantised":
+        values = _decode_deltas(spec, data) * spec["precision"]
+        return numpy.round(values, spec["decimals"])
+
+    elif encoding == "raw":
+        flat = numpy.frombuffer(data, dtype=spec["dtype"])
+
+    else:
+        raise ValueError(f"Unknown encoding {encoding!r}.")
+
+    return flat.reshape(shape, order="F")
+
+
+def compact(
+    source: str | os.PathLike | ArchiveReader,
+    output: str | os.PathLike | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    precision: float | None | Mapping[str, float | None] = PRECISION,
+) -> pathlib.Path:
+    """Compacts an archive file into compressed columnar chunks.
+
+    The records of the archive are split in chunks of ``chunk_size`` records.
+    In each chunk, the timestamps, and for each register the mask of the
+    records in which it was read and its decoded values in those records, are
+    encoded as separate columns with `.encode_column`. The file starts with
+    the magic bytes and ends with a JSON directory with the registers, the
+    position and encoding of each column, and the time span of each chunk,
+    followed by its length and the magic bytes again. Use `.CompactReader` to
+    read it.
+
+    Parameters
+    ----------
+    source
+        The path to the archive file, or an `.ArchiveReader`.
+    output
+        The path of the compacted file. Defaults to the path of the archive
+        with the extension ``.ecpz``.
+    chunk_size
+        The number of records in each chunk.
+    precision
+        The precision of the floats, or a mapping of register name to precision
+        (registers that are not in the mapping use `.PRECISION`). If
+        :obj:`None`, the floats are stored without loss.
+
+    Returns
+    -------
+    path
+        The path to the compacted file.
+
+    """
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least one.")
+
+    reader = source if isinstance(source, ArchiveReader) else ArchiveReader(source)
+    output = pathlib.Path(output or reader.path.with_suffix(".ecpz"))
+
+    if isinstance(precision, Mapping):
+        precisions = {name: precision.get(name, PRECISION) for name in reader.names}
+    else:
+        precisions = dict.fromkeys(reader.names, precision)
+
+    try:
+        with open(output, "wb") as file:
+            file.write(MAGIC)
+
+            def write_column(values: numpy.ndarray, precision: float | None = None):
+                spec, data = encode_column(values, precision=precision)
+                spec.update(offset=file.tell(), size=len(data))
+                file.write(data)
+                return spec
+
+            chunks: list[dict[str, Any]] = []
+            for first in range(0, len(reader), chunk_size):
+                rows = numpy.arange(first, min(first + chunk_size, len(reader)))
+                times = reader.timestamps[rows]
+
+                registers: dict[str, Any] = {}
+                for name, layout in reader.layouts.items():
+                    read = reader.mask(name, rows)
+                    values = layout.decode(reader.images[layout.mode], rows[read])
+
+                    registers[name] = {
+                        "read": write_column(read),
+                        "values": write_column(values, precisions[name]),
+                    }
+
+                chunks.append(
+                    {
+                        "n_records": len(rows),
+                        "start": float(times[0]),
+                        "end": float(times[-1]),
+                        "timestamp": write_column(times, TIME_PRECISION),
+                        "registers": registers,
+                    }
+                )
+
+            source_header = {
+                key: value
+                for key, value in reader.header.items()
+                if key not in ("fields", "record_size", "registers", "version")
+            }
+
+            directory = {
+                "version": VERSION,
+                "source": source_header,
+                "registers": reader.header["registers"],
+                "n_records": len(reader),
+                "chunks": chunks,
+            }
+
+            encoded = json.dumps(directory).encode()
+            file.write(encoded)
+            file.write(FOOTER.pack(len(encoded), MAGIC))
+
+    finally:
+        if reader is not source:
+            reader.close()
+
+    return output
+
+
+class CompactReader:
+    """Reads a file written by `.compact`.
+
+    The file is memory-mapped and only the chunks that overlap the requested
+    time range are decompressed and decoded. The timestamps of each chunk are
+    decoded once and shared by all the registers.
+
+    The reader can be used as a context manager to close the file.
+
+    Parameters
+    ----------
+    path
+        The path to the compacted file.
+
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = pathlib.Path(path)
+
+        self._file = open(self.path, "rb")
+
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{self.path!s} is not a compacted archive.")
+
+        size = len(self._mmap)
+        if size < len(MAGIC) + FOOTER.size or self._mmap[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path!s} is not a compacted archive.")
+
+        length, magic = FOOTER.unpack(self._mmap[size - FOOTER.size :])
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path!s} is incomplete.")
+
+        start = size - FOOTER.size - length
+        self.header: dict[str, Any] = json.loads(self._mmap[start : size - FOOTER.size])
+
+        if self.header["version"] != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported version {self.header['version']}.")
+
+        self.layouts = {
+            layout["name"]: RegisterLayout(**layout)
+            for layout in self.header["registers"]
+        }
+        self.names = tuple(self.layouts)
+        self.chunks: list[dict[str, Any]] = self.header["chunks"]
+
+        self._times: dict[int, numpy.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.header["n_records"]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.layouts
+
+    def __repr__(self) -> str:
+        return f"<CompactReader (path={self.path!s}, n_records={len(self)})>"
+
+    def __enter__(self) -> CompactReader:
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Closes the file."""
+
+        self._mmap.close()
+        self._file.close()
+
+    def get(
+        self,
+        name: str,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """Returns the time series of a register.
+
+        See `.RecordTable.get` for the parameters and the returned values.
+
+        """
+
+        if name not in self.layouts:
+            raise KeyError(f"Register {name!r} not in archive.")
+
+        lower = -math.inf if start is None else start
+        upper = math.inf if end is None else end
+
+        times: list[numpy.ndarray] = []
+        values: list[numpy.ndarray] = []
+
+        for index, chunk in enumerate(self.chunks):
+            if chunk["end"] < lower or chunk["start"] > upper:
+                continue
+
+            column = chunk["registers"][name]
+            read = self._read_column(column["read"])
+
+            chunk_times = self._get_times(index)[read]
+            chunk_values = self._read_column(column["values"])
+
+            if chunk["start"] < lower or chunk["end"] > upper:
+                in_range = (chunk_times >= lower) & (chunk_times <= upper)
+                chunk_times = chunk_times[in_range]
+                chunk_values = chunk_values[in_range]
+
+            times.append(chunk_times)
+            values.append(chunk_values)
+
+        if len(times) == 0:
+            return numpy.zeros(0), numpy.zeros(0)
+
+        return numpy.concatenate(times), numpy.concatenate(values)
+
+    def load(
+        self,
+        names: Iterable[str] | None = None,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> dict[str, tuple[numpy.ndarray, numpy.ndarray]]:
+        """Returns the time series of several registers (by default, all)."""
+
+        names = self.names if names is None else names
+
+        return {name: self.get(name, start=start, end=end) for name in names}
+
+    def _get_times(self, index: int) -> numpy.ndarray:
+        """Returns the timestamps of the records of a chunk."""
+
+        if index not in self._times:
+            self._times[index] = self._read_column(self.chunks[index]["timestamp"])
+
+        return self._times[index]
+
+    def _read_column(self, spec: dict[str, Any]) -> numpy.ndarray:
+        """Decodes a column."""
+
+        offset = spec["offset"]
+
+        return decode_column(spec, self._mmap[offset : offset + spec["size"]])
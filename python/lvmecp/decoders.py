@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: decoders.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass, field
+from functools import cached_property
+
+from typing import TYPE_CHECKING, Any, Literal, Sequence
+
+import numpy
+
+
+if TYPE_CHECKING:
+    from lvmecp.modbus import ModbusRegister
+    from lvmecp.planner import ReadPlan
+
+
+__all__ = [
+    "Decoder",
+    "BatchDecoder",
+    "DECODERS",
+    "decode_words",
+    "get_decoder",
+    "register_decoder",
+]
+
+
+#: Number of decimals to which decoded floats and scaled values are rounded.
+FLOAT_DECIMALS = 3
+
+ByteOrder = Literal["big", "little"]
+
+
+@dataclass(frozen=True)
+class Decoder:
+    """Decodes a value stored in one or more consecutive words.
+
+    Parameters
+    ----------
+    name
+        The name of the decoder, used as the ``decoder`` of a register.
+    format
+        The :mod:`struct` format character of the value (e.g., ``h`` for a
+        signed 16-bit integer or ``f`` for a 32-bit float). The size of the
+        value must be a multiple of two bytes.
+
+    """
+
+    name: str
+    format: str
+    struct: struct.Struct = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        value_struct = struct.Struct(f">{self.format}")
+        if value_struct.size % 2 != 0:
+            raise ValueError(f"Decoder {self.name!r} does not fill whole words.")
+
+        object.__setattr__(self, "struct", value_struct)
+
+    @cached_property
+    def count(self) -> int:
+        """The number of words of the value."""
+
+        return self.struct.size // 2
+
+    @cached_property
+    def dtype(self) -> numpy.dtype:
+        """The big-endian numpy type of the value."""
+
+        return numpy.dtype(f">{self.format}")
+
+    @property
+    def is_float(self) -> bool:
+        """Whether the decoded value is a float."""
+
+        return self.dtype.kind == "f"
+
+    def decode(
+        self,
+        words: Sequence[int],
+        byteorder: ByteOrder = "big",
+        wordorder: ByteOrder = "little",
+    ) -> int | float:
+        """Decodes a single value from its words. See `.decode_words`."""
+
+        if wordorder == "little":
+            words = words[::-1]
+
+        endian = ">" if byteorder == "big" else "<"
+        data = struct.pack(f"{endian}{self.count}H", *words)
+
+        return self.struct.unpack(data)[0]
+
+
+#: Registry of decoders by name.
+DECODERS: dict[str, Decoder] = {}
+
+
+def register_decoder(name: str, format: str, aliases: Sequence[str] = ()) -> Decoder:
+    """Adds a `.Decoder` to the registry.
+
+    Parameters
+    ----------
+    name
+        The name of the decoder.
+    format
+        The :mod:`struct` format character of the value.
+    aliases
+        Other names for the decoder.
+
+    Returns
+    -------
+    decoder
+        The new `.Decoder`.
+
+    """
+
+    decoder = Decoder(name, format)
+
+    for key in (name, *aliases):
+        DECODERS[key] = decoder
+
+    return decoder
+
+
+def get_decoder(name: str) -> Decoder:
+    """Returns a decoder from the registry."""
+
+    if name not in DECODERS:
+        raise ValueError(f"Unknown decoder {name}")
+
+    return DECODERS[name]
+
+
+register_decoder("int16", "h")
+register_decoder("uint16", "H")
+register_decoder("int32", "i", aliases=["int_32bit"])
+register_decoder("uint32", "I", aliases=["uint_32bit"])
+register_decoder("float32", "f", aliases=["float_32bit"])
+register_decoder("float64", "d")
+
+
+def decode_words(
+    words: numpy.ndarray,
+    dtype: numpy.dtype | str,
+    byteorder: ByteOrder = "big",
+    wordorder: ByteOrder = "little",
+) -> numpy.ndarray:
+    """Decodes groups of 16-bit words into values.
+
+    Parameters
+    ----------
+    words
+        A ``(N, M)`` array with the ``M`` words of each value, in the order in
+        which they were read.
+    dtype
+        The type of the values. Its size must be ``M`` words.
+    byteorder
+        The order of the bytes in each word.
+    wordorder
+        The order of the words in each value. With ``little``, the first word
+        read contains the least significant bytes.
+
+    Returns
+    -------
+    values
+        An array with the ``N`` decoded values.
+
+    """
+
+    if wordorder == "little":
+        words = words[:, ::-1]
+
+    # Lay out the bytes of each value from most to least significant.
+    raw = numpy.ascontiguousarray(words, dtype=">u2" if byteorder == "big" else "<u2")
+
+    return raw.view(numpy.dtype(dtype).newbyteorder(">"))[:, 0]
+
+
+@dataclass
+class _ValueGroup:
+    """Registers decoded with the same operation."""
+
+    mode: str
+    decoder: Decoder
+    byteorder: ByteOrder
+    wordorder: ByteOrder
+    names: tuple[str, ...]
+    index: numpy.ndarray
+    scale: numpy.ndarray | None = None
+    offset: numpy.ndarray | None = None
+
+
+@dataclass
+class _BitGroup:
+    """Virtual boolean registers extracted from the bits of a word."""
+
+    mode: str
+    names: tuple[str, ...]
+    index: numpy.ndarray
+    shifts: numpy.ndarray
+
+
+class BatchDecoder:
+    """Decodes the registers of a plan with a compiled table of operations.
+
+    When created, the registers of the plan that need decoding (those with a
+    ``decoder``, a ``scale`` or ``offset``, or that are a bit of another
+    register) are compiled into groups that are decoded with the same numpy
+    operations: registers with the same data block, `.Decoder`, and byte and
+    word order, and virtual booleans of the same data block. Each group stores
+    the position of the words of its registers in the images of a
+    `.RegisterSnapshot` and, for scaled registers, arrays with the scale and
+    offset. Decoding a scan is then one gather, conversion, and scaling for
+    each group, without per-register branching. Floats and scaled values are
+    rounded to `.FLOAT_DECIMALS` decimals.
+
+    Registers that do not need decoding are not included.
+
+    Parameters
+    ----------
+    plan
+        The `.ReadPlan` with the registers to decode.
+
+    """
+
+    def __init__(self, plan: ReadPlan):
+        values: dict[tuple, dict[str, ModbusRegister]] = {}
+        bits: dict[str, dict[str, ModbusRegister]] = {}
+
+        for name, register in plan.by_name.items():
+            mode, _ = plan.index[name]
+
+            if register.bit is not None:
+                bits.setdefault(mode, {})[name] = register
+            elif register.codec is not None:
+                scaled = register.scale is not None or register.offset is not None
+                key = (
+                    mode,
+                    register.codec,
+                    register.byteorder,
+                    register.wordorder,
+                    scaled,
+                )
+                values.setdefault(key, {})[name] = register
+
+        self.groups: list[_ValueGroup] = []
+        for key, registers in values.items():
+            mode, decoder, byteorder, wordorder, scaled = key
+
+            # The index of the words of each register in the image.
+            positions = [plan.index[name][1] for name in registers]
+            index = numpy.array(positions, dtype=numpy.intp)[:, None]
+            index = index + numpy.arange(decoder.count, dtype=numpy.intp)
+
+            group = _ValueGroup(
+                mode,
+                decoder,
+                byteorder,
+                wordorder,
+                tuple(registers),
+                index,
+            )
+
+            if scaled:
+                scales = [
+                    1 if reg.scale is None else reg.scale for reg in registers.values()
+                ]
+                offsets = [reg.offset or 0 for reg in registers.values()]
+                group.scale = numpy.array(scales)
+                group.offset = numpy.array(offsets)
+
+            self.groups.append(group)
+
+        self.bit_groups: list[_BitGroup] = []
+        for mode, registers in bits.items():
+            positions = [plan.index[name][1] for name in registers]
+            shifts = [reg.bit for reg in registers.values()]
+
+            self.bit_groups.append(
+                _BitGroup(
+                    mode,
+                    tuple(registers),
+                    numpy.array(positions, dtype=numpy.intp),
+                    numpy.array(shifts, dtype=numpy.uint16),
+                )
+            )
+
+        self.names = frozenset(
+            name for group in [*self.groups, *self.bit_groups] for name in group.names
+        )
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def decode(self, images: dict[str, numpy.ndarray]) -> dict[str, Any]:
+        """Decodes the registers from the images of a `.RegisterSnapshot`."""
+
+        values: dict[str, Any] = {}
+
+        for group in self.groups:
+            decoded = decode_words(
+                images[group.mode][group.index],
+                group.decoder.dtype,
+                group.byteorder,
+                group.wordorder,
+            )
+
+            if group.scale is not None:
+                decoded = decoded * group.scale + group.offset
+
+            if decoded.dtype.kind == "f":
+                decoded = numpy.round(decoded.astype(numpy.float64), FLOAT_DECIMALS)
+
+            values.update(zip(group.names, decoded.tolist()))
+
+        for group in self.bit_groups:
+            decoded = (images[group.mode][group.index] >> group.shifts) & 1
+            values.update(zip(group.names, decoded.astype(numpy.bool_).tolist()))
+
+        return values
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: diff.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy
+
+from lvmecp.planner import BIT_MODES
+
+
+if TYPE_CHECKING:
+    from lvmecp.snapshot import RegisterSnapshot
+
+
+__all__ = ["ChangeSet", "diff_snapshots"]
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """The registers whose values changed between two snapshots.
+
+    Parameters
+    ----------
+    names
+        The names of the registers that changed, in read order.
+    old
+        The previous value of each register, or :obj:`None` if the register
+        was not in the previous snapshot.
+    new
+        The new value of each register.
+    timestamp
+        The Unix time at which the new snapshot was acquired.
+
+    """
+
+    names: tuple[str, ...]
+    old: tuple[Any, ...]
+    new: tuple[Any, ...]
+    timestamp: float
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"<ChangeSet (n_changes={len(self)}, timestamp={self.timestamp:.3f})>"
+
+    def as_dict(self) -> dict[str, Any]:
+        """Returns a mapping of register name to its new value."""
+
+        return dict(zip(self.names, self.new))
+
+    @classmethod
+    def merge(cls, change_sets: Iterable[ChangeSet]) -> ChangeSet:
+        """Concatenates several change sets, for example from different servers.
+
+        The timestamp of the merged change set is the latest of the timestamps.
+
+        """
+
+        change_sets = list(change_sets)
+
+        return cls(
+            names=tuple(name for cs in change_sets for name in cs.names),
+            old=tuple(value for cs in change_sets for value in cs.old),
+            new=tuple(value for cs in change_sets for value in cs.new),
+            timestamp=max((cs.timestamp for cs in change_sets), default=0.0),
+        )
+
+
+def diff_snapshots(old: RegisterSnapshot | None, new: RegisterSnapshot) -> ChangeSet:
+    """Returns the registers whose values are different in two snapshots.
+
+    If both snapshots were acquired with the same `.ReadPlan`, their images are
+    compared in one vectorised operation per data block (the packed bits are
+    compared byte by byte and only unpacked if any of them differ), and only
+    the registers that contain an element that changed are decoded. This is
+    the case for consecutive full scans of a `.Modbus` connection. Otherwise,
+    the decoded values of all the registers in ``new`` are compared.
+
+    Parameters
+    ----------
+    old
+        The previous snapshot. If :obj:`None`, all the registers in ``new`` are
+        returned as changed.
+    new
+        The new snapshot.
+
+    Returns
+    -------
+    change_set
+        A `.ChangeSet` with the registers that changed.
+
+    """
+
+    if old is None:
+        names = tuple(new)
+        return ChangeSet(
+            names=names,
+            old=(None,) * len(names),
+            new=tuple(new[name] for name in names),
+            timestamp=new.timestamp,
+        )
+
+    if old.plan is new.plan:
+        candidates = _get_changed_registers(old, new)
+    else:
+        candidates = list(new)
+
+    # Overridden values do not come from the images.
+    overrides = old._overrides.keys() | new._overrides.keys()
+    if len(overrides) > 0:
+        candidates = [name for name in new if name in overrides or name in candidates]
+
+    names: list[str] = []
+    old_values: list[Any] = []
+    new_values: list[Any] = []
+
+    for name in candidates:
+        old_value = old.get(name, None)
+        new_value = new[name]
+
+        # Registers that share a word with others (e.g., single bits of a word)
+        # may not have changed even if the word did.
+        if name in old and old_value == new_value:
+            continue
+
+        names.append(name)
+        old_values.append(old_value)
+        new_values.append(new_value)
+
+    return ChangeSet(
+        names=tuple(names),
+        old=tuple(old_values),
+        new=tuple(new_values),
+        timestamp=new.timestamp,
+    )
+
+
+def _get_changed_registers(old: RegisterSnapshot, new: RegisterSnapshot) -> list[str]:
+    """Returns the registers with an element that changed, in read order.
+
+    Both snapshots must have been acquired with the same plan.
+
+    """
+
+    plan = new.plan
+    changed_ids: list[numpy.ndarray] = []
+
+    for mode, (starts, ends, ids) in plan.spans.items():
+        old_image = old.images[mode]
+        new_image = new.images[mode]
+
+        if mode in BIT_MODES:
+            diff = old_image ^ new_image
+            if not diff.any():
+                continue
+            changed = numpy.unpackbits(diff, bitorder="little")
+        else:
+            changed = old_image != new_image
+            if not changed.any():
+                continue
+
+        # Number of changed elements before each position. A register changed if
+        # the count at its end is larger than at its start.
+        counts = numpy.zeros(len(changed) + 1, dtype=numpy.intp)
+        numpy.cumsum(changed, out=counts[1:])
+
+        changed_ids.append(ids[counts[ends] > counts[starts]])
+
+    if len(changed_ids) == 0:
+        return []
+
+    names = tuple(plan.by_name)
+
+    return [names[ii] for ii in numpy.sort(numpy.concatenate(changed_ids))]
@@ -10,9 +10,8 @@ from __future__ import annotations
 
 import asyncio
 from time import time
-from types import SimpleNamespace
 
-from typing import Literal
+from typing import TYPE_CHECKING, Any, AsyncIterator, Literal, Mapping
 
 import numpy
 from astropy.time import Time
@@ -24,7 +23,11 @@ from lvmecp.maskbits import DomeStatus, SafetyStatus
 from lvmecp.module import PLCModule
 
 
-MOVE_CHECK_INTERVAL: float = 0.5
+if TYPE_CHECKING:
+    from lvmecp.scheduler import Subscription
+
+
+MOVE_CHECK_INTERVAL: float = 0.2
 AFTER_STOP_DELAY: float = 5
 
 DRIVE_MODE_TYPE = Literal["normal", "overcurrent"]
@@ -36,16 +39,51 @@ class DomeController(PLCModule[DomeStatus]):
     flag = DomeStatus
     interval = 15.0
 
+    #: Registers polled at a high rate while the dome is moving. All are coils
+    #: in the same block, so they can be read in a single request.
+    motion_registers = [
+        "drive_enabled",
+        "motor_direction",
+        "dome_open",
+        "dome_closed",
+        "dome_error",
+    ]
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         # Timestamps when we have opened the dome. For the anti-flap mechanism.
         self._open_attempt_times: list[float] = []
 
-    async def _update_internal(self, use_cache: bool = True, **kwargs):
-        dome_registers = await self.plc.modbus.read_group("dome", use_cache=use_cache)
+        # Fast polling of the motion registers while the dome is moving.
+        self._motion_subscription: Subscription | None = None
+        self._motion_tick: asyncio.Future | None = None
+        self._motion_waiters: int = 0
+        self._last_registers: dict[str, Any] | None = None
 
-        dome_status = SimpleNamespace(**dome_registers)
+    @property
+    def motion_interval(self) -> float:
+        """The polling interval while the dome is moving."""
+
+        return config["dome.motion_poll_interval"] or MOVE_CHECK_INTERVAL
+
+    async def _update_internal(
+        self,
+        use_cache: bool = True,
+        registers: Mapping[str, Any] | None = None,
+        max_age: float | None = None,
+        **kwargs,
+    ):
+        if registers is not None:
+            dome_status = registers
+        else:
+            dome_status = await self.modbus.read_group(
+                "dome",
+                use_cache=use_cache,
+                max_age=max_age,
+            )
+
+        self._last_registers = dict(dome_status)
 
         assert self.flag
         new_status = self.flag(0)
@@ -54,20 +92,20 @@ class DomeController(PLCModule[DomeStatus]):
         # does not exist any more, so we assume it is.
         new_status |= self.flag.DRIVE_AVAILABLE
 
-        if dome_status.dome_error or dome_status.drive_status1 > 0:
+        if dome_status["dome_error"] or dome_status["drive_status1"] > 0:
             new_status |= self.flag.DRIVE_ERROR
 
-        if dome_status.drive_enabled:
+        if dome_status["drive_enabled"]:
             new_status |= self.flag.DRIVE_ENABLED
             new_status |= self.flag.MOVING
-            if dome_status.motor_direction:
+            if dome_status["motor_direction"]:
                 new_status |= self.flag.MOTOR_OPENING
             else:
                 new_status |= self.flag.MOTOR_CLOSING
 
-        if dome_status.dome_open is True:
+        if dome_status["dome_open"] is True:
             new_status |= self.flag.OPEN
-        elif dome_status.dome_closed is True:
+        elif dome_status["dome_closed"] is True:
             new_status |= self.flag.CLOSED
         else:
             new_status |= self.flag.POSITION_UNKNOWN
@@ -75,20 +113,97 @@ class DomeController(PLCModule[DomeStatus]):
         if new_status.value == 0:
             new_status = self.flag(self.flag.__unknown__)
 
-        if dome_status.dome_open:
+        if dome_status["dome_open"]:
             percent_open = 1
-        elif dome_status.dome_closed:
+        elif dome_status["dome_closed"]:
             percent_open = 0
         else:
             full_open = config["dome.full_open_mm"]
-            percent_open = numpy.clip(dome_status.dome_position / full_open, 0, 1)
+            percent_open = numpy.clip(dome_status["dome_position"] / full_open, 0, 1)
 
         extra_info = {
             "dome_percent_open": round(float(percent_open) * 100, 1),
         }
 
+        if new_status & self.flag.DRIVE_ENABLED:
+            self.start_motion_polling()
+
         return new_status, extra_info
 
+    def start_motion_polling(self):
+        """Polls the motion registers at a high rate while the dome moves.
+
+        The motion registers are read every ``dome.motion_poll_interval``
+        seconds while the drive is enabled or someone is waiting for the move
+        to finish. Then the interval is doubled on each tick until it reaches
+        the idle interval of the module, at which point the fast polling stops.
+
+        """
+
+        if self.scheduler is None:
+            return
+
+        if self._motion_subscription is None:
+            self._motion_subscription = self.scheduler.subscribe(
+                "dome_motion",
+                self.motion_registers,
+                self.motion_interval,
+                self._on_motion_scan,
+            )
+        elif self._motion_subscription.interval != self.motion_interval:
+            self.scheduler.set_interval(self._motion_subscription, self.motion_interval)
+
+    async def _on_motion_scan(self, registers: Mapping[str, Any] | None):
+        """Handles a tick of the motion polling."""
+
+        tick, self._motion_tick = self._motion_tick, None
+        if tick is not None and not tick.done():
+            tick.set_result(registers)
+
+        subscription = self._motion_subscription
+        if registers is None or subscription is None or self.scheduler is None:
+            return
+
+        # Update the status using the last values of the other dome registers.
+        if self._last_registers is not None:
+            await self.update(registers={**self._last_registers, **registers})
+
+        if registers["drive_enabled"] or self._motion_waiters > 0:
+            if subscription.interval != self.motion_interval:
+                self.scheduler.set_interval(subscription, self.motion_interval)
+        elif self._interval is None or subscription.interval * 2 >= self._interval:
+            self._motion_subscription = None
+            await self.scheduler.unsubscribe(subscription)
+        else:
+            self.scheduler.set_interval(subscription, subscription.interval * 2)
+
+    async def _motion_ticks(self) -> AsyncIterator[Mapping[str, Any] | None]:
+        """Yields the motion registers each time they are read.
+
+        Yields :obj:`None` if the registers could not be read.
+
+        """
+
+        if self.scheduler is None:
+            while True:
+                await asyncio.sleep(self.motion_interval)
+                yield await self.modbus.read_registers(
+                    self.motion_registers,
+                    use_cache=False,
+                )
+
+        self._motion_waiters += 1
+        self.start_motion_polling()
+
+        try:
+            while True:
+                if self._motion_tick is None:
+                    loop = asyncio.get_running_loop()
+                    self._motion_tick = loop.create_future()
+                yield await asyncio.shield(self._motion_tick)
+        finally:
+            self._motion_waiters -= 1
+
     async def set_direction(self, open: bool):
         """Sets the motor direction (`True` means open, `False` close)."""
 
@@ -161,20 +276,26 @@ class DomeController(PLCModule[DomeStatus]):
                 return
             log.warning("Dome already at position but forcing.")
 
+        # Set the drive mode and the direction and enable the drive in a single
+        # session, so that no other request is sent in between.
+        setup: dict[str, int | bool] = {"motor_direction": open}
+
         if mode == "normal":
             log.debug("Setting drive mode to normal.")
-            await self.modbus["drive_mode_overcurrent"].write(0)
+            setup["drive_mode_overcurrent"] = 0
         elif mode == "overcurrent":
             log.debug("Setting drive mode to overcurrent.")
-            await self.modbus["drive_mode_overcurrent"].write(1)
+            setup["drive_mode_overcurrent"] = 1
 
-        log.debug("Setting motor_direction.")
-        await self.modbus["motor_direction"].write(open)
+        async with self.modbus.session() as session:
+            log.debug("Setting motor_direction.")
+            await session.write_many(setup)
 
-        await asyncio.sleep(0.1)
+            await session.sleep(0.1)
+            await session.verify(setup)
 
-        log.debug("Setting drive_enabled.")
-        await self.modbus["drive_enabled"].write(True)
+            log.debug("Setting drive_enabled.")
+            await session.write("drive_enabled", True)
 
         await asyncio.sleep(0.1)
 
@@ -187,33 +308,53 @@ class DomeController(PLCModule[DomeStatus]):
         await self.update(use_cache=False)
 
     async def _wait_until_movement_done(self, open: bool, timeout: float = 300):
-        """Blocks until the dome has finished moving."""
+        """Blocks until the dome has finished moving.
+
+        The motion registers are checked on each tick of the fast motion polling.
 
-        elapsed: float = 0.0
+        """
+
+        start_time = time()
         last_enabled: float = 0.0
-        while True:
-            await asyncio.sleep(MOVE_CHECK_INTERVAL)
-            elapsed += MOVE_CHECK_INTERVAL
+        last_read = start_time
 
-            if elapsed >= timeout:
-                raise DomeError("Timeout waiting for dome to finish moving.")
+        move_done_register = "dome_open" if open else "dome_closed"
 
-            drive_enabled = await self.modbus["drive_enabled"].read(use_cache=False)
+        ticks = self._motion_ticks()
 
-            move_done_register = self.modbus["dome_open" if open else "dome_closed"]
-            move_done = await move_done_register.read(use_cache=False)
+        try:
+            while True:
+                remaining = timeout - (time() - start_time)
 
-            if drive_enabled:
-                last_enabled = time()
+                try:
+                    registers = await asyncio.wait_for(anext(ticks), max(remaining, 0))
+                except asyncio.TimeoutError:
+                    raise DomeError("Timeout waiting for dome to finish moving.")
 
-            if not drive_enabled and move_done:
-                break
+                if registers is None:
+                    if time() - last_read > 5:
+                        raise DomeError("Failed reading the dome status.")
+                    continue
+
+                last_read = time()
+
+                drive_enabled = registers["drive_enabled"]
+                move_done = registers[move_done_register]
+
+                if drive_enabled:
+                    last_enabled = time()
+
+                if not drive_enabled and move_done:
+                    break
+
+                # Check if the drive is not enabled for more than 5 seconds without
+                # the movement being done. This usually means the dome has been
+                # manually stopped.
+                if not drive_enabled and (time() - last_enabled) > 5:
+                    raise DomeError("Dome drive has been disabled.")
 
-            # Check if the drive is not enabled for more than 5 seconds without the
-            # movement being done. This usually means the dome has been manually
-            # stopped.
-            if not drive_enabled and (time() - last_enabled) > 5:
-                raise DomeError("Dome drive has been disabled.")
+        finally:
+            await ticks.aclose()
 
     async def open(self, force: bool = False):
         """Open the dome."""
@@ -27,6 +27,18 @@ class SafetyError(ECPError):
     pass
 
 
+class CircuitOpenError(ECPError):
+    """The PLC is not being contacted after too many consecutive failures."""
+
+    pass
+
+
+class DeadlineExceededError(ECPError):
+    """A call to the PLC did not finish within its deadline."""
+
+    pass
+
+
 class ECPWarning(UserWarning):
     """General warnings for ``lvmecp.``"""
 
@@ -0,0 +1,617 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: history.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import cached_property
+
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy
+
+from lvmecp.decoders import (
+    FLOAT_DECIMALS,
+    ByteOrder,
+    Decoder,
+    decode_words,
+    get_decoder,
+)
+from lvmecp.planner import BIT_MODES
+
+
+if TYPE_CHECKING:
+    from lvmecp.planner import ReadPlan
+    from lvmecp.snapshot import RegisterSnapshot
+
+
+__all__ = [
+    "RegisterHistory",
+    "RecordTable",
+    "RegisterLayout",
+    "downsample",
+    "get_record_dtype",
+]
+
+
+#: Alignment, in bytes, of the records of a `.RecordTable`.
+RECORD_ALIGNMENT = 8
+
+
+def get_record_dtype(plan: ReadPlan) -> numpy.dtype:
+    """Returns the structured type of the records of the scans of a plan.
+
+    Each record has the fields ``timestamp`` (the Unix time at which the scan
+    started), ``updated`` (a packed mask of the registers read in the scan, in
+    the order of `.ReadPlan.by_name`), and one field per data block with the
+    image of a `.RegisterSnapshot` of the plan: packed bits for coils and
+    discrete inputs and little-endian ``uint16`` words for holding and input
+    registers. Records are padded to a multiple of `.RECORD_ALIGNMENT` bytes.
+
+    """
+
+    names = ["timestamp", "updated"]
+    formats: list = ["<f8", ("u1", (math.ceil(len(plan.by_name) / 8),))]
+    offsets = [0, 8]
+
+    position = 8 + numpy.dtype(formats[1]).itemsize
+    for mode in sorted(plan.sizes):
+        if mode in BIT_MODES:
+            field = ("u1", (math.ceil(plan.sizes[mode] / 8),))
+        else:
+            position += position % 2
+            field = ("<u2", (plan.sizes[mode],))
+
+        names.append(mode)
+        formats.append(field)
+        offsets.append(position)
+
+        position += numpy.dtype(field).itemsize
+
+    itemsize = RECORD_ALIGNMENT * math.ceil(position / RECORD_ALIGNMENT)
+
+    return numpy.dtype(
+        {"names": names, "formats": formats, "offsets": offsets, "itemsize": itemsize}
+    )
+
+
+@dataclass(frozen=True)
+class RegisterLayout:
+    """The position and decoding of a register in the records of the scans.
+
+    Parameters
+    ----------
+    name
+        The name of the register.
+    mode
+        The data block of the register, which is the record field with its data.
+    position
+        The position of the first element of the register in the image, in bits
+        for coils and discrete inputs and in words otherwise.
+    count
+        The number of elements of the register.
+    decoder
+        The name of the `.Decoder` of the register, if any.
+    byteorder
+        The order of the bytes in each word.
+    wordorder
+        The order of the words.
+    scale
+        A factor by which the decoded value is multiplied.
+    offset
+        A value added to the decoded value after scaling.
+    bit
+        For virtual booleans, the bit of the word with the value.
+
+    """
+
+    name: str
+    mode: str
+    position: int
+    count: int = 1
+    decoder: str | None = None
+    byteorder: ByteOrder = "big"
+    wordorder: ByteOrder = "little"
+    scale: float | None = None
+    offset: float | None = None
+    bit: int | None = None
+
+    @classmethod
+    def from_plan(cls, plan: ReadPlan, name: str) -> RegisterLayout:
+        """Returns the layout of a register in the records of a plan."""
+
+        register = plan.by_name[name]
+        mode, position = plan.index[name]
+
+        # Registers with a scale or offset and no decoder are read as uint16.
+        decoder = register.codec.name if register.codec is not None else None
+
+        return cls(
+            name=name,
+            mode=mode,
+            position=position,
+            count=register.count,
+            decoder=decoder,
+            byteorder=register.byteorder,
+            wordorder=register.wordorder,
+            scale=register.scale,
+            offset=register.offset,
+            bit=register.bit,
+        )
+
+    @cached_property
+    def codec(self) -> Decoder | None:
+        """The `.Decoder` of the register."""
+
+        return get_decoder(self.decoder) if self.decoder is not None else None
+
+    def decode(self, image: numpy.ndarray, rows: Any = slice(None)) -> numpy.ndarray:
+        """Decodes the values of the register in some records.
+
+        Parameters
+        ----------
+        image
+            The field of the data block of the register in an array of records.
+            A 2D array with one row per record.
+        rows
+            The rows to decode. Any index accepted by numpy.
+
+        Returns
+        -------
+        values
+            An array with the value of the register in each row, or a 2D array
+            with one row per record for registers with more than one element.
+
+        """
+
+        position = self.position
+        count = self.count
+
+        if self.mode in BIT_MODES:
+            if count == 1:
+                return image[rows, position >> 3] & (1 << (position & 7)) != 0
+
+            first = position >> 3
+            last = (position + count + 7) >> 3
+            bits = numpy.unpackbits(image[rows, first:last], axis=1, bitorder="little")
+            offset = position - 8 * first
+
+            return bits[:, offset : offset + count].view(numpy.bool_)
+
+        if self.bit is not None:
+            return (image[rows, position] >> self.bit) & 1 != 0
+
+        words = image[rows, position : position + count]
+
+        codec = self.codec
+        if codec is None:
+            return words[:, 0] if count == 1 else words
+
+        values = decode_words(words, codec.dtype, self.byteorder, self.wordorder)
+
+        if self.scale is not None or self.offset is not None:
+            scale = 1 if self.scale is None else self.scale
+            values = values * scale + (self.offset or 0)
+
+        if values.dtype.kind == "f":
+            values = numpy.round(values.astype(numpy.float64), FLOAT_DECIMALS)
+
+        return values
+
+
+class RecordTable:
+    """An array of scan records with the layout of the registers.
+
+    Base class for the tables of records in memory (`.RegisterHistory`) and on
+    disk (`.ArchiveReader`). See `.get_record_dtype` for the fields of the
+    records.
+
+    Parameters
+    ----------
+    records
+        A structured array with the records.
+    layouts
+        The `.RegisterLayout` of each register, in the order of the bits of the
+        ``updated`` field.
+
+    """
+
+    def __init__(self, records: numpy.ndarray, layouts: Iterable[RegisterLayout]):
+        self.records = records
+
+        self.layouts = {layout.name: layout for layout in layouts}
+        self.names = tuple(self.layouts)
+        self._ids = {name: ii for ii, name in enumerate(self.names)}
+
+        #: The Unix time at which each scan started.
+        self.timestamps: numpy.ndarray = records["timestamp"]
+
+        #: A packed mask of the registers read in each scan.
+        self.updated: numpy.ndarray = records["updated"]
+
+        #: The images of each scan, per mode.
+        self.images: dict[str, numpy.ndarray] = {
+            mode: records[mode]
+            for mode in records.dtype.names or ()
+            if mode not in ("timestamp", "updated")
+        }
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.layouts
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the records, in bytes."""
+
+        return self.records.nbytes
+
+    @property
+    def record_size(self) -> int:
+        """The size of each record, in bytes."""
+
+        return self.records.dtype.itemsize
+
+    @property
+    def span(self) -> float:
+        """The seconds between the oldest and the newest scan in the table."""
+
+        if len(self) == 0:
+            return 0.0
+
+        rows = self._rows()
+
+        return float(self.timestamps[rows[-1]] - self.timestamps[rows[0]])
+
+    def get(
+        self,
+        name: str,
+        start: float | None = None,
+        end: float | None = None,
+        max_points: int | None = None,
+    ) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """Returns the time series of a register.
+
+        Parameters
+        ----------
+        name
+            The name of the register.
+        start
+            The Unix time of the first scan to return.
+        end
+            The Unix time of the last scan to return.
+        max_points
+            If set, the time series is downsampled to at most this many points
+            (see `.downsample`).
+
+        Returns
+        -------
+        series
+            A tuple with the timestamps of the scans in which the register was
+            read, in chronological order, and its values. The values of
+            registers with more than one element are a 2D array with one row
+            per scan.
+
+        """
+
+        rows = self._rows()
+        rows = rows[self.mask(name, rows)]
+
+        times = self.timestamps[rows]
+        if start is not None or end is not None:
+            lower = -math.inf if start is None else start
+            upper = math.inf if end is None else end
+            in_range = (times >= lower) & (times <= upper)
+            rows = rows[in_range]
+            times = times[in_range]
+
+        layout = self.layouts[name]
+        values = layout.decode(self.images[layout.mode], rows)
+
+        if max_points is not None and len(times) > max_points:
+            keep = downsample(values, max_points)
+            times = times[keep]
+            values = values[keep]
+
+        return times, values
+
+    def mask(self, name: str, rows: Any = None) -> numpy.ndarray:
+        """Returns whether a register was read in each scan.
+
+        Parameters
+        ----------
+        name
+            The name of the register.
+        rows
+            The rows to check. Any index accepted by numpy. Defaults to all the
+            rows with scans, in chronological order.
+
+        """
+
+        if name not in self._ids:
+            raise KeyError(f"Register {name!r} not in history.")
+
+        if rows is None:
+            rows = self._rows()
+
+        register_id = self._ids[name]
+
+        return self.updated[rows, register_id >> 3] & (1 << (register_id & 7)) != 0
+
+    def _rows(self) -> numpy.ndarray:
+        """Returns the rows with scans, in chronological order."""
+
+        return numpy.arange(len(self), dtype=numpy.intp)
+
+
+class RegisterHistory(RecordTable):
+    """A fixed-size ring buffer with the recent values of all the registers.
+
+    The history stores the raw images of the scans column-wise, in a
+    preallocated array of records (see `.get_record_dtype`) with one row per
+    scan: packed bits for coils and discrete inputs and ``uint16`` words for
+    holding and input registers. Registers with a decoder are stored as their
+    raw words, which are decoded for the whole time series at once when
+    queried. The memory used is fixed when the history is created (see
+    `.nbytes`), and the oldest scans are overwritten when the buffer is full.
+
+    Appending a scan of the full plan is a copy of its images into the next
+    row. Scans of a subset of the registers (for example the polls of the fast
+    registers) copy the previous row and then their elements, and a packed
+    mask in `.updated` records which registers were read in each scan, so that
+    queries only return the values that were actually read. Overrides are not
+    applied; the history records the values read from the server.
+
+    Parameters
+    ----------
+    plan
+        The `.ReadPlan` with all the registers.
+    size
+        The number of scans to keep.
+
+    """
+
+    def __init__(self, plan: ReadPlan, size: int):
+        if size < 1:
+            raise ValueError("The size of the history must be at least one.")
+
+        self.plan = plan
+        self.size = size
+
+        records = numpy.zeros(size, dtype=get_record_dtype(plan))
+        records["timestamp"] = math.nan
+
+        layouts = [RegisterLayout.from_plan(plan, name) for name in plan.by_name]
+
+        super().__init__(records, layouts)
+
+        self._full_mask = numpy.packbits(
+            numpy.ones(len(self.names), dtype=numpy.bool_),
+            bitorder="little",
+        )
+
+        self._mappings: dict[int, tuple[ReadPlan, _PlanMapping]] = {}
+
+        #: The total number of scans appended.
+        self.n_appended: int = 0
+
+    def __len__(self) -> int:
+        return min(self.n_appended, self.size)
+
+    def __repr__(self) -> str:
+        return (
+            f"<RegisterHistory (size={self.size}, n_scans={len(self)}, "
+            f"nbytes={self.nbytes})>"
+        )
+
+    @property
+    def last(self) -> numpy.ndarray | None:
+        """The record of the last scan appended, or :obj:`None` if empty."""
+
+        if self.n_appended == 0:
+            return None
+
+        return self.records[(self.n_appended - 1) % self.size]
+
+    def append(self, snapshot: RegisterSnapshot) -> bool:
+        """Adds a scan to the history, overwriting the oldest if full.
+
+        Returns :obj:`False` if the scan was not added because none of its
+        registers is in the history.
+
+        """
+
+        slot = self.n_appended % self.size
+        plan = snapshot.plan
+
+        if plan is self.plan:
+            for mode, image in snapshot.images.items():
+                self.images[mode][slot] = image
+            self.updated[slot] = self._full_mask
+
+        else:
+            mapping = self._get_mapping(plan)
+            if len(mapping.runs) == 0:
+                return False
+
+            if self.n_appended > 0:
+                previous = (self.n_appended - 1) % self.size
+                for images in self.images.values():
+                    images[slot] = images[previous]
+
+            for mode, runs in mapping.runs.items():
+                row = self.images[mode][slot]
+                image = snapshot.images[mode]
+                for run in runs:
+                    run.copy(image, row)
+
+            self.updated[slot] = mapping.mask
+
+        self.timestamps[slot] = snapshot.timestamp
+        self.n_appended += 1
+
+        return True
+
+    def _rows(self) -> numpy.ndarray:
+        n_scans = len(self)
+        first = self.n_appended - n_scans
+
+        return (numpy.arange(first, first + n_scans) % self.size).astype(numpy.intp)
+
+    def _get_mapping(self, plan: ReadPlan) -> _PlanMapping:
+        """Returns the runs of elements of a plan and where they go in the rows."""
+
+        entry = self._mappings.get(id(plan))
+        if entry is not None and entry[0] is plan:
+            return entry[1]
+
+        runs: dict[str, list[_Run]] = {}
+        read = numpy.zeros(len(self.names), dtype=numpy.bool_)
+
+        # Registers are sorted by position so that adjacent registers are merged
+        # into a single run.
+        names = sorted(
+            (name for name in plan.by_name if name in self._ids),
+            key=lambda name: plan.index[name],
+        )
+
+        for name in names:
+            mode, position = plan.index[name]
+            count = plan.by_name[name].count
+            target = self.layouts[name].position
+
+            mode_runs = runs.setdefault(mode, [])
+            last = mode_runs[-1] if len(mode_runs) > 0 else None
+            if (
+                last is not None
+                and last.source + last.count == position
+                and last.target + last.count == target
+            ):
+                mode_runs[-1] = _Run(mode, last.source, last.target, last.count + count)
+            else:
+                mode_runs.append(_Run(mode, position, target, count))
+
+            read[self._ids[name]] = True
+
+        mapping = _PlanMapping(runs, numpy.packbits(read, bitorder="little"))
+        self._mappings[id(plan)] = (plan, mapping)
+
+        return mapping
+
+
+@dataclass(frozen=True)
+class _Run:
+    """A contiguous range of elements of a partial image and the full image.
+
+    Positions and counts are in bits for coils and discrete inputs and in words
+    otherwise.
+
+    """
+
+    mode: str
+    source: int
+    target: int
+    count: int
+
+    @cached_property
+    def _bytes(self) -> tuple[slice, slice, int, numpy.ndarray]:
+        """The bytes with the bits of the run, the shift, and the target mask."""
+
+        source = slice(self.source >> 3, (self.source + self.count + 7) >> 3)
+
+        first = self.target >> 3
+        last = (self.target + self.count + 7) >> 3
+        target = slice(first, last)
+
+        shift = self.target - 8 * first
+        mask = ((1 << self.count) - 1) << shift
+        mask_bytes = numpy.frombuffer(mask.to_bytes(last - first, "little"), "u1")
+
+        return source, target, shift, mask_bytes
+
+    def copy(self, image: numpy.ndarray, row: numpy.ndarray):
+        """Copies the elements of the run from a partial image into a row."""
+
+        if self.mode not in BIT_MODES:
+            row[self.target : self.target + self.count] = image[
+                self.source : self.source + self.count
+            ]
+            return
+
+        source, target, shift, mask = self._bytes
+
+        # Only the bytes with the bits of the run are read and modified.
+        bits = int.from_bytes(image[source].tobytes(), "little") >> (self.source & 7)
+        bits = (bits & ((1 << self.count) - 1)) << shift
+        value = numpy.frombuffer(bits.to_bytes(len(mask), "little"), "u1")
+
+        row[target] = (row[target] & ~mask) | value
+
+
+@dataclass
+class _PlanMapping:
+    """Where the elements of a partial plan go in the rows of the history."""
+
+    #: For each mode, the runs of contiguous elements of the registers of the
+    #: partial plan.
+    runs: dict[str, list[_Run]]
+    #: The packed mask of the registers in the partial plan.
+    mask: numpy.ndarray
+
+
+def downsample(values: numpy.ndarray, max_points: int) -> numpy.ndarray:
+    """Returns the indices of the samples to keep when downsampling a series.
+
+    The series is split in buckets of equal size and the samples with the
+    minimum and maximum value of each bucket are kept, so that short spikes
+    and the transitions of boolean registers are not lost. Series with more
+    than one element per sample keep the first sample of each bucket.
+
+    Parameters
+    ----------
+    values
+        The values of the series.
+    max_points
+        The maximum number of samples to keep. Must be at least two.
+
+    Returns
+    -------
+    indices
+        The sorted indices of the samples to keep.
+
+    """
+
+    n_values = len(values)
+    if n_values <= max_points:
+        return numpy.arange(n_values)
+
+    if max_points < 2:
+        raise ValueError("max_points must be at least two.")
+
+    if values.ndim > 1:
+        return numpy.arange(0, n_values, math.ceil(n_values / max_points))
+
+    bucket = math.ceil(n_values / (max_points // 2))
+    n_buckets = math.ceil(n_values / bucket)
+
+    # Pad with the last value so that all buckets have the same size.
+    padded = numpy.empty(n_buckets * bucket, dtype=values.dtype)
+    padded[:n_values] = values
+    padded[n_values:] = values[-1]
+
+    buckets = padded.reshape(n_buckets, bucket)
+    base = numpy.arange(n_buckets) * bucket
+
+    indices = numpy.concatenate(
+        [base + buckets.argmin(axis=1), base + buckets.argmax(axis=1)]
+    )
+
+    return numpy.unique(numpy.minimum(indices, n_values - 1))
@@ -8,6 +8,8 @@
 
 from __future__ import annotations
 
+from typing import Any, Mapping
+
 from lvmecp.module import PLCModule
 
 
@@ -23,7 +25,7 @@ class HVACController(PLCModule):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.status: dict[str, int | bool] = {}
+        self.status: Mapping[str, Any] = {}
 
     async def _update_internal(self, **kwargs):
         """Update status."""
@@ -8,7 +8,7 @@
 
 from __future__ import annotations
 
-import asyncio
+from typing import Any, Mapping
 
 from lvmecp import log
 from lvmecp.maskbits import LightStatus
@@ -43,15 +43,25 @@ class LightsController(PLCModule):
     flag = LightStatus
     interval = 30.0
 
-    async def _update_internal(self, use_cache: bool = True, **kwargs):
+    async def _update_internal(
+        self,
+        use_cache: bool = True,
+        registers: Mapping[str, Any] | None = None,
+        max_age: float | None = None,
+        **kwargs,
+    ):
         """Update status."""
 
         assert self.flag is not None
 
-        light_registers = await self.plc.modbus.read_group(
-            "lights",
-            use_cache=use_cache,
-        )
+        if registers is not None:
+            light_registers = registers
+        else:
+            light_registers = await self.modbus.read_group(
+                "lights",
+                use_cache=use_cache,
+                max_age=max_age,
+            )
 
         active_bits = self.flag(0)
         for key in light_registers:
@@ -123,10 +133,12 @@ class LightsController(PLCModule):
         code = self.get_code(light)
 
         log.debug(f"Toggling light {code}.")
-        await self.modbus[f"{code}_new"].write(True)
+        async with self.modbus.session() as session:
+            await session.write(f"{code}_new", True)
+            await session.sleep(0.5)
+            registers = await session.read(self.get_registers())
 
-        await asyncio.sleep(0.5)
-        await self.update(use_cache=False)
+        await self.update(registers=registers)
 
     async def on(self, light: str):
         """Turns on a light."""
@@ -9,441 +9,2537 @@
 from __future__ import annotations
 
 import asyncio
+import enum
+import math
 import pathlib
-from time import time
-
-from typing import Any, Literal, Sequence
-
+import struct
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from functools import cached_property
+from time import monotonic, time
+
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
+    Mapping,
+    Sequence,
+)
+
+import numpy
 from lvmopstools.retrier import Retrier
+from pymodbus.bit_read_message import ReadCoilsRequest, ReadDiscreteInputsRequest
 from pymodbus.client.tcp import AsyncModbusTcpClient
-from pymodbus.constants import Endian
-from pymodbus.payload import BinaryPayloadDecoder
+from pymodbus.exceptions import ModbusException
+from pymodbus.pdu import ModbusRequest, ModbusResponse
+from pymodbus.register_read_message import (
+    ReadHoldingRegistersRequest,
+    ReadInputRegistersRequest,
+)
 
 from sdsstools import Configuration, read_yaml_file
 from sdsstools.utils import cancel_task
 
 from lvmecp import config as lvmecp_config
 from lvmecp import log
-from lvmecp.exceptions import ECPError
-from lvmecp.tools import TimedCacheDict
+from lvmecp.archive import ArchiveWriter
+from lvmecp.cache import RegisterCache
+from lvmecp.decoders import FLOAT_DECIMALS, ByteOrder, Decoder, get_decoder
+from lvmecp.exceptions import CircuitOpenError, DeadlineExceededError, ECPError
+from lvmecp.history import RegisterHistory
+from lvmecp.planner import (
+    GAP_TOLERANCE,
+    MAX_PDU_SIZE,
+    MBAP_SIZE,
+    ReadBlock,
+    ReadPlan,
+    WriteBlock,
+    compile_read_plan,
+    compile_writes,
+)
+from lvmecp.priority import Priority, PriorityLock
+from lvmecp.snapshot import BlockData, Quality, RegisterSnapshot, SnapshotView
+from lvmecp.watch import RegisterWatch, WatchPredicate
+
+
+if TYPE_CHECKING:
+    from lvmecp.scheduler import ScanScheduler
 
 
 MAX_RETRIES = 3
-MAX_COUNT_HR = 100
 CONNECTION_TIMEOUT = 10.0
+SESSION_TIMEOUT = 5.0
+CONNECT_TIMEOUT = 5.0
+KEEPALIVE_INTERVAL = 10.0
+REQUEST_TIMEOUT = 3.0
+
+#: Default total time, in seconds, for a call to the PLC, including the wait for
+#: the lock, opening the connection, and the retries.
+DEADLINE = 10.0
+
+#: Default number of consecutive failures after which the circuit breaker opens,
+#: and seconds after which an open circuit breaker lets a probe request through.
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 10.0
+
+#: Default maximum age, in seconds, of the stale values returned to callers that
+#: accept them while the registers are refreshed in the background.
+STALE_MAX_AGE = 30.0
+
+#: Default number of scans kept in the `.RegisterHistory`.
+HISTORY_SIZE = 7200
+
+#: Default maximum age, in seconds, of the values of the registers in each tier.
+POLL_TIERS: dict[str, float] = {"fast": 0.5, "normal": 15.0, "slow": 60.0}
+
+#: Request PDU used to read each type of data block.
+READ_REQUESTS: dict[str, type[ModbusRequest]] = {
+    "coil": ReadCoilsRequest,
+    "discrete_input": ReadDiscreteInputsRequest,
+    "holding_register": ReadHoldingRegistersRequest,
+    "input_register": ReadInputRegistersRequest,
+}
+
+
+#: Internals of `.AsyncModbusTcpClient` used to pipeline requests (see
+#: `.Modbus._read_pipelined`). They are not part of the public API of pymodbus.
+PIPELINE_INTERNALS: tuple[str, ...] = (
+    "framer.resetFrame",
+    "framer.buildPacket",
+    "transaction.getNextTID",
+    "transaction.delTransaction",
+    "build_response",
+    "send",
+)
+
+
+def supports_pipelining(client: Any) -> bool:
+    """Checks whether a pymodbus client has the internals used for pipelining."""
+
+    for path in PIPELINE_INTERNALS:
+        obj = client
+        for attr in path.split("."):
+            obj = getattr(obj, attr, None)
+        if not callable(obj):
+            return False
+
+    return True
+
+
+#: Header of a Modbus TCP frame (transaction ID, protocol ID, length), without
+#: the unit ID.
+MBAP_STRUCT = struct.Struct(">HHH")
+
+#: PDU of a read request and of a single write request.
+READ_PDU_STRUCT = struct.Struct(">BHH")
+
+#: Header of the PDU of a multiple write request.
+WRITE_PDU_STRUCT = struct.Struct(">BHHB")
 
 
 RegisterModes = Literal["coil", "holding_register", "discrete_input", "input_register"]
 
 
-class ModbusRegister:
-    """A Modbus register/variable.
+@dataclass
+class _InFlightScan:
+    """A scan in progress."""
 
-    Parameters
-    ----------
-    modbus
-        The `.Modbus` connection.
-    name
-        The name assigned to this register.
-    address
-        The PDU ``address`` (note this is 0-indexed, and one less than the
-        register in the memory block) for the element.
-    mode
-        The type of data block: `coil``, ``holding_register``, ``discrete_input``,
-        or ``input_register``.
-    group
-        A grouping key for registers.
-    readonly
-        Whether the register is read-only.
+    registers: frozenset[ModbusRegister]
+    generation: int
+    future: asyncio.Future[dict[str, Any]]
 
-    """
 
-    def __init__(
-        self,
-        modbus: Modbus,
-        name: str,
-        address: int,
-        mode: RegisterModes = "coil",
-        count: int = 1,
-        group: str | None = None,
-        decoder: str | None = None,
-        readonly: bool = True,
-    ):
-        self.modbus: Modbus = modbus
-        self.client: AsyncModbusTcpClient = modbus.client
+@dataclass
+class Lease:
+    """The lease of the connection by the task that holds the lock."""
 
-        self.name: str = name
-        self.address: int = address
-        self.mode: RegisterModes = mode
-        self.count: int = count
-        self.group: str | None = group
-        self.decoder: str | None = decoder
-        self.readonly: bool = readonly
+    #: The task that acquired the connection.
+    task: asyncio.Task | None
+    #: The priority with which the connection was acquired.
+    priority: Priority
+    #: The `~time.monotonic` time at which the connection was acquired.
+    acquired_at: float
+    #: The `~time.monotonic` time at which the lease expires.
+    deadline: float
 
-    async def _read_internal(self):
-        """Return the value of the modbus register."""
+    @property
+    def holder(self) -> str:
+        """A description of the holder of the lease, for logging."""
 
-        if self.mode == "coil":
-            func = self.client.read_coils
-        elif self.mode == "holding_register":
-            func = self.client.read_holding_registers
-        elif self.mode == "discrete_input":
-            func = self.client.read_discrete_inputs
-        elif self.mode == "input_register":
-            func = self.client.read_input_registers
-        else:
-            raise ValueError(f"Invalid block mode {self.mode!r}.")
+        if self.task is None:
+            return f"unknown task ({self.priority.name})"
 
-        async with self.modbus:
-            resp = await func(
-                self.address,
-                count=self.count,
-                slave=self.modbus.slave,
-            )
+        coro = self.task.get_coro()
+        name = getattr(coro, "__qualname__", None) or repr(coro)
 
-        if resp.isError():
-            raise ValueError(
-                f"Invalid response for element "
-                f"{self.name!r}: 0x{resp.function_code:02X}."
-            )
+        return f"{self.task.get_name()} running {name} ({self.priority.name})"
 
-        if self.mode == "coil" or self.mode == "discrete_input":
-            bits = resp.bits
-            value = bits[0 : self.count] if self.count > 1 else bits[0]
-        else:
-            registers = resp.registers
-            value = registers[0 : self.count] if self.count > 1 else registers[0]
 
-        # Apply any overrides from the configuration.
-        if self.name in self.modbus.overrides:
-            value = self.modbus.overrides[self.name]
+@dataclass
+class NativeResponse:
+    """A response decoded by `.NativeModbusClient`.
 
-        value = self.decode(value)
+    Words are returned as a numpy array that is a view of the bytes of the
+    response PDU. Bits are kept packed, as sent by the server, in ``packed``
+    and only unpacked when `.bits` is accessed.
 
-        if not isinstance(value, (int, float)):
-            raise ValueError(f"Invalid type for {self.name!r} response.")
+    """
 
-        return value
+    function_code: int
+    registers: numpy.ndarray | None = None
+    packed: memoryview | None = None
+    count: int = 0
+    exception_code: int | None = None
 
-    def decode(
-        self,
-        value: int | bool | list[int | bool],
-    ) -> int | bool | list[int | bool]:
-        """Decodes the raw value from the register."""
-
-        if self.decoder is not None:
-            if self.decoder == "float_32bit":
-                bin_payload = BinaryPayloadDecoder.fromRegisters(
-                    value,
-                    byteorder=Endian.BIG,
-                    wordorder=Endian.LITTLE,
-                )
-                value = round(bin_payload.decode_32bit_float(), 3)
-            else:
-                raise ValueError(f"Unknown decoder {self.decoder}")
+    @property
+    def bits(self) -> numpy.ndarray | None:
+        """The bits of the response, unpacked into a boolean array."""
 
-        return value
+        if self.packed is None:
+            return None
 
-    @Retrier(max_attempts=MAX_RETRIES, delay=0.5, max_delay=2.0)
-    async def read(self, use_cache: bool = True):
-        """Return the value of the modbus register.
+        data = numpy.frombuffer(self.packed, dtype=numpy.uint8)
+        bits = numpy.unpackbits(data, count=self.count, bitorder="little")
 
-        Parameters
-        ----------
-        use_cache
-            Whether to use the cache to retrieve the value. If the cache is not
-            available, or the value is not in the cache, the register will be read.
-            This function does not set the cache after reading the register.
+        return bits.view(numpy.bool_)
 
-        """
+    def isError(self) -> bool:
+        """Returns whether the server returned an exception response."""
 
-        if use_cache:
-            cache = self.modbus.register_cache
-            if self.name in cache and (value := cache[self.name]) is not None:
-                return value
+        return self.exception_code is not None
 
-        return await self._read_internal()
 
-    @Retrier(max_attempts=MAX_RETRIES, delay=0.5, max_delay=2.0)
-    async def write(self, value: int | bool):
-        """Sets the value of the register."""
+class _NativeModbusProtocol(asyncio.Protocol):
+    """Splits the byte stream into Modbus TCP frames for a `.NativeModbusClient`."""
 
-        if self.readonly:
-            raise ECPError(f"Register {self.name!r} is read-only.")
+    def __init__(self, client: NativeModbusClient):
+        self.client = client
+        self.buffer = bytearray()
 
-        if self.mode == "coil":
-            func = self.client.write_coil
-        elif self.mode == "holding_register":
-            func = self.client.write_register
-        elif self.mode == "discrete_input" or self.mode == "input_register":
-            raise ValueError(f"Block of mode {self.mode!r} is read-only.")
-        else:
-            raise ValueError(f"Invalid block mode {self.mode!r}.")
+    def connection_made(self, transport: asyncio.BaseTransport):
+        self.client._transport = transport  # type: ignore
 
-        # Always open the connection.
-        async with self.modbus:
-            resp = await func(self.address, value)  # type: ignore
+    def connection_lost(self, exc: Exception | None):
+        self.client._connection_lost(exc)
 
-            if resp.isError():
-                raise ECPError(
-                    f"Invalid response for element "
-                    f"{self.name!r}: 0x{resp.function_code:02X}."
-                )
-            else:
-                self.modbus.register_cache[self.name] = value
-                log.debug(
-                    f"Written value {value} to register {self.name!r} "
-                    f"({self.mode}-{self.address})."
-                )
+    def data_received(self, data: bytes):
+        buffer = self.buffer
+        buffer.extend(data)
 
+        pending = self.client._pending
 
-class Modbus(dict[str, ModbusRegister]):
-    """A simple dictionary of Modbus registers.
+        while len(buffer) >= MBAP_SIZE:
+            tid, _, length = MBAP_STRUCT.unpack_from(buffer)
+            end = 6 + length
+            if len(buffer) < end:
+                break
+
+            pdu = bytes(buffer[MBAP_SIZE:end])
+            del buffer[:end]
+
+            # Responses to requests that timed out are dropped.
+            future = pending.pop(tid, None)
+            if future is not None and not future.done():
+                future.set_result(pdu)
+
+
+class NativeModbusClient:
+    """A minimal asyncio Modbus TCP client.
+
+    Implements the read (FC1, FC2, FC3, FC4) and write (FC5, FC6, FC15, FC16)
+    functions with the same interface as the methods of `.AsyncModbusTcpClient`
+    used by `.Modbus`. Requests are framed with :mod:`struct` and the bits and
+    words of read responses are decoded into numpy arrays straight from the
+    received bytes, without creating a Python object per element.
+
+    Responses are matched to their request by transaction ID, so several
+    requests can be in flight at once (see `.read_many`), and late responses
+    to requests that timed out are discarded.
 
     Parameters
     ----------
-    config
-        A YAML configuration file or dictionary with the keys ``host`` and ``port``
-        for the Modbus server, and a dictionary ``registers`` with modbus registers.
-        Each one must include a PDU ``address`` (note this is 0-indexed, and one
-        less than the register in the memory block) and optionally ``mode`` for
-        the block type (``coil``, ``holding_register``, ``discrete_input``,
-        or ``input_register``; defaults to ``coil``). If `None`, defaults to the
-        internal configuration.
+    host
+        The host of the Modbus server.
+    port
+        The port of the Modbus server.
+    timeout
+        The timeout, in seconds, for the response to a request.
 
     """
 
-    def __init__(self, config: dict | pathlib.Path | str | None = None):
-        if isinstance(config, (str, pathlib.Path)):
-            self.config = read_yaml_file(
-                str(config),
-                return_class=Configuration,
-            )["modbus"]
-        elif config is None:
-            self.config = lvmecp_config["modbus"]
-        elif isinstance(config, dict):
-            self.config = config
+    def __init__(self, host: str, port: int = 502, timeout: float = REQUEST_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
 
-        assert isinstance(self.config, dict)
+        self._transport: asyncio.Transport | None = None
+        self._pending: dict[int, asyncio.Future[bytes]] = {}
+        self._tid: int = 0
 
-        self.host = self.config["host"]
-        self.port = self.config["port"]
-        self.slave = self.config.get("slave", 0)
+    @property
+    def connected(self) -> bool:
+        """Whether the connection is open."""
 
-        # Cache results so that very close calls to get_all()
-        # don't need to open a connection and read the registers.
-        self.cache_timeout = self.config.get("cache_timeout", 1)
-        self.register_cache = TimedCacheDict(self.cache_timeout, mode="null")
+        return self._transport is not None and not self._transport.is_closing()
 
-        # Register overrides
-        self.overrides: dict[str, Any] = self.config.get("overrides", {}) or {}
+    async def connect(self) -> bool:
+        """Opens the connection to the server."""
 
-        # Modbus client.
-        self.client = AsyncModbusTcpClient(self.host, port=self.port)
+        loop = asyncio.get_running_loop()
+        await loop.create_connection(
+            lambda: _NativeModbusProtocol(self),
+            self.host,
+            self.port,
+        )
 
-        # Lock to allow up to 5 concurrent connections.
-        self.lock = asyncio.Lock()
-        self._lock_release_task: asyncio.Task | None = None
+        return self.connected
 
-        # Create the internal dictionary of registers
-        registers = {
-            name: ModbusRegister(
-                self,
-                name,
-                register["address"],
-                mode=register.get("mode", "coil"),
-                group=register.get("group", None),
-                count=register.get("count", 1),
-                decoder=register.get("decoder", None),
-                readonly=register.get("readonly", True),
-            )
-            for name, register in self.config["registers"].items()
-        }
+    def close(self):
+        """Closes the connection. Pending requests fail with `ConnectionError`."""
 
-        dict.__init__(self, registers)
-        for name, register in registers.items():
-            setattr(self, name, register)
+        if self._transport is not None:
+            self._transport.close()
 
-        log.debug(
-            f"Modbus connection to {self.host}:{self.port} initialised "
-            f"with cache timeout {self.cache_timeout} seconds."
-        )
+        self._connection_lost(None)
 
-    async def connect(self):
-        """Connects to the client."""
+    def _connection_lost(self, exc: Exception | None):
+        """Fails the pending requests after the connection is closed."""
 
-        try:
-            await asyncio.wait_for(self.lock.acquire(), CONNECTION_TIMEOUT)
-        except asyncio.TimeoutError:
-            raise RuntimeError("Timed out waiting for lock to be released.")
+        self._transport = None
 
-        hp = f"{self.host}:{self.port}"
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Connection to server lost."))
+
+    def submit(self, pdu: bytes, slave: int = 0) -> asyncio.Future[bytes]:
+        """Sends a request PDU and returns a future with the response PDU."""
+
+        if self._transport is None or self._transport.is_closing():
+            raise ConnectionError("Client is not connected.")
+
+        self._tid = tid = (self._tid + 1) & 0xFFFF
 
-        did_connect: bool = False
+        future = asyncio.get_running_loop().create_future()
+        self._pending[tid] = future
+
+        header = MBAP_STRUCT.pack(tid, 0, len(pdu) + 1) + bytes((slave,))
+        self._transport.write(header + pdu)
+
+        return future
+
+    async def execute(self, pdu: bytes, slave: int = 0) -> bytes:
+        """Sends a request PDU and waits for the response PDU."""
+
+        future = self.submit(pdu, slave=slave)
 
         try:
-            await asyncio.wait_for(self.client.connect(), timeout=5)
-            did_connect = True
-        except asyncio.TimeoutError:
-            raise ConnectionError(f"Timed out connecting to server at {hp}.")
-        except Exception as err:
-            raise ConnectionError(f"Failed connecting to server at {hp}: {err}.")
+            async with asyncio.timeout(self.timeout):
+                return await future
+        except TimeoutError:
+            raise ConnectionError("Timed out waiting for the server response.")
         finally:
-            if not did_connect and self.lock.locked():
-                self.lock.release()
+            if not future.done():
+                self._discard([future])
 
-        # Schedule a task to release the lock after 5 seconds. This is a safeguard
-        # in case something fails and the connection is never closed and the lock
-        # not released.
-        self._lock_release_task = asyncio.create_task(self.unlock_on_timeout())
+    async def execute_many(self, pdus: Sequence[bytes], slave: int = 0) -> list[bytes]:
+        """Sends several request PDUs back-to-back and waits for all responses."""
 
-    async def disconnect(self):
-        """Disconnects the client."""
+        futures = [self.submit(pdu, slave=slave) for pdu in pdus]
 
         try:
-            if self.client:
-                self.client.close()
-
+            async with asyncio.timeout(self.timeout):
+                return await asyncio.gather(*futures)
+        except TimeoutError:
+            raise ConnectionError("Timed out waiting for the server response.")
         finally:
-            if self.lock.locked():
-                self.lock.release()
+            if not all(future.done() for future in futures):
+                self._discard(futures)
 
-            await cancel_task(self._lock_release_task)
+    def _discard(self, futures: Sequence[asyncio.Future[bytes]]):
+        """Cancels requests that did not complete. Late responses are dropped."""
 
-    async def __aenter__(self):
-        """Initialises the connection to the server."""
+        for future in futures:
+            future.cancel()
 
-        await self.connect()
+        self._pending = {
+            tid: future for tid, future in self._pending.items() if not future.done()
+        }
 
-    async def __aexit__(self, exc_type, exc, tb):
-        """Closes the connection to the server."""
+    async def read_many(
+        self,
+        requests: Sequence[tuple[int, int, int]],
+        slave: int = 0,
+    ) -> list[NativeResponse]:
+        """Sends several read requests and decodes the responses.
 
-        await self.disconnect()
+        Parameters
+        ----------
+        requests
+            A list of tuples with the function code, address, and count of each
+            read request.
+        slave
+            The slave ID.
 
-    async def unlock_on_timeout(self):
-        """Removes the lock after an amount of time."""
+        """
 
-        await asyncio.sleep(CONNECTION_TIMEOUT)
-        await self.disconnect()
+        pdus = [READ_PDU_STRUCT.pack(*request) for request in requests]
+        responses = await self.execute_many(pdus, slave=slave)
 
-    async def read_all(self, use_cache: bool = True) -> dict[str, int | bool]:
-        """Returns a dictionary with all the registers and sets the cache."""
-
-        if use_cache:
-            cache_times = self.register_cache._cache_time.values()
-            oldest_cache = min(cache_times) if len(cache_times) > 0 else 0
-            if time() - oldest_cache < self.cache_timeout:
-                return self.register_cache.freeze()
-
-        # With this PLC it is more efficient to read the entire coil and
-        # holding register blocks in one go, and then parse the results, as
-        # opposed to reading each register individually.
-        async with self:
-            for mode in ["coil", "holding_register"]:
-                mode_count = max(
-                    register.address + register.count
-                    for register in self.values()
-                    if register.mode == mode
-                )
+        return [
+            self._decode_read(function_code, count, pdu)
+            for (function_code, _, count), pdu in zip(requests, responses)
+        ]
 
-                if mode == "coil":
-                    func = self.client.read_coils
-                elif mode == "holding_register":
-                    func = self.client.read_holding_registers
-                else:
-                    raise ValueError(f"Invalid mode {mode!r}.")
+    async def read_coils(self, address: int, count: int = 1, slave: int = 0):
+        """Reads coils (FC1)."""
 
-                data: list[int | bool] = []
+        return await self._read(1, address, count, slave)
 
-                if mode == "coil":
-                    # For coils we can read the entire block.
-                    resp = await func(0, count=1023, slave=self.slave)
+    async def read_discrete_inputs(self, address: int, count: int = 1, slave: int = 0):
+        """Reads discrete inputs (FC2)."""
 
-                    if resp.isError():
-                        raise ValueError(
-                            f"Invalid response for block {mode!r}: "
-                            f"0x{resp.function_code:02X}."
-                        )
+        return await self._read(2, address, count, slave)
 
-                    data += resp.bits
+    async def read_holding_registers(
+        self,
+        address: int,
+        count: int = 1,
+        slave: int = 0,
+    ):
+        """Reads holding registers (FC3)."""
 
-                else:
-                    # For holding registers we are limited to reading MAX_COUNT_HR
-                    # at once. We iterate to get all the data.
-                    n_reads = mode_count // MAX_COUNT_HR + 1
+        return await self._read(3, address, count, slave)
 
-                    for nn in range(n_reads):
-                        resp = await func(
-                            nn * MAX_COUNT_HR,
-                            count=MAX_COUNT_HR,
-                            slave=self.slave,
-                        )
+    async def read_input_registers(self, address: int, count: int = 1, slave: int = 0):
+        """Reads input registers (FC4)."""
 
-                        if resp.isError():
-                            raise ValueError(
-                                f"Invalid response for block {mode!r}: "
-                                f"0x{resp.function_code:02X}."
-                            )
+        return await self._read(4, address, count, slave)
 
-                        data += resp.registers
+    async def write_coil(self, address: int, value: bool, slave: int = 0):
+        """Writes a single coil (FC5)."""
 
-                for name, register in self.items():
-                    if register.mode != mode:
-                        continue
+        pdu = READ_PDU_STRUCT.pack(5, address, 0xFF00 if value else 0)
 
-                    value = data[register.address : register.address + register.count]
+        return self._decode_write(5, await self.execute(pdu, slave=slave))
 
-                    # Apply any overrides from the configuration.
-                    if name in self.overrides:
-                        value = self.overrides[name]
+    async def write_register(self, address: int, value: int, slave: int = 0):
+        """Writes a single holding register (FC6)."""
 
-                    value = register.decode(value)
+        pdu = READ_PDU_STRUCT.pack(6, address, value & 0xFFFF)
 
-                    if isinstance(value, Sequence) and len(value) == 1:
-                        value = value[0]
+        return self._decode_write(6, await self.execute(pdu, slave=slave))
 
-                    self.register_cache[name] = value
+    async def write_coils(self, address: int, values: Sequence[bool], slave: int = 0):
+        """Writes multiple coils (FC15)."""
 
-        registers = self.register_cache.freeze()
+        bits = numpy.asarray(values, dtype=numpy.bool_)
+        data = numpy.packbits(bits, bitorder="little").tobytes()
+        header = WRITE_PDU_STRUCT.pack(15, address, len(values), len(data))
 
-        # Just to double check that none of the values have expired, we loop over the
-        # dictionary and if necessary we read the register again.
-        for name, value in registers.items():
-            if value is None:
-                registers[name] = await self[name].read(use_cache=False)
+        return self._decode_write(15, await self.execute(header + data, slave=slave))
 
-        return registers
+    async def write_registers(
+        self,
+        address: int,
+        values: Sequence[int],
+        slave: int = 0,
+    ):
+        """Writes multiple holding registers (FC16)."""
 
-    async def read_group(self, group: str, use_cache: bool = True):
-        """Returns a dictionary of all read registers that match a ``group``."""
+        data = numpy.asarray(values, dtype=numpy.int64).astype(">u2").tobytes()
+        header = WRITE_PDU_STRUCT.pack(16, address, len(values), len(data))
 
-        registers = await self.read_all(use_cache=use_cache)
+        return self._decode_write(16, await self.execute(header + data, slave=slave))
 
-        group_registers: dict[str, int | bool] = {}
-        for name in self:
-            register = self[name]
-            if register.group is not None and register.group == group:
-                if name not in registers:
-                    continue
+    async def _read(self, function_code: int, address: int, count: int, slave: int):
+        """Sends a read request and decodes the response."""
 
-                group_registers[name] = registers[name]
+        pdu = READ_PDU_STRUCT.pack(function_code, address, count)
 
-        return group_registers
+        return self._decode_read(function_code, count, await self.execute(pdu, slave))
 
-    async def read_register(self, register: str, use_cache: bool = True) -> int | bool:
-        """Reads a register."""
+    def _decode_read(self, function_code: int, count: int, pdu: bytes):
+        """Decodes the response PDU to a read request."""
 
-        if register not in self:
-            raise ValueError(f"Register {register!r} not found.")
+        if pdu[0] & 0x80:
+            return NativeResponse(pdu[0], exception_code=pdu[1])
 
-        return await self[register].read(use_cache=use_cache)
+        if function_code in (1, 2):
+            packed = memoryview(pdu)[2 : 2 + pdu[1]]
+            return NativeResponse(function_code, packed=packed, count=count)
 
-    async def write_register(self, register: str, value: int | bool):
-        """Writes a value to a register."""
+        words = numpy.frombuffer(pdu, dtype=">u2", offset=2, count=count)
+        return NativeResponse(function_code, registers=words)
 
-        assert isinstance(register, str)
+    def _decode_write(self, function_code: int, pdu: bytes):
+        """Decodes the response PDU to a write request."""
 
-        if register not in self:
-            raise ValueError(f"Register {register!r} not found.")
+        if pdu[0] & 0x80:
+            return NativeResponse(pdu[0], exception_code=pdu[1])
+
+        return NativeResponse(function_code)
+
+
+#: A client supported by `.ModbusConnectionPool`.
+ModbusClient = AsyncModbusTcpClient | NativeModbusClient
+
+
+class BreakerState(enum.Enum):
+    """The states of a `.CircuitBreaker`."""
+
+    #: Requests are sent normally.
+    CLOSED = "closed"
+    #: Requests fail immediately without contacting the server.
+    OPEN = "open"
+    #: A single probe request is allowed to check if the server has recovered.
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fails fast when the server is not responding.
+
+    The breaker counts consecutive failed transactions (connection errors and
+    timeouts). When ``threshold`` is reached it opens, and all transactions fail
+    immediately with `.CircuitOpenError` instead of waiting for the lock, the
+    connection, and the retries. After ``reset_timeout`` seconds the breaker is
+    half-open and lets a single probe transaction through, while the others
+    keep failing fast. If the probe succeeds the breaker closes, otherwise it
+    opens again for another ``reset_timeout`` seconds.
+
+    Any response from the server, including an exception response, counts as
+    a success. Transactions that must always be attempted, such as emergency
+    stops, can bypass the breaker (see `.guard`); their results are still
+    recorded.
+
+    Parameters
+    ----------
+    name
+        A name for the breaker, used in the log and error messages.
+    threshold
+        The number of consecutive failures after which the breaker opens.
+    reset_timeout
+        The seconds after opening at which a probe transaction is allowed.
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int = BREAKER_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+    ):
+        if threshold < 1:
+            raise ValueError("The breaker threshold must be at least 1.")
+
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+
+        #: The number of consecutive failures.
+        self.failures: int = 0
+
+        #: The last failure.
+        self.last_error: BaseException | None = None
+
+        self.stats: dict[str, int] = {"opened": 0, "rejected": 0, "probes": 0}
+
+        self._opened_at: float | None = None
+        self._probing: bool = False
+
+    def __repr__(self) -> str:
+        return (
+            f"<CircuitBreaker ({self.name}, state={self.state.value}, "
+            f"failures={self.failures})>"
+        )
+
+    @property
+    def state(self) -> BreakerState:
+        """The current state of the breaker."""
+
+        if self._opened_at is None:
+            return BreakerState.CLOSED
+
+        if self._probing or monotonic() - self._opened_at >= self.reset_timeout:
+            return BreakerState.HALF_OPEN
 
-        await self[register].write(value)
+        return BreakerState.OPEN
+
+    def allow(self) -> bool:
+        """Checks whether a transaction can be sent.
+
+        Returns :obj:`True` if the transaction is the probe of a half-open
+        breaker, in which case its result must be recorded, or :obj:`False` if
+        the breaker is closed. Raises `.CircuitOpenError` otherwise.
+
+        """
+
+        state = self.state
+
+        if state == BreakerState.CLOSED:
+            return False
+
+        if state == BreakerState.HALF_OPEN and not self._probing:
+            self._probing = True
+            self.stats["probes"] += 1
+            return True
+
+        self.stats["rejected"] += 1
+
+        assert self._opened_at is not None
+        retry_in = max(self._opened_at + self.reset_timeout - monotonic(), 0)
+
+        raise CircuitOpenError(
+            f"Circuit breaker for {self.name} is open after {self.failures} "
+            f"consecutive failures (last error: {self.last_error!r}). "
+            f"Retrying in {retry_in:.1f} s."
+        )
+
+    def record_success(self):
+        """Records a successful transaction and closes the breaker."""
+
+        if self._opened_at is not None:
+            log.info(f"Circuit breaker for {self.name} closed.")
+
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self, error: BaseException):
+        """Records a failed transaction. Opens the breaker if needed."""
+
+        self.failures += 1
+        self.last_error = error
+        self._probing = False
+
+        if self._opened_at is not None:
+            # A failed probe. Wait another reset_timeout before the next one.
+            self._opened_at = monotonic()
+        elif self.failures >= self.threshold:
+            self._opened_at = monotonic()
+            self.stats["opened"] += 1
+            log.warning(
+                f"Circuit breaker for {self.name} opened after {self.failures} "
+                f"consecutive failures: {error!r}"
+            )
+
+    @contextmanager
+    def guard(self, force: bool = False) -> Iterator[None]:
+        """Checks the breaker and records the result of a transaction.
+
+        Connection errors and timeouts are recorded as failures. `.ECPError` and
+        :obj:`ValueError`, which are raised for exception responses and invalid
+        values, are recorded as successes. Other errors, and cancellations, are
+        not recorded, but release the probe so that a new one can be sent.
+
+        With ``force=True`` the transaction is never rejected, even if the
+        breaker is open or a probe is in flight, and it is not counted as the
+        probe. Its result is recorded as usual, so a successful forced
+        transaction closes the breaker.
+
+        """
+
+        probe = False if force else self.allow()
+
+        try:
+            yield
+        except (OSError, ModbusException) as err:
+            self.record_failure(err)
+            raise
+        except (ECPError, ValueError):
+            self.record_success()
+            raise
+        except BaseException:
+            if probe:
+                self._probing = False
+            raise
+        else:
+            self.record_success()
+
+
+class ModbusConnectionPool:
+    """A pool of persistent connections to a Modbus server.
+
+    Connections are opened the first time they are needed and then kept open
+    between transactions, so that a register round-trip does not require a new
+    TCP handshake. Connections that have been dropped are reopened when they
+    are acquired. The pool does not send requests on its own; `.Modbus` checks
+    the connection with `.ping` while holding its lock.
+
+    Parameters
+    ----------
+    host
+        The host of the Modbus server.
+    port
+        The port of the Modbus server.
+    size
+        The number of connections to keep open.
+    slave
+        The slave ID to use for keepalive requests.
+    connect_timeout
+        The timeout, in seconds, when opening a connection.
+    backend
+        The client used for the connections: ``pymodbus`` for
+        `.AsyncModbusTcpClient` or ``native`` for `.NativeModbusClient`.
+    on_connect
+        A function called with the client each time a connection is opened.
+
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        size: int = 1,
+        slave: int = 0,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        backend: Literal["pymodbus", "native"] = "pymodbus",
+        on_connect: Callable[[ModbusClient], None] | None = None,
+    ):
+        if size < 1:
+            raise ValueError("The pool size must be at least 1.")
+
+        self.host = host
+        self.port = port
+        self.slave = slave
+        self.connect_timeout = connect_timeout
+        self.on_connect = on_connect
+
+        # Automatic reconnection in pymodbus is disabled since the pool
+        # takes care of reopening connections.
+        self.clients: list[ModbusClient]
+        if backend == "pymodbus":
+            self.clients = [
+                AsyncModbusTcpClient(host, port=port, reconnect_delay=0)
+                for _ in range(size)
+            ]
+        elif backend == "native":
+            self.clients = [NativeModbusClient(host, port=port) for _ in range(size)]
+        else:
+            raise ValueError(f"Invalid backend {backend!r}.")
+
+        self.stats: dict[str, int] = {
+            "connects": 0,
+            "reconnects": 0,
+            "keepalives": 0,
+            "failures": 0,
+        }
+
+        self._idle: list[ModbusClient] = list(self.clients)
+        self._condition = asyncio.Condition()
+        self._opened: set[ModbusClient] = set()
+
+    async def acquire(self) -> ModbusClient:
+        """Leases a connected client from the pool."""
+
+        async with self._condition:
+            await self._condition.wait_for(lambda: len(self._idle) > 0)
+
+            # Prefer a connection that is already open.
+            client = next((cc for cc in self._idle if cc.connected), self._idle[0])
+            self._idle.remove(client)
+
+        if not client.connected:
+            try:
+                await self._connect(client)
+            except BaseException:
+                await self.release(client)
+                raise
+
+        return client
+
+    async def release(self, client: ModbusClient, discard: bool = False):
+        """Returns a client to the pool.
+
+        If ``discard=True``, the connection is closed. It will be reopened the
+        next time it is acquired.
+
+        """
+
+        if discard:
+            client.close()
+
+        async with self._condition:
+            if client not in self._idle:
+                self._idle.append(client)
+            self._condition.notify()
+
+    async def close(self):
+        """Closes all the connections."""
+
+        for client in self.clients:
+            client.close()
+
+    async def _connect(self, client: ModbusClient):
+        """Opens the connection for a client."""
+
+        hp = f"{self.host}:{self.port}"
+
+        try:
+            await asyncio.wait_for(client.connect(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            self.stats["failures"] += 1
+            raise ConnectionError(f"Timed out connecting to server at {hp}.")
+        except Exception as err:
+            self.stats["failures"] += 1
+            raise ConnectionError(f"Failed connecting to server at {hp}: {err}.")
+
+        if not client.connected:
+            self.stats["failures"] += 1
+            raise ConnectionError(f"Failed connecting to server at {hp}.")
+
+        self.stats["connects"] += 1
+        if client in self._opened:
+            self.stats["reconnects"] += 1
+            log.debug(f"Reconnected to {hp} ({self.stats['reconnects']} reconnects).")
+        self._opened.add(client)
+
+        if self.on_connect is not None:
+            self.on_connect(client)
+
+    async def ping(self, client: ModbusClient):
+        """Checks that an open connection is alive with a keepalive request.
+
+        The caller must hold the client. If the request fails or times out the
+        connection is closed, so that it is reopened the next time it is
+        acquired, and the error is raised.
+
+        """
+
+        try:
+            # Any response, even an exception one, means the connection is alive.
+            await asyncio.wait_for(
+                client.read_coils(0, count=1, slave=self.slave),
+                timeout=REQUEST_TIMEOUT,
+            )
+        except Exception as err:
+            self.stats["failures"] += 1
+            log.debug(f"Keepalive to {self.host}:{self.port} failed: {err}")
+            client.close()
+            raise
+
+        self.stats["keepalives"] += 1
+
+
+class ModbusRegister:
+    """A Modbus register/variable.
+
+    Parameters
+    ----------
+    modbus
+        The `.Modbus` connection.
+    name
+        The name assigned to this register.
+    address
+        The PDU ``address`` (note this is 0-indexed, and one less than the
+        register in the memory block) for the element.
+    mode
+        The type of data block: `coil``, ``holding_register``, ``discrete_input``,
+        or ``input_register``.
+    group
+        A grouping key for registers.
+    count
+        The number of elements of the register. Defaults to the number of words
+        of the ``decoder``, or one.
+    decoder
+        The name of a `.Decoder` in the registry (``int16``, ``uint16``,
+        ``int32``, ``uint32``, ``float32``, ``float64``, or the aliases
+        ``int_32bit``, ``uint_32bit``, and ``float_32bit``). Registers without
+        a decoder return the raw word or bit.
+    readonly
+        Whether the register is read-only.
+    max_age
+        The maximum age, in seconds, of the cached value of the register. If
+        set, the register is polled by the `.ScanScheduler` so that its cached
+        value is never older than ``max_age``, and cached values are used for
+        up to ``max_age`` seconds instead of the cache timeout.
+    byteorder
+        The order of the bytes in each word, for registers with a ``decoder``.
+    wordorder
+        The order of the words, for registers with a ``decoder``.
+    scale
+        A factor by which the decoded value is multiplied. If set without a
+        ``decoder``, the register is decoded as ``uint16``.
+    offset
+        A value added to the decoded value after scaling.
+    bit
+        If set, the register is a virtual boolean with the value of this bit,
+        counting from the least significant, of the word at ``address``.
+
+    """
+
+    def __init__(
+        self,
+        modbus: Modbus,
+        name: str,
+        address: int,
+        mode: RegisterModes = "coil",
+        count: int | None = None,
+        group: str | None = None,
+        decoder: str | None = None,
+        readonly: bool = True,
+        max_age: float | None = None,
+        byteorder: ByteOrder = "big",
+        wordorder: ByteOrder = "little",
+        scale: float | None = None,
+        offset: float | None = None,
+        bit: int | None = None,
+    ):
+        self.modbus: Modbus = modbus
+
+        self.name: str = name
+        self.address: int = address
+        self.mode: RegisterModes = mode
+        self.group: str | None = group
+        self.decoder: str | None = decoder
+        self.readonly: bool = readonly
+        self.max_age: float | None = max_age
+        self.byteorder: ByteOrder = byteorder
+        self.wordorder: ByteOrder = wordorder
+        self.scale: float | None = scale
+        self.offset: float | None = offset
+        self.bit: int | None = bit
+
+        # Resolve the decoder now so that invalid configurations fail on load.
+        self.codec: Decoder | None = None
+        if decoder is not None:
+            self.codec = get_decoder(decoder)
+        elif scale is not None or offset is not None:
+            self.codec = get_decoder("uint16")
+
+        if self.codec is not None or bit is not None:
+            if mode not in ("holding_register", "input_register"):
+                raise ValueError(
+                    f"Register {name!r} must be a holding or input register."
+                )
+
+        if bit is not None and (self.codec is not None or not 0 <= bit < 16):
+            raise ValueError(f"Invalid bit {bit!r} for register {name!r}.")
+
+        self.count: int = count or (self.codec.count if self.codec else 1)
+        if self.codec is not None and self.count != self.codec.count:
+            raise ValueError(
+                f"Register {name!r} requires {self.codec.count} words "
+                f"for decoder {decoder!r}."
+            )
+
+    @cached_property
+    def plan(self) -> ReadPlan:
+        """The read plan for this register."""
+
+        return compile_read_plan([self])
+
+    async def _read_internal(self, priority: Priority = Priority.INTERACTIVE):
+        """Return the value of the modbus register."""
+
+        values = await self.modbus.scan(self.plan, priority=priority)
+        value = values[self.name]
+
+        if not isinstance(value, (int, float)):
+            raise ValueError(f"Invalid type for {self.name!r} response.")
+
+        return value
+
+    def decode(
+        self,
+        value: int | bool | list[int | bool],
+    ) -> int | float | bool | list[int | bool]:
+        """Decodes the raw value from the register.
+
+        Registers in a `.RegisterSnapshot` are decoded in batch with the
+        `.BatchDecoder` of the plan instead.
+
+        """
+
+        if self.bit is not None:
+            return bool((int(value) >> self.bit) & 1)  # type: ignore
+
+        if self.codec is None:
+            return value
+
+        words = value if isinstance(value, list) else [value]
+        decoded = self.codec.decode(words, self.byteorder, self.wordorder)  # type: ignore
+
+        if self.scale is not None or self.offset is not None:
+            decoded = decoded * (self.scale or 1) + (self.offset or 0)
+
+        if isinstance(decoded, float):
+            decoded = round(decoded, FLOAT_DECIMALS)
+
+        return decoded
+
+    async def read(
+        self,
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        max_age: float | None = None,
+        timeout: float | None = None,
+    ):
+        """Return the value of the modbus register.
+
+        Parameters
+        ----------
+        use_cache
+            Whether to use the cache to retrieve the value. If the cache is not
+            available, or the value is not in the cache, the register will be read.
+        priority
+            The `.Priority` of the read request.
+        max_age
+            The maximum age of a cached value that the caller accepts. An expired
+            value younger than ``max_age`` is returned without waiting, and the
+            register is refreshed in the background. See `.Modbus.read_registers`.
+        timeout
+            The total time, in seconds, for the call, including the wait for the
+            lock, opening the connection, and the retries. Defaults to the
+            ``deadline`` of the `.Modbus`. See `.Modbus.budget`.
+
+        """
+
+        if use_cache and self.modbus.get(self.name) is self:
+            modbus = self.modbus
+            if (cached := modbus.get_cached([self.name], max_age)) is not None:
+                if cached.quality is Quality.STALE:
+                    modbus.revalidate([self.name])
+                return cached[self.name]
+
+        async with self.modbus.budget(timeout):
+            return await self._read_retrying(priority=priority)
+
+    @Retrier(
+        max_attempts=MAX_RETRIES,
+        delay=0.5,
+        max_delay=2.0,
+        raise_on_exception_class=[CircuitOpenError],
+    )
+    async def _read_retrying(self, priority: Priority = Priority.INTERACTIVE):
+        """Reads the register, retrying on failure."""
+
+        return await self._read_internal(priority=priority)
+
+    async def write(
+        self,
+        value: int | bool,
+        priority: Priority = Priority.CONTROL,
+        timeout: float | None = None,
+    ):
+        """Sets the value of the register.
+
+        Parameters
+        ----------
+        value
+            The value to write.
+        priority
+            The `.Priority` of the write request. Emergency writes are sent
+            before any other queued request.
+        timeout
+            The total time, in seconds, for the call, including the wait for the
+            lock, opening the connection, and the retries. Defaults to the
+            ``deadline`` of the `.Modbus`. See `.Modbus.budget`.
+
+        """
+
+        if self.readonly:
+            raise ECPError(f"Register {self.name!r} is read-only.")
+
+        if self.mode == "discrete_input" or self.mode == "input_register":
+            raise ValueError(f"Block of mode {self.mode!r} is read-only.")
+        elif self.mode not in ("coil", "holding_register"):
+            raise ValueError(f"Invalid block mode {self.mode!r}.")
+
+        async with self.modbus.budget(timeout):
+            await self._write_retrying(value, priority=priority)
+
+    @Retrier(
+        max_attempts=MAX_RETRIES,
+        delay=0.5,
+        max_delay=2.0,
+        raise_on_exception_class=[CircuitOpenError],
+    )
+    async def _write_retrying(self, value: int | bool, priority: Priority):
+        """Writes the register, retrying on failure."""
+
+        async with self.modbus.request(priority):
+            if self.mode == "coil":
+                func = self.modbus.client.write_coil
+            else:
+                func = self.modbus.client.write_register
+
+            resp = await func(self.address, value)  # type: ignore
+
+            if resp.isError():
+                raise ECPError(
+                    f"Invalid response for element "
+                    f"{self.name!r}: 0x{resp.function_code:02X}."
+                )
+            else:
+                self.modbus._invalidate(
+                    self.modbus._get_written(self.mode, self.address, 1)
+                )
+                log.debug(
+                    f"Written value {value} to register {self.name!r} "
+                    f"({self.mode}-{self.address})."
+                )
+
+
+class ModbusSession:
+    """A sequence of requests that holds the connection to the server.
+
+    Created by `.Modbus.session`. All the methods send their requests on the
+    connection held by the session.
+
+    Parameters
+    ----------
+    modbus
+        The `.Modbus` connection.
+    priority
+        The `.Priority` of the session.
+    deadline
+        The `~time.monotonic` time at which the session expires.
+
+    """
+
+    def __init__(self, modbus: Modbus, priority: Priority, deadline: float):
+        self.modbus = modbus
+        self.priority = priority
+        self.deadline = deadline
+
+        self.connected: bool = True
+
+    @property
+    def remaining(self) -> float:
+        """The number of seconds until the deadline of the session."""
+
+        return self.deadline - monotonic()
+
+    async def read(
+        self,
+        registers: Iterable[str | ModbusRegister],
+    ) -> SnapshotView:
+        """Reads a list of registers and returns a `.SnapshotView`."""
+
+        modbus = self.modbus
+
+        resolved = [modbus[reg] if isinstance(reg, str) else reg for reg in registers]
+        names = [register.name for register in resolved]
+
+        # Registers that are not in the register map (e.g., defined on the fly by
+        # the modbus command) are read but not cached.
+        known = all(modbus.get(register.name) is register for register in resolved)
+        plan = modbus.get_plan(names) if known else modbus.compile_plan(resolved)
+
+        data: list[BlockData] = []
+        timestamp = time()
+        started = monotonic()
+        generation = modbus.cache.generation
+        for block in plan.blocks:
+            await self._yield_to_emergency()
+            with modbus.breaker.guard(force=self.priority == Priority.EMERGENCY):
+                data.append(await modbus._read_block(block))
+
+        snapshot = RegisterSnapshot.from_blocks(
+            plan,
+            data,
+            timestamp=timestamp,
+            monotonic=started,
+            overrides=modbus.overrides,
+            generation=generation,
+        )
+
+        if known:
+            modbus._update_latest(snapshot)
+
+        return snapshot.view(names)
+
+    async def write(
+        self,
+        register: str | ModbusRegister,
+        value: int | bool | Sequence[int | bool],
+    ):
+        """Writes a value to a register."""
+
+        await self.write_many({register: value})
+
+    async def write_many(
+        self,
+        values: Mapping[str | ModbusRegister, int | bool | Sequence[int | bool]],
+    ):
+        """Writes several registers. See `.Modbus.write_many`."""
+
+        blocks = self.modbus._compile_writes(values)
+        if len(blocks) == 0:
+            return
+
+        await self._yield_to_emergency()
+        with self.modbus.breaker.guard(force=self.priority == Priority.EMERGENCY):
+            await self.modbus._send_writes(blocks)
+
+    async def verify(
+        self,
+        values: Mapping[str | ModbusRegister, Any],
+        timeout: float = 0.0,
+        interval: float = 0.1,
+    ) -> SnapshotView:
+        """Reads back registers and checks that they have the expected values.
+
+        Parameters
+        ----------
+        values
+            A mapping of register to its expected value.
+        timeout
+            How long to keep reading the registers until all of them have the
+            expected values. By default the registers are read only once.
+        interval
+            The time to wait between reads.
+
+        Returns
+        -------
+        registers
+            A `.SnapshotView` with the values read.
+
+        Raises
+        ------
+        ECPError
+            If a register does not have the expected value.
+
+        """
+
+        keys = list(values)
+        names = [key if isinstance(key, str) else key.name for key in keys]
+
+        elapsed: float = 0.0
+        while True:
+            registers = await self.read(keys)
+            mismatched = [
+                name for name, key in zip(names, keys) if registers[name] != values[key]
+            ]
+
+            if len(mismatched) == 0:
+                return registers
+
+            if elapsed >= timeout:
+                raise ECPError(f"Read-back verification failed for {mismatched}.")
+
+            await self.sleep(interval)
+            elapsed += interval
+
+    async def sleep(self, delay: float):
+        """Waits without releasing the connection, except for emergency requests."""
+
+        lock = self.modbus.lock
+        deadline = monotonic() + delay
+
+        while (remaining := deadline - monotonic()) > 0:
+            try:
+                async with asyncio.timeout(remaining):
+                    await lock.wait_for_waiter(Priority.EMERGENCY)
+            except TimeoutError:
+                break
+
+            await self._yield_to_emergency()
+
+    async def _yield_to_emergency(self):
+        """Lets emergency requests use the connection before the next request."""
+
+        lock = self.modbus.lock
+        if self.priority == Priority.EMERGENCY or lock.waiting(Priority.EMERGENCY) == 0:
+            return
+
+        # Emergency requests queued before us are served first. Then the session
+        # waits for the connection with its own priority, so it does not jump
+        # ahead of requests with the same or a higher priority.
+        self.connected = False
+        await self.modbus.disconnect()
+
+        timeout = max(self.remaining, 0) + CONNECTION_TIMEOUT
+        with self.modbus.breaker.guard():
+            await self.modbus.connect(self.priority, timeout=timeout)
+        self.connected = True
+
+
+class Modbus(dict[str, ModbusRegister]):
+    """A simple dictionary of Modbus registers.
+
+    Parameters
+    ----------
+    config
+        A YAML configuration file or dictionary with the keys ``host`` and ``port``
+        for the Modbus server, and a dictionary ``registers`` with modbus registers.
+        Each one must include a PDU ``address`` (note this is 0-indexed, and one
+        less than the register in the memory block) and optionally ``mode`` for
+        the block type (``coil``, ``holding_register``, ``discrete_input``,
+        or ``input_register``; defaults to ``coil``). If `None`, defaults to the
+        internal configuration. Idle connections are checked every
+        ``keepalive_interval`` seconds (see `._keepalive`), and
+        ``max_pdu_size`` and ``gap_tolerance`` are passed to
+        `.compile_read_plan` to generate the read plan. If ``pipeline_window``
+        is larger than one, up to that many block reads are sent back-to-back
+        on the same connection and their responses are matched by transaction
+        ID (see `.execute_plan`). ``backend`` selects the client used for the
+        connections (``pymodbus``, the default, or ``native``; see
+        `.NativeModbusClient`). ``deadline`` is the default total time for a
+        call (see `.budget`), and ``breaker_threshold`` and
+        ``breaker_reset_timeout`` configure the `.CircuitBreaker`. The last
+        ``history_size`` scans are kept in a `.RegisterHistory` (disabled if
+        zero). If ``archive_dir`` is set, all the scans are written to nightly
+        files in that directory, prefixed with ``archive_name`` (see
+        `.ArchiveWriter`).
+
+        Registers also accept the ``decoder``, ``scale``, and ``offset``
+        arguments of `.ModbusRegister`, and a mapping of ``bits`` with the names
+        and bits of virtual boolean registers extracted from the register.
+        ``byteorder`` (defaults to ``big``) and ``wordorder`` (defaults to
+        ``little``) set the order of the bytes and words of the registers with
+        a ``decoder``. The values in ``overrides`` replace the decoded values.
+
+    """
+
+    def __init__(self, config: dict | pathlib.Path | str | None = None):
+        if isinstance(config, (str, pathlib.Path)):
+            self.config = read_yaml_file(
+                str(config),
+                return_class=Configuration,
+            )["modbus"]
+        elif config is None:
+            self.config = lvmecp_config["modbus"]
+        elif isinstance(config, dict):
+            self.config = config
+
+        assert isinstance(self.config, dict)
+
+        self.host = self.config["host"]
+        self.port = self.config["port"]
+        self.slave = self.config.get("slave", 0)
+
+        # Cache results so that very close calls to read_all() don't need to
+        # read the registers again. Values expire after their max_age or
+        # cache_timeout seconds, or as soon as a register is written.
+        self.cache_timeout = self.config.get("cache_timeout", 1)
+        self.snapshot: RegisterSnapshot | None = None
+
+        # Callers that accept stale values (e.g., the status command) get values
+        # up to stale_max_age seconds old while the registers are refreshed.
+        self.stale_max_age = self.config.get("stale_max_age", STALE_MAX_AGE)
+        self._revalidate_names: set[str] = set()
+        self._revalidating: set[str] = set()
+        self._revalidate_task: asyncio.Task | None = None
+
+        # Register overrides
+        self.overrides: dict[str, Any] = self.config.get("overrides", {}) or {}
+
+        # Maximum age of the values of the registers in each polling tier.
+        self.poll_tiers = {**POLL_TIERS, **(self.config.get("poll_tiers", None) or {})}
+
+        # Persistent connection to the server. Since the lock below serialises
+        # all the requests, only one connection would ever be in use, so the
+        # pool has a single connection.
+        self.pool = ModbusConnectionPool(
+            self.host,
+            self.port,
+            slave=self.slave,
+            backend=self.config.get("backend", "pymodbus"),
+            on_connect=self._on_connect,
+        )
+        self._client: ModbusClient | None = None
+
+        self.keepalive_interval: float | None = self.config.get(
+            "keepalive_interval",
+            KEEPALIVE_INTERVAL,
+        )
+        self._keepalive_task: asyncio.Task | None = None
+
+        # Lock to allow only one request at a time. Queued requests are served
+        # in order of priority.
+        self.lock = PriorityLock()
+
+        # The lease of the connection by the holder of the lock. A single
+        # watchdog task releases the connection if a lease expires.
+        self.lease: Lease | None = None
+        self.watchdog_stats: dict[str, int] = {"wakeups": 0, "expired": 0}
+        self._watchdog_task: asyncio.Task | None = None
+        self._watchdog_event = asyncio.Event()
+        self._watchdog_deadline: float = math.inf
+
+        # Fail fast while the server is not responding, and limit the total time
+        # of each call, including the wait for the lock and the retries.
+        self.breaker = CircuitBreaker(
+            f"{self.host}:{self.port}",
+            threshold=self.config.get("breaker_threshold", BREAKER_THRESHOLD),
+            reset_timeout=self.config.get(
+                "breaker_reset_timeout",
+                BREAKER_RESET_TIMEOUT,
+            ),
+        )
+        self.deadline: float = self.config.get("deadline", DEADLINE)
+
+        # Byte and word order of the registers that span several words.
+        self.byteorder: ByteOrder = self.config.get("byteorder", "big")
+        self.wordorder: ByteOrder = self.config.get("wordorder", "little")
+        for order in (self.byteorder, self.wordorder):
+            if order not in ("big", "little"):
+                raise ValueError(f"Invalid byte or word order {order!r}.")
+
+        # Create the internal dictionary of registers. The bits of a register
+        # listed in its "bits" mapping are added as virtual boolean registers.
+        registers: dict[str, ModbusRegister] = {}
+        for name, register in self.config["registers"].items():
+            registers[name] = ModbusRegister(
+                self,
+                name,
+                register["address"],
+                mode=register.get("mode", "coil"),
+                group=register.get("group", None),
+                count=register.get("count", None),
+                decoder=register.get("decoder", None),
+                readonly=register.get("readonly", True),
+                max_age=self._get_max_age(name, register),
+                byteorder=self.byteorder,
+                wordorder=self.wordorder,
+                scale=register.get("scale", None),
+                offset=register.get("offset", None),
+            )
+
+            for bit_name, bit in (register.get("bits", None) or {}).items():
+                if bit_name in self.config["registers"] or bit_name in registers:
+                    raise ValueError(f"Duplicate register {bit_name!r}.")
+
+                registers[bit_name] = ModbusRegister(
+                    self,
+                    bit_name,
+                    register["address"],
+                    mode=register.get("mode", "coil"),
+                    group=register.get("group", None),
+                    readonly=True,
+                    max_age=registers[name].max_age,
+                    bit=bit,
+                )
+
+        dict.__init__(self, registers)
+        for name, register in registers.items():
+            setattr(self, name, register)
+
+        self.cache = RegisterCache(
+            {name: register.max_age for name, register in registers.items()}
+        )
+
+        # Compile the plan to read all the registers in the minimum number of reads.
+        self.max_pdu_size = self.config.get("max_pdu_size", MAX_PDU_SIZE)
+        self.gap_tolerance = self.config.get("gap_tolerance", GAP_TOLERANCE)
+        self.plan = self.compile_plan(self.values())
+        self._plans: dict[frozenset[str], ReadPlan] = {self.plan.names: self.plan}
+
+        # Ring buffer with the recent scans. Disabled if history_size is zero.
+        history_size = int(self.config.get("history_size", HISTORY_SIZE) or 0)
+        self.history: RegisterHistory | None = None
+        if history_size > 0:
+            self.history = RegisterHistory(self.plan, history_size)
+
+        # Nightly on-disk archive of all the scans, if archive_dir is set.
+        self.archive: ArchiveWriter | None = None
+        if archive_dir := self.config.get("archive_dir", None):
+            self.archive = ArchiveWriter(
+                self.plan,
+                archive_dir,
+                name=self.config.get("archive_name", "plc"),
+                metadata={"host": self.host, "port": self.port},
+            )
+
+        # Number of block reads that can be in flight at once. Pipelining is
+        # disabled by default since not all servers support it.
+        self.pipeline_window = int(self.config.get("pipeline_window", 1) or 1)
+        if self.pipeline_window < 1:
+            raise ValueError("pipeline_window must be at least 1.")
+        self._pipeline_warned: bool = False
+
+        # Scans in progress, shared with concurrent callers that need a subset of
+        # their registers that has not been written since the scan started.
+        self._scans: list[_InFlightScan] = []
+
+        # The registers affected by each write, by mode, address, and count.
+        self._written_names: dict[tuple[str, int, int], list[str]] = {}
+        self.scan_stats: dict[str, int] = {"scans": 0, "joined": 0}
+
+        # Open watches, fed with every snapshot that is cached, and the scan
+        # scheduler used by watches that need their registers polled.
+        self._watches: list[RegisterWatch] = []
+        self.scheduler: ScanScheduler | None = None
+
+        # Names of the registers in each group.
+        self.groups: dict[str, list[str]] = {}
+        for name, register in registers.items():
+            if register.group is not None:
+                self.groups.setdefault(register.group, []).append(name)
+
+        log.debug(
+            f"Modbus connection to {self.host}:{self.port} initialised "
+            f"with cache timeout {self.cache_timeout} seconds."
+        )
+
+    def _get_max_age(self, name: str, register: dict[str, Any]) -> float | None:
+        """Returns the maximum age of a register from its configuration.
+
+        The maximum age can be set with the ``max_age`` or the ``poll_tier``
+        attributes of the register. If neither is set, the ``poll_tier`` of the
+        Modbus configuration, if any, is used.
+
+        """
+
+        if (max_age := register.get("max_age", None)) is not None:
+            return float(max_age)
+
+        tier = register.get("poll_tier", self.config.get("poll_tier", None))
+        if tier is None:
+            return None
+
+        if tier not in self.poll_tiers:
+            raise ValueError(f"Invalid poll tier {tier!r} for register {name!r}.")
+
+        return float(self.poll_tiers[tier])
+
+    def get_max_age(self, names: Iterable[str]) -> float:
+        """Returns the maximum age of a cached value that includes ``names``.
+
+        This is the minimum of the ``max_age`` of the registers, using the
+        cache timeout for registers without a ``max_age``.
+
+        """
+
+        return self.cache.get_max_age(names, self.cache_timeout)
+
+    def get_age(self, name: str) -> float:
+        """Returns the seconds since a register was last read.
+
+        Returns infinity if the register has not been read or if a register has
+        been written since the last time it was read.
+
+        """
+
+        return self.cache.age(name)
+
+    def get_quality(self, snapshot: RegisterSnapshot) -> dict[str, Quality]:
+        """Returns the quality of the value of each register in a snapshot.
+
+        A value is `.Quality.STALE` if the snapshot is older than the
+        ``max_age`` of the register (or ``cache_timeout`` if it has none), or if
+        the register has been written since the snapshot was read.
+
+        """
+
+        names = list(snapshot)
+        slots = self.cache.get_slots(names)
+
+        limits = self.cache.limits(self.cache_timeout)[slots]
+        stale = snapshot.age >= limits
+        stale |= self.cache.written_since(slots, snapshot.generation)
+
+        return {
+            name: Quality.STALE if is_stale else Quality.GOOD
+            for name, is_stale in zip(names, stale.tolist())
+        }
+
+    @property
+    def client(self) -> ModbusClient:
+        """The leased client or, if none, the first client in the pool."""
+
+        return self._client or self.pool.clients[0]
+
+    async def connect(
+        self,
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: float | None = None,
+    ):
+        """Acquires the lock and leases a connection from the pool.
+
+        If the connection is not returned after ``timeout`` seconds (defaults to
+        ``CONNECTION_TIMEOUT``), it is discarded and the lock released by the
+        lease watchdog (see `._watchdog`).
+
+        """
+
+        try:
+            async with asyncio.timeout(CONNECTION_TIMEOUT):
+                await self.lock.acquire(priority)
+        except TimeoutError:
+            raise RuntimeError("Timed out waiting for lock to be released.")
+
+        try:
+            self._client = await self.pool.acquire()
+        except BaseException:
+            if self.lock.locked():
+                self.lock.release()
+            raise
+
+        # Record the lease so that the watchdog releases the lock after a timeout.
+        # This is a safeguard in case something fails and the connection is
+        # never returned and the lock not released.
+        now = monotonic()
+        self.lease = Lease(
+            task=asyncio.current_task(),
+            priority=priority,
+            acquired_at=now,
+            deadline=now + (timeout or CONNECTION_TIMEOUT),
+        )
+        self._watch(self.lease)
+
+    async def disconnect(self, discard: bool = False):
+        """Returns the connection to the pool and releases the lock.
+
+        The connection is kept open unless ``discard=True``. Does nothing if the
+        lease of the current task has expired and the connection has already
+        been released by the watchdog.
+
+        """
+
+        lease = self.lease
+        if lease is None or lease.task is not asyncio.current_task():
+            if self.lock.locked():
+                # Another task holds the connection now, or is acquiring it.
+                log.debug("Ignoring disconnect from a task without the lease.")
+                return
+
+        await self._release(discard=discard)
+
+    async def _release(self, discard: bool = False):
+        """Returns the connection to the pool and releases the lock."""
+
+        self.lease = None
+
+        try:
+            client, self._client = self._client, None
+            if client:
+                await self.pool.release(client, discard=discard)
+
+        finally:
+            if self.lock.locked():
+                self.lock.release()
+
+    def _watch(self, lease: Lease):
+        """Starts the watchdog, or wakes it up if ``lease`` expires first."""
+
+        if self._watchdog_task is None or self._watchdog_task.done():
+            self._watchdog_task = asyncio.create_task(self._watchdog())
+        elif lease.deadline < self._watchdog_deadline:
+            self._watchdog_event.set()
+
+    async def _watchdog(self):
+        """Releases the connection when the lease of its holder expires.
+
+        The watchdog sleeps until the deadline of the current lease and is only
+        woken up early if a new lease expires before that. Leases that are
+        returned before the watchdog wakes up do not need any work, so the
+        watchdog wakes up at most once per lease timeout regardless of the
+        number of transactions.
+
+        """
+
+        event = self._watchdog_event
+
+        while True:
+            lease = self.lease
+
+            if lease is None:
+                self._watchdog_deadline = math.inf
+                await event.wait()
+            elif (delay := lease.deadline - monotonic()) > 0:
+                self._watchdog_deadline = lease.deadline
+                try:
+                    async with asyncio.timeout(delay):
+                        await event.wait()
+                except TimeoutError:
+                    pass
+            else:
+                self.watchdog_stats["expired"] += 1
+                log.warning(
+                    f"Lease of the connection to {self.host}:{self.port} held by "
+                    f"{lease.holder} expired after "
+                    f"{monotonic() - lease.acquired_at:.1f} s. Releasing it."
+                )
+
+                # The connection may be in a bad state so it is closed and will
+                # be reopened in the background.
+                await self._release(discard=True)
+
+            event.clear()
+            self.watchdog_stats["wakeups"] += 1
+
+    def _on_connect(self, client: ModbusClient):
+        """Starts the keepalive task when the connection is first opened."""
+
+        if self.keepalive_interval and self._keepalive_task is None:
+            self._keepalive_task = asyncio.create_task(self._keepalive())
+
+    async def _keepalive(self):
+        """Checks the connection periodically and reopens it if it was dropped.
+
+        The keepalive request is a `.Priority.BACKGROUND` `.request`, so it is
+        only sent when the connection is free, any other request queued at the
+        same time goes first, and its failures count against the
+        `.CircuitBreaker`. The check is skipped if the connection is in use.
+
+        """
+
+        assert self.keepalive_interval
+
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+
+            if self.lock.locked() or self.lock.waiting() > 0:
+                continue
+
+            try:
+                # Acquiring the client reopens the connection if it was dropped.
+                async with self.request(Priority.BACKGROUND) as client:
+                    await self.pool.ping(client)
+            except Exception as err:
+                log.debug(f"Keepalive to {self.host}:{self.port} failed: {err}")
+
+    async def close(self):
+        """Closes all the connections to the server."""
+
+        self._revalidate_task = await cancel_task(self._revalidate_task)
+        self._watchdog_task = await cancel_task(self._watchdog_task)
+        self._keepalive_task = await cancel_task(self._keepalive_task)
+
+        for watch in list(self._watches):
+            await watch.close()
+
+        if self.archive is not None:
+            await self.archive.close()
+
+        await self.pool.close()
+
+    @asynccontextmanager
+    async def request(
+        self,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> AsyncIterator[ModbusClient]:
+        """Holds the connection for a single request with a given priority.
+
+        The lock is granted to the queued request with the highest `.Priority`
+        so, for example, an emergency write waits at most for the request that
+        is currently in flight. Raises `.CircuitOpenError` without waiting for
+        the lock if the `.CircuitBreaker` is open, except for emergency requests,
+        which are always sent.
+
+        """
+
+        with self.breaker.guard(force=priority == Priority.EMERGENCY):
+            await self.connect(priority)
+
+            try:
+                yield self.client
+            finally:
+                await self.disconnect()
+
+    @asynccontextmanager
+    async def session(
+        self,
+        priority: Priority = Priority.CONTROL,
+        timeout: float = SESSION_TIMEOUT,
+    ) -> AsyncIterator[ModbusSession]:
+        """Holds the connection for a sequence of requests.
+
+        Use as ``async with modbus.session() as session`` and send the requests
+        with the methods of the `.ModbusSession`. No other request is sent until
+        the session ends, except emergency requests, which are sent between
+        the requests of the session and during `.ModbusSession.sleep`. When the
+        session yields the connection to an emergency request, it waits for it
+        again with its own priority, so requests queued with the same or a
+        higher priority are also sent first. Other calls to this `.Modbus` from
+        within the session block until it ends. Only the requests of the
+        session count for the `.CircuitBreaker`, not errors raised by the code
+        in the block.
+
+        Parameters
+        ----------
+        priority
+            The `.Priority` with which the session waits for the connection.
+        timeout
+            The deadline, in seconds, for the session, including the wait for
+            the connection. If the session has not finished by then it is
+            cancelled, the connection is released, and a `.DeadlineExceededError`
+            is raised.
+
+        """
+
+        session = ModbusSession(self, priority, monotonic() + timeout)
+        session.connected = False
+
+        deadline = asyncio.timeout(timeout)
+
+        try:
+            async with deadline:
+                # Only the requests are guarded by the breaker (see ModbusSession),
+                # so that errors in the code of the caller are not counted.
+                with self.breaker.guard(force=priority == Priority.EMERGENCY):
+                    # The safeguard in connect() must not fire before the deadline.
+                    await self.connect(priority, timeout=timeout + CONNECTION_TIMEOUT)
+                session.connected = True
+
+                yield session
+        except TimeoutError as err:
+            if deadline.expired():
+                raise DeadlineExceededError(
+                    f"Modbus session exceeded its {timeout} s deadline."
+                )
+            raise err
+        finally:
+            if session.connected:
+                session.connected = False
+                await self.disconnect()
+
+    @asynccontextmanager
+    async def budget(self, timeout: float | None = None) -> AsyncIterator[None]:
+        """Limits the total time of a call to the server.
+
+        Use as ``async with modbus.budget()``. The budget includes the wait for
+        the lock, opening the connection, and all the retries. If the call has
+        not finished after ``timeout`` seconds (defaults to ``deadline``), it is
+        cancelled and a `.DeadlineExceededError` is raised.
+
+        """
+
+        timeout = self.deadline if timeout is None else timeout
+        deadline = asyncio.timeout(timeout)
+
+        try:
+            async with deadline:
+                yield
+        except TimeoutError as err:
+            if deadline.expired():
+                raise DeadlineExceededError(
+                    f"Call to {self.host}:{self.port} exceeded its {timeout} s "
+                    "deadline."
+                )
+            raise err
+
+    async def __aenter__(self):
+        """Initialises the connection to the server."""
+
+        await self.connect()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        """Closes the connection to the server."""
+
+        await self.disconnect()
+
+    def get_plan(self, names: Iterable[str] | None = None) -> ReadPlan:
+        """Returns the read plan for a set of registers.
+
+        Plans are compiled the first time a set of registers is requested and
+        cached. If ``names`` is `None`, returns the plan for all the registers.
+
+        """
+
+        if names is None:
+            return self.plan
+
+        key = frozenset(names)
+        if (plan := self._plans.get(key)) is None:
+            if unknown := key.difference(self):
+                raise ValueError(f"Unknown registers {sorted(unknown)!r}.")
+
+            plan = self._plans[key] = self.compile_plan(self[name] for name in key)
+
+        return plan
+
+    def compile_plan(self, registers: Iterable[ModbusRegister]) -> ReadPlan:
+        """Compiles a read plan for a list of registers."""
+
+        return compile_read_plan(
+            registers,
+            max_pdu_size=self.max_pdu_size,
+            gap_tolerance=self.gap_tolerance,
+        )
+
+    async def scan(
+        self,
+        plan: ReadPlan,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> RegisterSnapshot:
+        """Executes a read plan, sharing the result with concurrent callers.
+
+        If a scan that covers all the registers in ``plan`` is already in
+        progress, waits for it and returns its snapshot (which may include
+        other registers) instead of reading the registers again. Scans are only
+        shared if none of the registers in ``plan`` has been written since they
+        started. ``priority``
+        is the `.Priority` of each request in a new scan.
+
+        """
+
+        registers = plan.registers
+        slots = self.cache.get_plan_slots(plan)
+
+        for scan in self._scans:
+            if not registers.issubset(scan.registers):
+                continue
+            if self.cache.written_since(slots, scan.generation).any():
+                continue
+
+            try:
+                snapshot = await asyncio.shield(scan.future)
+            except asyncio.CancelledError:
+                # If the scan we joined was cancelled but we were not, run our own.
+                task = asyncio.current_task()
+                if not scan.future.cancelled() or (task and task.cancelling()):
+                    raise
+                break
+
+            self.scan_stats["joined"] += 1
+            return snapshot
+
+        loop = asyncio.get_running_loop()
+        scan = _InFlightScan(registers, self.cache.generation, loop.create_future())
+        self._scans.append(scan)
+
+        try:
+            snapshot = await self.execute_plan(
+                plan,
+                generation=scan.generation,
+                priority=priority,
+            )
+        except asyncio.CancelledError:
+            scan.future.cancel()
+            raise
+        except Exception as err:
+            scan.future.set_exception(err)
+            scan.future.exception()  # Mark as retrieved if nobody joined.
+            raise
+        else:
+            scan.future.set_result(snapshot)
+        finally:
+            self._scans.remove(scan)
+            self.scan_stats["scans"] += 1
+
+        self._update_latest(snapshot)
+
+        return snapshot
+
+    async def execute_plan(
+        self,
+        plan: ReadPlan,
+        generation: int | None = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> RegisterSnapshot:
+        """Reads the blocks in a plan and returns a snapshot of its registers.
+
+        Each block is a separate request with the given ``priority``, so requests
+        with higher priority can be sent between the blocks of a scan. If
+        ``pipeline_window`` is larger than one, the blocks are read in batches of
+        that size. The requests in a batch are sent without waiting for the
+        responses, which are matched to their request by transaction ID. A batch
+        takes about one network round-trip, and requests with higher priority
+        are sent between batches.
+
+        """
+
+        if generation is None:
+            generation = self.cache.generation
+
+        window = self.pipeline_window
+
+        data: list[BlockData] = []
+        timestamp: float = 0.0
+        started: float = 0.0
+        for ii in range(0, len(plan.blocks), window):
+            blocks = plan.blocks[ii : ii + window]
+            async with self.request(priority):
+                if len(data) == 0:
+                    timestamp = time()
+                    started = monotonic()
+                if len(blocks) == 1:
+                    data.append(await self._read_block(blocks[0]))
+                else:
+                    data.extend(await self._read_pipelined(blocks))
+
+        return RegisterSnapshot.from_blocks(
+            plan,
+            data,
+            timestamp=timestamp,
+            monotonic=started,
+            overrides=self.overrides,
+            generation=generation,
+        )
+
+    async def _read_block(self, block: ReadBlock) -> BlockData:
+        """Reads a block. Must be called with the connection open."""
+
+        client = self.client
+
+        if block.mode == "coil":
+            func = client.read_coils
+        elif block.mode == "discrete_input":
+            func = client.read_discrete_inputs
+        elif block.mode == "holding_register":
+            func = client.read_holding_registers
+        elif block.mode == "input_register":
+            func = client.read_input_registers
+        else:
+            raise ValueError(f"Invalid mode {block.mode!r}.")
+
+        resp = await func(block.address, count=block.count, slave=self.slave)
+
+        return self._get_block_data(block, resp)
+
+    async def _read_pipelined(
+        self,
+        blocks: Sequence[ReadBlock],
+    ) -> list[BlockData]:
+        """Reads several blocks without waiting for each response.
+
+        The requests are written back-to-back to the leased connection and the
+        responses are matched to the requests by transaction ID. Must be called
+        with the connection open.
+
+        With the ``pymodbus`` backend this uses the transaction manager and the
+        framer of the client, which are internals of pymodbus 3.6. If the
+        installed version does not have them (see `.supports_pipelining`), the
+        blocks are read one after the other. The ``native`` backend does not
+        depend on them.
+
+        """
+
+        client = self.client
+
+        if isinstance(client, NativeModbusClient):
+            native_responses = await client.read_many(
+                [(block.function_code, block.address, block.count) for block in blocks],
+                slave=self.slave,
+            )
+            return [
+                self._get_block_data(block, resp)
+                for block, resp in zip(blocks, native_responses)
+            ]
+
+        if not supports_pipelining(client):
+            if not self._pipeline_warned:
+                log.warning(
+                    "The pymodbus client does not support pipelining. "
+                    "Reading blocks sequentially."
+                )
+                self._pipeline_warned = True
+            return [await self._read_block(block) for block in blocks]
+
+        requests: list[ModbusRequest] = []
+        futures: list[asyncio.Future[ModbusResponse]] = []
+
+        client.framer.resetFrame()
+
+        try:
+            for block in blocks:
+                request = READ_REQUESTS[block.mode](
+                    block.address,
+                    block.count,
+                    slave=self.slave,
+                )
+                request.transaction_id = client.transaction.getNextTID()
+                requests.append(request)
+
+                futures.append(client.build_response(request.transaction_id))
+                client.send(client.framer.buildPacket(request))
+
+            async with asyncio.timeout(REQUEST_TIMEOUT):
+                responses = await asyncio.gather(*futures)
+
+        except TimeoutError:
+            # Late responses would be mistaken for the next ones.
+            client.close()
+            raise ConnectionError("Timed out waiting for pipelined responses.")
+
+        finally:
+            for request in requests:
+                client.transaction.delTransaction(request.transaction_id)
+
+        return [
+            self._get_block_data(block, resp) for block, resp in zip(blocks, responses)
+        ]
+
+    def _get_block_data(
+        self,
+        block: ReadBlock,
+        resp: ModbusResponse | NativeResponse,
+    ) -> BlockData:
+        """Returns the bits or words in the response to a block read.
+
+        The bits in the response of the native client are returned packed.
+
+        """
+
+        if resp.isError():
+            raise ValueError(
+                f"Invalid response for block {block.mode!r} at address "
+                f"{block.address}: 0x{resp.function_code:02X}."
+            )
+
+        if not block.is_bits:
+            return resp.registers
+        elif isinstance(resp, NativeResponse):
+            return resp.packed
+
+        return resp.bits
+
+    def _update_latest(self, snapshot: RegisterSnapshot):
+        """Records a snapshot as the latest source of values for its registers."""
+
+        # Registers written after the scan started are not cached. Snapshots with
+        # any of them are not recorded or sent to the watches.
+        self.cache.update(snapshot)
+
+        slots = self.cache.get_plan_slots(snapshot.plan)
+        if not self.cache.written_since(slots, snapshot.generation).any():
+            if self.history is not None:
+                self.history.append(snapshot)
+
+            if self.archive is not None:
+                self.archive.write(snapshot)
+
+            for watch in list(self._watches):
+                watch.feed(snapshot)
+
+        if snapshot.plan is self.plan:
+            self.snapshot = snapshot
+
+    def _invalidate(self, names: Iterable[str]):
+        """Expires the cached values of some registers after they are written.
+
+        Scans in progress are not shared with callers that need the registers,
+        and their values in those scans are not cached.
+
+        """
+
+        names = list(names)
+        if len(names) > 0:
+            self.cache.invalidate(names)
+
+    def _get_written(self, mode: str, address: int, count: int) -> list[str]:
+        """Returns the registers that include some written elements.
+
+        Includes the virtual booleans of a written word, and any register whose
+        elements overlap the write.
+
+        """
+
+        key = (mode, address, count)
+
+        names = self._written_names.get(key)
+        if names is None:
+            names = [
+                name
+                for name, register in self.items()
+                if register.mode == mode
+                and register.address < address + count
+                and address < register.address + register.count
+            ]
+            self._written_names[key] = names
+
+        return names
+
+    def _is_fresh(
+        self,
+        snapshot: RegisterSnapshot | None,
+        max_age: float | None = None,
+    ) -> bool:
+        """Checks whether a snapshot can be used as a fresh cached value."""
+
+        if snapshot is None:
+            return False
+
+        slots = self.cache.get_plan_slots(snapshot.plan)
+        if self.cache.written_since(slots, snapshot.generation).any():
+            return False
+
+        return snapshot.age < (max_age if max_age is not None else self.cache_timeout)
+
+    def get_cached(
+        self,
+        names: Iterable[str],
+        max_age: float | None = None,
+    ) -> SnapshotView | None:
+        """Returns a view of a fresh snapshot that contains all ``names``.
+
+        Returns :obj:`None` if the registers have not been read within their
+        ``max_age`` (or ``cache_timeout`` seconds for registers without one), if
+        a register has been written since then, or if there is no single
+        snapshot that covers all the registers. If ``max_age`` is set, older
+        snapshots, and snapshots read before a write, are accepted up to that
+        age as stale values (see `.RegisterCache.get`).
+
+        """
+
+        return self.cache.get(names, self.cache_timeout, max_age=max_age)
+
+    def revalidate(self, names: Iterable[str] | None = None) -> asyncio.Task:
+        """Refreshes the cached values of some registers in the background.
+
+        At most one background refresh runs at a time. Registers requested
+        while a refresh is running are read in a new scan when it finishes,
+        unless the running scan already includes them. Errors are logged and
+        not raised. Returns the refresh task.
+
+        """
+
+        names = set(self if names is None else names)
+        self._revalidate_names.update(names - self._revalidating)
+
+        if self._revalidate_task is None or self._revalidate_task.done():
+            self._revalidate_task = asyncio.create_task(self._revalidate())
+
+        return self._revalidate_task
+
+    async def _revalidate(self):
+        """Reads the registers pending revalidation."""
+
+        while len(self._revalidate_names) > 0:
+            names, self._revalidate_names = self._revalidate_names, set()
+            self._revalidating = names
+
+            try:
+                async with self.budget():
+                    await self.scan(self.get_plan(names), priority=Priority.BACKGROUND)
+            except Exception as err:
+                log.warning(f"Failed refreshing stale registers: {err}")
+            finally:
+                self._revalidating = set()
+
+    def watch(
+        self,
+        names: Iterable[str],
+        predicate: WatchPredicate | None = None,
+        interval: float | None = None,
+    ) -> RegisterWatch:
+        """Returns an async iterator of the changes in some registers.
+
+        The registers are not read by the watch. The changes are found in the
+        snapshots of the scans that happen anyway (scheduler polls, reads from
+        other callers, and sessions) so waiting code wakes up as soon as a scan
+        shows the change. See `.RegisterWatch` for details.
+
+        Parameters
+        ----------
+        names
+            The names of the registers to watch.
+        predicate
+            A function that receives each `.RegisterChange` and returns whether
+            it should be yielded.
+        interval
+            If set, the registers are polled by `.scheduler` at least every
+            ``interval`` seconds while the watch is open.
+
+        """
+
+        return RegisterWatch(self, names, predicate=predicate, interval=interval)
+
+    async def wait_for(
+        self,
+        name: str,
+        value: Any,
+        timeout: float | None = None,
+        interval: float | None = None,
+    ):
+        """Waits until a register has a given value.
+
+        Returns immediately if the cached value of the register is fresh and
+        equal to ``value``. Otherwise waits for a scan in which the register has
+        that value. Raises :obj:`TimeoutError` if that does not happen within
+        ``timeout`` seconds, or :obj:`ConnectionError` if the connection is
+        closed while waiting. ``interval`` is passed to `.watch`.
+
+        """
+
+        async with self.watch(
+            [name],
+            predicate=lambda change: change.new == value,
+            interval=interval,
+        ) as watch:
+            # The watch is created first so that a scan that finishes after
+            # checking the cache is not missed.
+            cached = self.get_cached([name])
+            if cached is not None and cached[name] == value:
+                return
+
+            async with asyncio.timeout(timeout):
+                try:
+                    await anext(watch)
+                except StopAsyncIteration:
+                    raise ConnectionError(f"Connection closed waiting for {name!r}.")
+
+    async def read_all(
+        self,
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        max_age: float | None = None,
+        timeout: float | None = None,
+    ) -> RegisterSnapshot:
+        """Returns a snapshot with all the registers.
+
+        If ``use_cache=True`` and the last full scan is still fresh, returns
+        that snapshot without reading the registers. If ``max_age`` is set and
+        the last full scan has expired, or some of its registers have been
+        written since, but it is younger than ``max_age``, returns it
+        immediately and refreshes all the registers in the background (see
+        `.revalidate`); `.get_quality` tells which values are stale. Otherwise
+        the registers are read within ``timeout`` seconds (see `.budget`).
+
+        """
+
+        snapshot = self.snapshot
+        limit = self.cache.get_max_age(None, self.cache_timeout)
+
+        if use_cache and snapshot is not None:
+            if self._is_fresh(snapshot, limit):
+                return snapshot
+
+            if max_age is not None and snapshot.age < max_age:
+                self.revalidate()
+                return snapshot
+
+        async with self.budget(timeout):
+            return await self.scan(self.plan, priority=priority)
+
+    async def read_registers(
+        self,
+        names: Iterable[str],
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        max_age: float | None = None,
+        timeout: float | None = None,
+    ) -> SnapshotView:
+        """Reads a list of registers.
+
+        Only the blocks that contain the requested registers are read, using
+        a plan that is compiled once and cached for each set of registers.
+
+        Parameters
+        ----------
+        names
+            The names of the registers to read.
+        use_cache
+            If :obj:`True` and all the registers have been read recently,
+            returns the cached values without reading the registers.
+        priority
+            The `.Priority` of the read requests.
+        max_age
+            The maximum age, in seconds, of the values that the caller accepts.
+            If the registers have expired, or have been written since they were
+            read, but are younger than ``max_age``, returns their cached values
+            immediately, with `.Quality.STALE`, and
+            refreshes them in the background (see `.revalidate`). Only callers
+            without a ``max_age`` wait for a new read.
+        timeout
+            The total time, in seconds, for the call, including the wait for the
+            lock, opening the connection, and the retries. Defaults to the
+            ``deadline`` of the `.Modbus`. See `.Modbus.budget`.
+
+        Returns
+        -------
+        view
+            A `.SnapshotView` with the values of the registers.
+
+        """
+
+        names = list(names)
+
+        if use_cache and (cached := self.get_cached(names, max_age)) is not None:
+            if cached.quality is Quality.STALE:
+                self.revalidate(names)
+            return cached
+
+        async with self.budget(timeout):
+            snapshot = await self.scan(self.get_plan(names), priority=priority)
+
+        return snapshot.view(names)
+
+    async def read_group(
+        self,
+        group: str,
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        max_age: float | None = None,
+        timeout: float | None = None,
+    ):
+        """Returns a view with all the registers that match a ``group``."""
+
+        if group not in self.groups:
+            return {}
+
+        return await self.read_registers(
+            self.groups[group],
+            use_cache=use_cache,
+            priority=priority,
+            max_age=max_age,
+            timeout=timeout,
+        )
+
+    async def read_register(
+        self,
+        register: str,
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        max_age: float | None = None,
+        timeout: float | None = None,
+    ) -> int | bool:
+        """Reads a register."""
+
+        if register not in self:
+            raise ValueError(f"Register {register!r} not found.")
+
+        return await self[register].read(
+            use_cache=use_cache,
+            priority=priority,
+            max_age=max_age,
+            timeout=timeout,
+        )
+
+    async def write_register(
+        self,
+        register: str,
+        value: int | bool,
+        priority: Priority = Priority.CONTROL,
+        timeout: float | None = None,
+    ):
+        """Writes a value to a register."""
+
+        assert isinstance(register, str)
+
+        if register not in self:
+            raise ValueError(f"Register {register!r} not found.")
+
+        await self[register].write(value, priority=priority, timeout=timeout)
+
+    async def write_many(
+        self,
+        values: Mapping[str, int | bool | Sequence[int | bool]],
+        priority: Priority = Priority.CONTROL,
+        timeout: float | None = None,
+    ) -> list[WriteBlock]:
+        """Writes several registers in a single session.
+
+        Registers at adjacent addresses are written with a single FC15 (coils) or
+        FC16 (holding registers) request, and the rest with FC5 or FC6. All the
+        requests are sent while holding the connection, so no other request is
+        sent between them, and the cached values of the registers that were
+        written are invalidated once for the whole batch. Requests are sent in
+        order of address, not in the order of ``values``; use separate calls if
+        the order matters.
+
+        Parameters
+        ----------
+        values
+            A mapping of register name to the value to write. Registers with more
+            than one element require a list of values.
+        priority
+            The `.Priority` of the write requests.
+        timeout
+            The total time, in seconds, for the call, including the wait for the
+            lock, opening the connection, and the retries. Defaults to the
+            ``deadline`` of the `.Modbus`. See `.budget`.
+
+        Returns
+        -------
+        blocks
+            The list of `.WriteBlock`, one per request sent.
+
+        """
+
+        blocks = self._compile_writes(values)
+        if len(blocks) > 0:
+            async with self.budget(timeout):
+                await self._write_blocks(list(blocks), priority=priority)
+
+        return blocks
+
+    def _compile_writes(
+        self,
+        values: Mapping[str, int | bool | Sequence[int | bool]]
+        | Mapping[str | ModbusRegister, int | bool | Sequence[int | bool]],
+    ) -> list[WriteBlock]:
+        """Validates the registers to write and groups them in blocks."""
+
+        writes: list[tuple[ModbusRegister, Sequence[int | bool]]] = []
+        for key, value in values.items():
+            if isinstance(key, ModbusRegister):
+                register = key
+            elif key in self:
+                register = self[key]
+            else:
+                raise ValueError(f"Register {key!r} not found.")
+
+            if register.readonly:
+                raise ECPError(f"Register {register.name!r} is read-only.")
+
+            if isinstance(value, (list, tuple, numpy.ndarray)):
+                value = [v.item() if isinstance(v, numpy.generic) else v for v in value]
+            else:
+                value = [value]
+
+            writes.append((register, value))
+
+        return compile_writes(writes)
+
+    @Retrier(
+        max_attempts=MAX_RETRIES,
+        delay=0.5,
+        max_delay=2.0,
+        raise_on_exception_class=[CircuitOpenError],
+    )
+    async def _write_blocks(self, blocks: list[WriteBlock], priority: Priority):
+        """Writes a list of blocks while holding the connection.
+
+        The blocks are removed from ``blocks`` as they are written (see
+        `._send_writes`), so a retry after a failure resumes from the block
+        that failed instead of writing the previous ones again.
+
+        """
+
+        async with self.request(priority):
+            await self._send_writes(blocks)
+
+    async def _send_writes(self, blocks: list[WriteBlock]):
+        """Sends the write requests for a list of blocks.
+
+        Each block is removed from the start of ``blocks`` once its request has
+        succeeded, so after a failure the list has the blocks that were not
+        written. Must be called with the connection open.
+
+        """
+
+        client = self.client
+        written: list[str] = []
+
+        try:
+            while len(blocks) > 0:
+                block = blocks[0]
+                values = list(block.values)
+
+                if block.function_code == 5:
+                    func, value = client.write_coil, values[0]
+                elif block.function_code == 6:
+                    func, value = client.write_register, values[0]
+                elif block.function_code == 15:
+                    func, value = client.write_coils, values
+                else:
+                    func, value = client.write_registers, values
+
+                resp = await func(block.address, value, slave=self.slave)
+
+                if resp.isError():
+                    raise ECPError(
+                        f"Invalid response writing {list(block.names)}: "
+                        f"0x{resp.function_code:02X}."
+                    )
+
+                log.debug(
+                    f"Written values {values} to registers {list(block.names)} "
+                    f"({block.mode}-{block.address}, FC{block.function_code})."
+                )
+
+                written += self._get_written(block.mode, block.address, len(values))
+                blocks.pop(0)
+
+        finally:
+            # Only the registers that were written are expired, once per batch.
+            self._invalidate(written)
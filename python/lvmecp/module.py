@@ -17,6 +17,7 @@ from typing import (
     Callable,
     Coroutine,
     Generic,
+    Mapping,
     Sequence,
     Type,
     TypeVar,
@@ -30,12 +31,20 @@ if TYPE_CHECKING:
     from lvmecp.maskbits import Maskbit
     from lvmecp.modbus import Modbus
     from lvmecp.plc import PLC
+    from lvmecp.scheduler import ScanScheduler, Subscription
 
 Flag_co = TypeVar("Flag_co", bound="Maskbit")
 
 
 class PLCModule(abc.ABC, Generic[Flag_co]):
-    """A module associated with a group of PLC variables."""
+    """A module associated with a group of PLC variables.
+
+    If a `.ScanScheduler` is provided, the module subscribes to it with the
+    registers returned by `.get_registers` and is updated with the values that
+    the scheduler reads every ``interval`` seconds. Otherwise the module runs
+    its own update loop.
+
+    """
 
     flag: Type[Flag_co] | None = None
     interval: float | None = 10.0
@@ -48,10 +57,12 @@ class PLCModule(abc.ABC, Generic[Flag_co]):
         interval: float | None = None,
         start: bool = True,
         notifier: Callable[[int, str, dict], Callable | Coroutine] | None = None,
+        scheduler: ScanScheduler | None = None,
     ):
         self.name = name
         self.plc = plc
         self.modbus = modbus or plc.modbus
+        self.scheduler = scheduler
 
         assert hasattr(self, "flag"), "flag not defined."
 
@@ -61,6 +72,7 @@ class PLCModule(abc.ABC, Generic[Flag_co]):
         self.notifier = notifier
 
         self._update_loop_task: asyncio.Task | None = None
+        self._subscription: Subscription | None = None
         if start:
             asyncio.create_task(self.start())
 
@@ -76,9 +88,35 @@ class PLCModule(abc.ABC, Generic[Flag_co]):
 
         await self.notify_status()
 
-        if self._interval:
+        if not self._interval:
+            return
+
+        if self.scheduler is not None:
+            if self._subscription is None:
+                self._subscription = self.scheduler.subscribe(
+                    self.name,
+                    self.get_registers(),
+                    self._interval,
+                    self._on_scan,
+                )
+        else:
             self._update_loop_task = asyncio.create_task(self._status_loop())
 
+    def get_registers(self) -> list[str]:
+        """Returns the registers that the module needs to update its status."""
+
+        return self.modbus.groups.get(self.name, [])
+
+    async def _on_scan(self, registers: Mapping[str, Any] | None):
+        """Updates the status with the registers read by the scheduler."""
+
+        if registers is None:
+            # The scan failed. Try reading the registers directly, which will set
+            # the status to unknown if the PLC is not responding.
+            await self.update(use_cache=False)
+        else:
+            await self.update(registers=registers)
+
     async def _status_loop(self):
         """Runs the status update loop."""
 
@@ -91,9 +129,18 @@ class PLCModule(abc.ABC, Generic[Flag_co]):
     @abc.abstractmethod
     async def _update_internal(
         self,
+        use_cache: bool = True,
+        registers: Mapping[str, Any] | None = None,
+        max_age: float | None = None,
         **kwargs,
     ) -> Flag_co | tuple[Flag_co, dict[str, Any]]:
-        """Determines the new module flag status."""
+        """Determines the new module flag status.
+
+        If ``registers`` is provided, the status is determined from those values
+        instead of reading the registers. Otherwise the registers are read with
+        ``use_cache`` and ``max_age`` (see `.Modbus.read_registers`).
+
+        """
 
         pass
 
@@ -101,12 +148,35 @@ class PLCModule(abc.ABC, Generic[Flag_co]):
         self,
         force_output: bool = False,
         use_cache: bool = True,
+        registers: Mapping[str, Any] | None = None,
+        max_age: float | None = None,
         **notifier_kwargs,
     ):
-        """Refreshes the module status."""
+        """Refreshes the module status.
+
+        Parameters
+        ----------
+        force_output
+            Notify the status even if it has not changed.
+        use_cache
+            Whether to use cached register values.
+        registers
+            The values of the registers returned by `.get_registers`. If not
+            provided, the registers are read.
+        max_age
+            The maximum age of cached values that are accepted, even if they have
+            expired. Expired values are refreshed in the background.
+        notifier_kwargs
+            Other arguments to pass to the notifier.
+
+        """
 
         try:
-            internal_output = await self._update_internal(use_cache=use_cache)
+            internal_output = await self._update_internal(
+                use_cache=use_cache,
+                registers=registers,
+                max_age=max_age,
+            )
             if isinstance(internal_output, Sequence):
                 new_status, extra_info = internal_output
             else:
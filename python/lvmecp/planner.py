@@ -0,0 +1,469 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: planner.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import cached_property
+
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+import numpy
+
+from lvmecp.decoders import BatchDecoder
+
+
+if TYPE_CHECKING:
+    from lvmecp.modbus import ModbusRegister, RegisterModes
+
+
+__all__ = [
+    "ReadBlock",
+    "ReadPlan",
+    "WriteBlock",
+    "compile_read_plan",
+    "compile_writes",
+    "FUNCTION_CODES",
+]
+
+
+#: Function code used to read each type of data block.
+FUNCTION_CODES: dict[str, int] = {
+    "coil": 1,
+    "discrete_input": 2,
+    "holding_register": 3,
+    "input_register": 4,
+}
+
+#: Modes in which each element is a single bit.
+BIT_MODES = ("coil", "discrete_input")
+
+#: Maximum number of bits and words in a single read, per the Modbus specification.
+MAX_READ_BITS = 2000
+MAX_READ_WORDS = 125
+
+#: Maximum number of bits and words in a single write, per the Modbus specification.
+MAX_WRITE_BITS = 1968
+MAX_WRITE_WORDS = 123
+
+#: Default maximum PDU size, in bytes.
+MAX_PDU_SIZE = 253
+
+#: Default number of unused bytes in a response that are preferred over a new request.
+GAP_TOLERANCE = 64
+
+# Size, in bytes, of the MBAP header and of the read request and response PDUs
+# without data (function code, byte count).
+MBAP_SIZE = 7
+READ_REQUEST_PDU_SIZE = 5
+READ_RESPONSE_PDU_SIZE = 2
+
+
+@dataclass(frozen=True)
+class ReadBlock:
+    """A contiguous read of a data block.
+
+    Parameters
+    ----------
+    mode
+        The type of data block.
+    address
+        The address of the first element in the read.
+    count
+        The number of elements to read.
+    registers
+        A tuple of the registers covered by this read and their offset
+        with respect to ``address``.
+
+    """
+
+    mode: RegisterModes
+    address: int
+    count: int
+    registers: tuple[tuple[ModbusRegister, int], ...]
+
+    @property
+    def function_code(self) -> int:
+        """The function code of the read request."""
+
+        return FUNCTION_CODES[self.mode]
+
+    @property
+    def is_bits(self) -> bool:
+        """Whether each element in the block is a single bit."""
+
+        return self.mode in BIT_MODES
+
+    @property
+    def request_bytes(self) -> int:
+        """The size of the request ADU, in bytes."""
+
+        return MBAP_SIZE + READ_REQUEST_PDU_SIZE
+
+    @property
+    def response_bytes(self) -> int:
+        """The size of the response ADU, in bytes."""
+
+        if self.is_bits:
+            data_size = math.ceil(self.count / 8)
+        else:
+            data_size = 2 * self.count
+
+        return MBAP_SIZE + READ_RESPONSE_PDU_SIZE + data_size
+
+
+@dataclass(frozen=True)
+class ReadPlan:
+    """A compiled list of block reads that cover a set of registers."""
+
+    blocks: tuple[ReadBlock, ...]
+
+    @cached_property
+    def registers(self) -> frozenset[ModbusRegister]:
+        """The registers covered by the plan."""
+
+        return frozenset(reg for block in self.blocks for reg, _ in block.registers)
+
+    @cached_property
+    def names(self) -> frozenset[str]:
+        """The names of the registers covered by the plan."""
+
+        return frozenset(reg.name for reg in self.registers)
+
+    @cached_property
+    def by_name(self) -> dict[str, ModbusRegister]:
+        """A mapping of register name to register, in read order."""
+
+        return {reg.name: reg for block in self.blocks for reg, _ in block.registers}
+
+    @cached_property
+    def sizes(self) -> dict[str, int]:
+        """The number of elements in the image of each mode.
+
+        For coils and discrete inputs this includes the padding that aligns
+        each block to a byte boundary (see `.offsets`).
+
+        """
+
+        sizes: dict[str, int] = {}
+        for block, offset in zip(self.blocks, self.offsets):
+            sizes[block.mode] = offset + block.count
+
+        return sizes
+
+    @cached_property
+    def offsets(self) -> tuple[int, ...]:
+        """The position of each block when the blocks of a mode are concatenated.
+
+        Blocks of bits start at a multiple of eight so that the packed bytes of
+        each response can be copied to the image without shifting them.
+
+        """
+
+        offsets: list[int] = []
+        position: dict[str, int] = {}
+        for block in self.blocks:
+            offset = position.get(block.mode, 0)
+            if block.is_bits:
+                offset = 8 * math.ceil(offset / 8)
+            offsets.append(offset)
+            position[block.mode] = offset + block.count
+
+        return tuple(offsets)
+
+    @cached_property
+    def index(self) -> dict[str, tuple[str, int]]:
+        """The mode and position of each register in the concatenated blocks."""
+
+        return {
+            reg.name: (block.mode, block_offset + offset)
+            for block, block_offset in zip(self.blocks, self.offsets)
+            for reg, offset in block.registers
+        }
+
+    @cached_property
+    def bit_index(self) -> dict[str, tuple[str, int, int]]:
+        """The mode, byte, and bit mask of each single-bit register.
+
+        Coils and discrete inputs are stored packed, eight per byte and with
+        the first element in the least significant bit. The value of a
+        register is ``image[byte] & mask != 0``.
+
+        """
+
+        bit_index: dict[str, tuple[str, int, int]] = {}
+        for name, (mode, position) in self.index.items():
+            if mode in BIT_MODES and self.by_name[name].count == 1:
+                bit_index[name] = (mode, position >> 3, 1 << (position & 7))
+
+        return bit_index
+
+    @cached_property
+    def spans(self) -> dict[str, tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]]:
+        """The elements of each register in the images, per mode.
+
+        For each mode, a tuple of three arrays with the position of the first
+        element of each register, the position after its last element, and
+        the position of the register in `.by_name`. Positions are in words or,
+        for coils and discrete inputs, in bits. Used to find the registers
+        that contain a set of elements with a single vectorised operation.
+
+        """
+
+        spans: dict[str, tuple[list[int], list[int], list[int]]] = {}
+        for ii, (name, register) in enumerate(self.by_name.items()):
+            mode, start = self.index[name]
+            starts, ends, ids = spans.setdefault(mode, ([], [], []))
+            starts.append(start)
+            ends.append(start + register.count)
+            ids.append(ii)
+
+        return {
+            mode: tuple(numpy.array(values, dtype=numpy.intp) for values in arrays)
+            for mode, arrays in spans.items()
+        }  # type: ignore
+
+    @cached_property
+    def decoder(self) -> BatchDecoder:
+        """A `.BatchDecoder` for the 32-bit registers in the plan."""
+
+        return BatchDecoder(self)
+
+    @property
+    def n_requests(self) -> int:
+        """The number of requests needed to execute the plan."""
+
+        return len(self.blocks)
+
+    @property
+    def wire_bytes(self) -> int:
+        """The total number of bytes sent and received when executing the plan."""
+
+        return sum(block.request_bytes + block.response_bytes for block in self.blocks)
+
+
+@dataclass(frozen=True)
+class WriteBlock:
+    """A write of contiguous elements of a data block.
+
+    Parameters
+    ----------
+    mode
+        The type of data block. Only coils and holding registers can be written.
+    address
+        The address of the first element.
+    values
+        The values to write, one per element.
+    names
+        The names of the registers written.
+
+    """
+
+    mode: RegisterModes
+    address: int
+    values: tuple[int | bool, ...]
+    names: tuple[str, ...]
+
+    @property
+    def function_code(self) -> int:
+        """The function code of the write request.
+
+        Single elements are written with FC5 (coil) or FC6 (holding register),
+        and multiple elements with FC15 (coils) or FC16 (holding registers).
+
+        """
+
+        if self.mode == "coil":
+            return 5 if len(self.values) == 1 else 15
+
+        return 6 if len(self.values) == 1 else 16
+
+
+def get_max_count(mode: str, max_pdu_size: int = MAX_PDU_SIZE) -> int:
+    """Returns the maximum number of elements that can be read in one request."""
+
+    data_size = max_pdu_size - READ_RESPONSE_PDU_SIZE
+
+    if mode in BIT_MODES:
+        return min(MAX_READ_BITS, data_size * 8)
+
+    return min(MAX_READ_WORDS, data_size // 2)
+
+
+def compile_read_plan(
+    registers: Iterable[ModbusRegister],
+    max_pdu_size: int = MAX_PDU_SIZE,
+    gap_tolerance: int = GAP_TOLERANCE,
+) -> ReadPlan:
+    """Compiles a list of registers into the minimum number of block reads.
+
+    Registers of the same mode are sorted by address and coalesced into a
+    contiguous read as long as the read does not exceed the maximum size allowed
+    by ``max_pdu_size`` and the unused elements between two registers would add
+    no more than ``gap_tolerance`` bytes to the response. Otherwise a new read
+    is started.
+
+    Parameters
+    ----------
+    registers
+        The registers to read.
+    max_pdu_size
+        The maximum size of a PDU, in bytes, that the server accepts.
+    gap_tolerance
+        The maximum number of bytes of unused data in a response that is
+        preferred to issuing a new request.
+
+    Returns
+    -------
+    plan
+        A `.ReadPlan` with the list of reads.
+
+    """
+
+    blocks: list[ReadBlock] = []
+
+    by_mode: dict[str, list[ModbusRegister]] = {}
+    for register in registers:
+        if register.mode not in FUNCTION_CODES:
+            raise ValueError(f"Invalid mode {register.mode!r} for {register.name!r}.")
+        by_mode.setdefault(register.mode, []).append(register)
+
+    for mode, mode_registers in by_mode.items():
+        max_count = get_max_count(mode, max_pdu_size)
+        max_gap = gap_tolerance * 8 if mode in BIT_MODES else gap_tolerance // 2
+
+        mode_registers.sort(key=lambda reg: (reg.address, -reg.count))
+
+        current: list[ModbusRegister] = []
+        start: int = 0
+        end: int = 0
+
+        for register in mode_registers:
+            if register.count > max_count:
+                raise ValueError(
+                    f"Register {register.name!r} is larger than the maximum "
+                    f"number of elements that can be read at once ({max_count})."
+                )
+
+            reg_end = register.address + register.count
+
+            if current:
+                gap = register.address - end
+                if gap <= max_gap and max(end, reg_end) - start <= max_count:
+                    current.append(register)
+                    end = max(end, reg_end)
+                    continue
+
+                blocks.append(_create_block(mode, start, end, current))
+
+            current = [register]
+            start = register.address
+            end = reg_end
+
+        if current:
+            blocks.append(_create_block(mode, start, end, current))
+
+    return ReadPlan(blocks=tuple(blocks))
+
+
+def _create_block(
+    mode: str,
+    start: int,
+    end: int,
+    registers: list[ModbusRegister],
+) -> ReadBlock:
+    """Creates a `.ReadBlock` for a list of registers."""
+
+    return ReadBlock(
+        mode=mode,  # type: ignore
+        address=start,
+        count=end - start,
+        registers=tuple((reg, reg.address - start) for reg in registers),
+    )
+
+
+def compile_writes(
+    writes: Iterable[tuple[ModbusRegister, Sequence[int | bool]]],
+) -> list[WriteBlock]:
+    """Groups writes to adjacent elements into the minimum number of requests.
+
+    Parameters
+    ----------
+    writes
+        Pairs of register and the values to write to each of its elements.
+        Registers must be coils or holding registers.
+
+    Returns
+    -------
+    blocks
+        A list of `.WriteBlock`, sorted by mode and address. Only elements at
+        consecutive addresses are grouped, since a multiple write cannot skip
+        elements.
+
+    """
+
+    blocks: list[WriteBlock] = []
+
+    by_mode: dict[str, list[tuple[ModbusRegister, Sequence[int | bool]]]] = {}
+    for register, values in writes:
+        if register.mode not in ("coil", "holding_register"):
+            raise ValueError(f"Block of mode {register.mode!r} is read-only.")
+        if len(values) != register.count:
+            raise ValueError(
+                f"Register {register.name!r} requires {register.count} values."
+            )
+        by_mode.setdefault(register.mode, []).append((register, values))
+
+    for mode, mode_writes in by_mode.items():
+        max_count = MAX_WRITE_BITS if mode in BIT_MODES else MAX_WRITE_WORDS
+
+        mode_writes.sort(key=lambda write: write[0].address)
+
+        address: int = 0
+        values: list[int | bool] = []
+        names: list[str] = []
+
+        for register, reg_values in mode_writes:
+            end = address + len(values)
+            if names and register.address < end:
+                raise ValueError(f"Register {register.name!r} overlaps {names[-1]!r}.")
+
+            if names and register.address == end:
+                if len(values) + len(reg_values) <= max_count:
+                    values.extend(reg_values)
+                    names.append(register.name)
+                    continue
+
+            if names:
+                blocks.append(_create_write_block(mode, address, values, names))
+
+            address = register.address
+            values = list(reg_values)
+            names = [register.name]
+
+        if names:
+            blocks.append(_create_write_block(mode, address, values, names))
+
+    return blocks
+
+
+def _create_write_block(
+    mode: str,
+    address: int,
+    values: list[int | bool],
+    names: list[str],
+) -> WriteBlock:
+    """Creates a `.WriteBlock`."""
+
+    return WriteBlock(
+        mode=mode,  # type: ignore
+        address=address,
+        values=tuple(values),
+        names=tuple(names),
+    )
@@ -10,11 +10,13 @@ from __future__ import annotations
 
 import asyncio
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Mapping
 
+from lvmecp.diff import ChangeSet, diff_snapshots
 from lvmecp.hvac import HVACController
 from lvmecp.modbus import Modbus
 from lvmecp.safety import SafetyController
+from lvmecp.scheduler import ScanScheduler
 
 from .dome import DomeController
 from .lights import LightsController
@@ -23,6 +25,8 @@ from .lights import LightsController
 if TYPE_CHECKING:
     from clu.command import Command
 
+    from lvmecp.snapshot import RegisterSnapshot
+
     from .actor import ECPActor
 
 
@@ -79,11 +83,15 @@ class PLC:
 
         self._actor = actor
 
+        # A single poller for the PLC registers that all the modules subscribe to.
+        self.scheduler = ScanScheduler(self.modbus)
+
         self.dome = DomeController(
             "dome",
             self,
             notifier=create_actor_notifier(actor, "dome_status"),
             start=start_modules,
+            scheduler=self.scheduler,
         )
 
         self.safety = SafetyController(
@@ -91,6 +99,7 @@ class PLC:
             self,
             notifier=create_actor_notifier(actor, "safety_status"),
             start=start_modules,
+            scheduler=self.scheduler,
         )
 
         self.lights = LightsController(
@@ -98,9 +107,11 @@ class PLC:
             self,
             notifier=create_actor_notifier(actor, "lights"),
             start=start_modules,
+            scheduler=self.scheduler,
         )
 
         self.hvac_modbus = Modbus(config=config["hvac"])
+        self.hvac_scheduler = ScanScheduler(self.hvac_modbus)
         self.hvac = HVACController(
             "hvac",
             self,
@@ -119,12 +130,162 @@ class PLC:
             self.hvac.start(),
         )
 
-    async def read_all_registers(self, use_cache: bool = True):
-        """Reads all the connected registers and returns a dictionary."""
+        # Start polling the registers with a poll tier.
+        self.scheduler.start()
+        self.hvac_scheduler.start()
+
+    async def close(self):
+        """Stops the scheduler and closes the connections to the PLC and HVAC."""
+
+        await asyncio.gather(self.scheduler.stop(), self.hvac_scheduler.stop())
+        await asyncio.gather(self.modbus.close(), self.hvac_modbus.close())
+
+    async def read_snapshots(
+        self,
+        use_cache: bool = True,
+        allow_stale: bool = False,
+    ) -> dict[str, RegisterSnapshot]:
+        """Reads all the connected registers and returns the scans.
+
+        Returns a mapping of connection (``plc`` or ``hvac``) to the full scan
+        with its registers. Connections that did not return any register are
+        not included. With ``allow_stale=True``, values up to the
+        ``stale_max_age`` of each connection are returned without waiting while
+        the registers are refreshed in the background (see `.Modbus.read_all`).
+
+        """
 
-        registers_plc, registers_hvac = await asyncio.gather(
-            self.modbus.read_all(use_cache=use_cache),
-            self.hvac_modbus.read_all(use_cache=use_cache),
+        connections = self._connections
+        snapshots = await asyncio.gather(
+            *[
+                modbus.read_all(
+                    use_cache=use_cache,
+                    max_age=modbus.stale_max_age if allow_stale else None,
+                )
+                for modbus in connections.values()
+            ]
         )
 
-        return registers_plc | registers_hvac
+        return {
+            key: snapshot for key, snapshot in zip(connections, snapshots) if snapshot
+        }
+
+    async def read_all_registers(
+        self,
+        use_cache: bool = True,
+        allow_stale: bool = False,
+    ):
+        """Reads all the connected registers and returns a dictionary.
+
+        See `.read_snapshots` for the meaning of the arguments.
+
+        """
+
+        snapshots = await self.read_snapshots(use_cache, allow_stale)
+
+        registers: dict[str, Any] = {}
+        for snapshot in snapshots.values():
+            registers.update(snapshot)
+
+        return registers
+
+    def get_register_ages(
+        self,
+        snapshots: Mapping[str, RegisterSnapshot] | None = None,
+    ) -> dict[str, float | None]:
+        """Returns the age of the value of each register.
+
+        The values of each connection come from a full scan, the last one or the
+        one in ``snapshots`` (as returned by `.read_snapshots`), so this is the
+        age of that scan for each register, or :obj:`None` if the registers
+        have not been read.
+
+        """
+
+        snapshots = self._get_snapshots(snapshots)
+
+        ages: dict[str, float | None] = {}
+        for key, modbus in self._connections.items():
+            snapshot = snapshots.get(key)
+            age = round(snapshot.age, 3) if snapshot is not None else None
+            ages.update(dict.fromkeys(modbus, age))
+
+        return ages
+
+    def get_register_quality(
+        self,
+        snapshots: Mapping[str, RegisterSnapshot] | None = None,
+    ) -> dict[str, str | None]:
+        """Returns the quality of the value of each register.
+
+        The quality of each register in the last full scan of its connection,
+        or in the scan in ``snapshots``, is ``"stale"`` if the scan is older
+        than the ``max_age`` of the register, which happens when
+        ``allow_stale=True``, or if the register has been written since, and
+        ``"good"`` otherwise (see `.Modbus.get_quality`). It is :obj:`None` if
+        the registers have not been read.
+
+        """
+
+        snapshots = self._get_snapshots(snapshots)
+
+        quality: dict[str, str | None] = {}
+        for key, modbus in self._connections.items():
+            snapshot = snapshots.get(key)
+            if snapshot is None:
+                quality.update(dict.fromkeys(modbus))
+            else:
+                values = modbus.get_quality(snapshot)
+                quality.update({name: values[name].value for name in modbus})
+
+        return quality
+
+    def get_register_changes(
+        self,
+        baseline: dict[str, RegisterSnapshot],
+        snapshots: Mapping[str, RegisterSnapshot] | None = None,
+        update: bool = True,
+    ) -> ChangeSet:
+        """Returns the registers that changed since the last call with a baseline.
+
+        Compares the last full scan of each connection, which is the source of
+        the values returned by `.read_all_registers`, or the scans in
+        ``snapshots``, with the scan of the same connection (``plc`` or
+        ``hvac``) in ``baseline`` (see `.diff_snapshots`). If ``update=True``,
+        the baseline is then updated with the new scans. Each emitter of deltas
+        keeps its own baseline, so that a caller does not consume the changes
+        of another one. The first call with an empty baseline returns all the
+        registers that have been read.
+
+        """
+
+        snapshots = self._get_snapshots(snapshots)
+
+        change_sets: list[ChangeSet] = []
+        for key, snapshot in snapshots.items():
+            change_sets.append(diff_snapshots(baseline.get(key), snapshot))
+            if update:
+                baseline[key] = snapshot
+
+        return ChangeSet.merge(change_sets)
+
+    @property
+    def _connections(self) -> dict[str, Modbus]:
+        """The Modbus connections, by the keys used in the mappings of scans."""
+
+        return {"plc": self.modbus, "hvac": self.hvac_modbus}
+
+    def _get_snapshots(
+        self,
+        snapshots: Mapping[str, RegisterSnapshot] | None,
+    ) -> Mapping[str, RegisterSnapshot]:
+        """Returns ``snapshots`` or, if :obj:`None`, the last full scans."""
+
+        if snapshots is not None:
+            return snapshots
+
+        return {
+            key: modbus.snapshot
+            for key, modbus in self._connections.items()
+            if modbus.snapshot is not None
+        }
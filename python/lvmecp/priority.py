@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: priority.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import asyncio
+import enum
+import heapq
+import itertools
+
+
+__all__ = ["Priority", "PriorityLock"]
+
+
+class Priority(enum.IntEnum):
+    """Priority classes for Modbus requests. Lower values are served first."""
+
+    #: Emergency stops.
+    EMERGENCY = 0
+    #: Writes that control a device (dome, lights, resets).
+    CONTROL = 1
+    #: Heartbeat and network watchdog writes.
+    HEARTBEAT = 2
+    #: Reads requested by a command or a user.
+    INTERACTIVE = 3
+    #: Polling by the scan scheduler.
+    BACKGROUND = 4
+
+
+class PriorityLock:
+    """A lock that is granted to the waiter with the highest priority.
+
+    Waiters with the same priority are served in the order in which they called
+    `.acquire`. A waiter does not preempt the current holder, so the maximum
+    wait for the highest priority is the time the lock is held for a single
+    request.
+
+    """
+
+    def __init__(self):
+        self._locked: bool = False
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._watchers: list[asyncio.Future] = []
+
+        #: The priority with which the lock is held, if locked.
+        self.holder: Priority | None = None
+
+    def locked(self) -> bool:
+        """Returns whether the lock is held."""
+
+        return self._locked
+
+    def waiting(self, priority: Priority | None = None) -> int:
+        """Returns the number of tasks waiting for the lock.
+
+        If ``priority`` is set, only counts the tasks waiting with that priority
+        or a higher one.
+
+        """
+
+        return sum(
+            1
+            for waiter_priority, _, future in self._waiters
+            if not future.done() and (priority is None or waiter_priority <= priority)
+        )
+
+    async def wait_for_waiter(self, priority: Priority):
+        """Blocks until a task with ``priority`` or higher waits for the lock."""
+
+        loop = asyncio.get_running_loop()
+
+        while self.waiting(priority) == 0:
+            watcher = loop.create_future()
+            self._watchers.append(watcher)
+            try:
+                await watcher
+            finally:
+                if watcher in self._watchers:
+                    self._watchers.remove(watcher)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> bool:
+        """Acquires the lock, waiting for higher priority requests to be served."""
+
+        priority = Priority(priority)
+
+        if not self._locked and self.waiting() == 0:
+            self._locked = True
+            self.holder = priority
+            return True
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+
+        for watcher in self._watchers:
+            if not watcher.done():
+                watcher.set_result(None)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # If the lock was handed to us as we were cancelled, pass it on.
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+        return True
+
+    def release(self):
+        """Releases the lock and hands it to the next waiter, if any."""
+
+        if not self._locked:
+            raise RuntimeError("Lock is not acquired.")
+
+        while self._waiters:
+            priority, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # The lock stays locked and is owned by the waiter.
+                self.holder = Priority(priority)
+                future.set_result(True)
+                return
+
+        self._locked = False
+        self.holder = None
@@ -10,10 +10,12 @@ from __future__ import annotations
 
 import math
 import time
-from types import SimpleNamespace
+
+from typing import Any, Mapping
 
 from lvmecp.maskbits import SafetyStatus
 from lvmecp.module import PLCModule
+from lvmecp.priority import Priority
 
 
 class SafetyController(PLCModule[SafetyStatus]):
@@ -22,6 +24,9 @@ class SafetyController(PLCModule[SafetyStatus]):
     flag = SafetyStatus
     interval = 20.0
 
+    #: Registers that indicate whether the PLC safety bypasses are active.
+    bypass_registers = ["bypass_hardware_status", "bypass_software_status"]
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -30,62 +35,77 @@ class SafetyController(PLCModule[SafetyStatus]):
 
         self.last_heartbeat_ack: float | None = None
 
-    async def _update_internal(self, use_cache: bool = True, **kwargs):
-        assert self.flag is not None
+    def get_registers(self) -> list[str]:
+        """Returns the registers that the module needs to update its status."""
 
-        safety_registers = await self.plc.modbus.read_group(
-            "safety",
-            use_cache=use_cache,
-        )
+        # Read the dome lockout and error registers along with the safety ones
+        # so that they are included in the same plan.
+        return [*self.modbus.groups["safety"], "dome_lockout", "dome_error"]
+
+    async def _update_internal(
+        self,
+        use_cache: bool = True,
+        registers: Mapping[str, Any] | None = None,
+        max_age: float | None = None,
+        **kwargs,
+    ):
+        assert self.flag is not None
 
-        safety_status = SimpleNamespace(**safety_registers)
+        if registers is not None:
+            safety_status = registers
+        else:
+            safety_status = await self.modbus.read_registers(
+                self.get_registers(),
+                use_cache=use_cache,
+                max_age=max_age,
+            )
 
         new_status = self.flag(0)
 
         # Door and lock
-        if safety_status.door_closed:
+        if safety_status["door_closed"]:
             new_status |= self.flag.DOOR_CLOSED
-        if safety_status.door_locked:
+        if safety_status["door_locked"]:
             new_status |= self.flag.DOOR_LOCKED
-        if safety_status.local:
+        if safety_status["local"]:
             new_status |= self.flag.LOCAL
 
         # Utilities room O2 sensor
-        self.o2_level_utilities = safety_status.oxygen_read_utilities_room / 10.0
+        self.o2_level_utilities = safety_status["oxygen_read_utilities_room"]
         if self.o2_level_utilities < self.plc.config["safety"]["o2_threshold"]:
             new_status |= self.flag.O2_SENSOR_UR_ALARM
-        if safety_status.oxygen_error_code_utilities_room == 8:
+        if safety_status["oxygen_error_code_utilities_room"] == 8:
             new_status |= self.flag.O2_SENSOR_UR_FAULT
 
         # Spectrograph room O2 sensor
-        self.o2_level_spectrograph = safety_status.oxygen_read_spectrograph_room / 10.0
+        self.o2_level_spectrograph = safety_status["oxygen_read_spectrograph_room"]
         if self.o2_level_spectrograph < self.plc.config["safety"]["o2_threshold"]:
             new_status |= self.flag.O2_SENSOR_SR_ALARM
-        if safety_status.oxygen_error_code_spectrograph_room == 8:
+        if safety_status["oxygen_error_code_spectrograph_room"] == 8:
             new_status |= self.flag.O2_SENSOR_SR_FAULT
 
         # Rain sensor
-        if safety_status.rain_sensor_alarm:
+        if safety_status["rain_sensor_alarm"]:
             new_status |= self.flag.RAIN_SENSOR_ALARM
 
         # E-stop
-        if safety_status.e_status:
+        if safety_status["e_status"]:
             new_status |= self.flag.E_STOP
 
         # LN2 E-stop
-        if safety_status.e_stop_ln2:
+        if safety_status["e_stop_ln2"]:
             new_status |= self.flag.E_STOP_LN2
 
         # Dome lockout and error
-        if await self.plc.modbus["dome_lockout"].read():
+        if safety_status["dome_lockout"]:
             new_status |= self.flag.DOME_LOCKED
-        if await self.plc.modbus["dome_error"].read():
+        if safety_status["dome_error"]:
             new_status |= self.flag.DOME_ERROR
 
         if new_status.value == 0:
             new_status = self.flag(self.flag.__unknown__)
 
-        if await self.plc.modbus["hb_ack"].read():
+        if safety_status["hb_ack"]:
             self.last_heartbeat_ack = time.time()
 
         return new_status
@@ -98,11 +118,16 @@ class SafetyController(PLCModule[SafetyStatus]):
 
         return not (self.status & self.flag.LOCAL)
 
-    async def engineering_mode_active(self, include_plc_bypasses: bool = True):
+    async def engineering_mode_active(
+        self,
+        include_plc_bypasses: bool = True,
+        registers: Mapping[str, Any] | None = None,
+    ):
         """Returns :obj:`True` if engineering mode is active.
         With ``include_plc_bypasses=True``, the function will return
         :obj:`True` if the lvmecp engineering mode is active or the PLC
-        software or hardware bypasses are active.
+        software or hardware bypasses are active. The safety and bypass
+        registers are read unless they are provided in ``registers``.
 
         """
 
@@ -112,10 +137,16 @@ class SafetyController(PLCModule[SafetyStatus]):
         if include_plc_bypasses is False:
             return False
 
-        await self.update(use_cache=False)
+        if registers is None:
+            registers = await self.modbus.read_registers(
+                [*self.get_registers(), *self.bypass_registers],
+                use_cache=False,
+            )
 
-        plc_hw = await self.plc.modbus.read_register("bypass_hardware_status")
-        plc_sw = await self.plc.modbus.read_register("bypass_software_status")
+        await self.update(registers=registers)
+
+        plc_hw = registers["bypass_hardware_status"]
+        plc_sw = registers["bypass_software_status"]
 
         if plc_hw or plc_sw:
             return True
@@ -123,11 +154,19 @@ class SafetyController(PLCModule[SafetyStatus]):
         return False
 
     async def emergency_stop(self):
-        """Triggers an emergency stop."""
+        """Triggers an emergency stop.
+
+        The write is sent before any other queued request to the PLC.
 
-        await self.plc.modbus["e_stop"].write(True)
+        """
+
+        await self.plc.modbus["e_stop"].write(True, priority=Priority.EMERGENCY)
 
     async def reset_e_stops(self):
-        """Resets the E-stop relays."""
+        """Resets the E-stop relays and updates the status."""
+
+        async with self.plc.modbus.session() as session:
+            await session.write("e_relay_reset", True)
+            registers = await session.read(self.get_registers())
 
-        await self.plc.modbus["e_relay_reset"].write(True)
+        await self.update(registers=registers)
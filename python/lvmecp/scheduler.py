@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: scheduler.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import asyncio
+import math
+from dataclasses import dataclass, field
+from time import monotonic
+
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Iterable
+
+import numpy
+
+from sdsstools.utils import cancel_task
+
+from lvmecp import log
+from lvmecp.priority import Priority
+
+
+if TYPE_CHECKING:
+    from lvmecp.modbus import Modbus
+    from lvmecp.snapshot import SnapshotView
+
+
+__all__ = ["ScanScheduler", "Subscription"]
+
+
+#: Default resolution of the scheduler, in seconds.
+SCAN_TICK = 5.0
+
+ScanCallback = Callable[["SnapshotView | None"], Coroutine[Any, Any, Any] | None]
+
+
+@dataclass(eq=False)
+class Subscription:
+    """A set of registers that a subscriber needs at a certain interval.
+
+    Parameters
+    ----------
+    name
+        A name to identify the subscriber.
+    registers
+        The names of the registers that the subscriber needs.
+    interval
+        How often, in seconds, the subscriber wants to receive the registers.
+    callback
+        A function or coroutine function that is called with a `.SnapshotView`
+        of the registers after each scan, or with :obj:`None` if the scan failed.
+
+    """
+
+    name: str
+    registers: tuple[str, ...]
+    interval: float
+    callback: ScanCallback
+    next_due: float = 0.0
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+
+class ScanScheduler:
+    """Polls the registers of a `.Modbus` server on behalf of subscribers.
+
+    Instead of each subscriber reading the registers on its own timer, the
+    scheduler runs a single loop. On each tick it reads the registers of all
+    the subscriptions that are due using one planned scan, and sends each
+    subscriber a view of the resulting snapshot. The next time a subscription
+    is due is aligned to a grid of ``tick`` seconds so that subscriptions with
+    different intervals share scans, and the scheduler never scans more than
+    once per tick regardless of the number of subscribers.
+
+    The scheduler also polls the registers that have a ``max_age`` (set with
+    the ``max_age`` or ``poll_tier`` attributes in the register configuration)
+    so that their cached values are never older than ``max_age``. A register
+    is read on the last tick before its value would expire, and all the
+    registers that are due on the same tick are read in the same scan as the
+    subscriptions. Registers older than half their ``max_age`` are also added
+    to scans that happen anyway, which keeps the tiers in phase so that slower
+    tiers rarely need a scan of their own. Fast tiers are refreshed often while
+    the number of scans stays bounded.
+
+    The scheduler loop is started when the first subscription is added, but the
+    registers with a ``max_age`` are only polled after `.start` is called.
+
+    Parameters
+    ----------
+    modbus
+        The `.Modbus` connection to poll.
+    tick
+        The resolution of the scheduler, in seconds. Intervals are rounded up to
+        a multiple of the tick.
+
+    """
+
+    def __init__(self, modbus: Modbus, tick: float | None = None):
+        self.modbus = modbus
+        self.tick = tick or modbus.config.get("scan_tick", SCAN_TICK)
+
+        self.subscriptions: list[Subscription] = []
+        self.stats = {"scans": 0, "failures": 0, "deliveries": 0, "skipped": 0}
+
+        # Registers polled to keep their values younger than their max_age.
+        self.polled: dict[str, float] = {
+            name: register.max_age
+            for name, register in modbus.items()
+            if register.max_age is not None
+        }
+        self._polled_max_age = numpy.array(list(self.polled.values()), dtype=float)
+
+        self._t0 = monotonic()
+        self._polling = False
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+        # Watches that need their registers polled use the first scheduler.
+        if modbus.scheduler is None:
+            modbus.scheduler = self
+
+    def subscribe(
+        self,
+        name: str,
+        registers: Iterable[str],
+        interval: float,
+        callback: ScanCallback,
+        delay: float = 0.0,
+    ) -> Subscription:
+        """Adds a subscription.
+
+        The first scan for a new subscription happens after ``delay`` seconds
+        and then every ``interval`` seconds, aligned to the scheduler ticks.
+        See `.Subscription` for details on the other parameters.
+
+        """
+
+        registers = tuple(registers)
+        if unknown := set(registers).difference(self.modbus):
+            raise ValueError(f"Unknown registers {sorted(unknown)!r}.")
+
+        subscription = Subscription(name, registers, interval, callback)
+        subscription.next_due = monotonic() + delay
+        self.subscriptions.append(subscription)
+
+        self.start(poll=False)
+        self._wakeup.set()
+
+        return subscription
+
+    def start(self, poll: bool = True):
+        """Starts the scheduler loop, if not running.
+
+        If ``poll=True``, also starts polling the registers with a ``max_age``.
+
+        """
+
+        if poll and not self._polling:
+            self._polling = True
+            self._wakeup.set()
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def unsubscribe(self, subscription: Subscription):
+        """Removes a subscription and cancels its callback if running.
+
+        The callback is not cancelled if the subscription is removed from it.
+
+        """
+
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+        if subscription.task is not asyncio.current_task():
+            subscription.task = await cancel_task(subscription.task)
+
+    def set_interval(self, subscription: Subscription, interval: float):
+        """Changes the interval of a subscription.
+
+        If the new interval is shorter, the next scan is rescheduled so that it
+        happens within ``interval`` seconds.
+
+        """
+
+        subscription.interval = interval
+
+        next_due = self.align(monotonic() + interval)
+        if next_due < subscription.next_due:
+            subscription.next_due = next_due
+            self._wakeup.set()
+
+    async def stop(self):
+        """Stops the scheduler and cancels any running callbacks."""
+
+        self._polling = False
+
+        # The loop also exits when it is no longer the scheduler task, in case
+        # the cancellation is swallowed by a wait_for that completed at the
+        # same time (a known issue in Python 3.11).
+        task, self._task = self._task, None
+        self._wakeup.set()
+        await cancel_task(task)
+
+        for subscription in self.subscriptions:
+            subscription.task = await cancel_task(subscription.task)
+
+    def align(self, time: float) -> float:
+        """Returns the first tick of the scheduler grid at or after ``time``."""
+
+        n_ticks = math.ceil(round((time - self._t0) / self.tick, 6))
+
+        return self._t0 + n_ticks * self.tick
+
+    def next_tick(self, time: float) -> float:
+        """Returns the first tick of the scheduler grid after ``time``."""
+
+        n_ticks = math.floor(round((time - self._t0) / self.tick, 6)) + 1
+
+        return self._t0 + n_ticks * self.tick
+
+    def get_due_registers(self, opportunistic: bool = False) -> list[str]:
+        """Returns the polled registers that would expire before the next tick.
+
+        With ``opportunistic=True``, also returns the registers whose values are
+        older than half their ``max_age``.
+
+        """
+
+        if not self._polling:
+            return []
+
+        # Allow some margin for the jitter of the ticks.
+        margin = 1.1 * self.tick
+
+        max_ages = self._polled_max_age
+        ages = self.modbus.cache.ages(self.polled)
+
+        due = ages + margin >= max_ages
+        if opportunistic:
+            due |= ages >= max_ages / 2
+
+        return [name for name, is_due in zip(self.polled, due) if is_due]
+
+    def get_next_due(self) -> float | None:
+        """Returns the next time at which a subscription or register is due."""
+
+        times = [sub.next_due for sub in self.subscriptions]
+
+        if self._polling and len(self.polled) > 0:
+            margin = 1.1 * self.tick
+            now = monotonic()
+            ages = self.modbus.cache.ages(self.polled)
+            expires = now + self._polled_max_age - margin - ages
+
+            # Registers that have not been read (infinite age) are due now.
+            times.append(self.align(max(float(expires.min()), now)))
+
+        return min(times, default=None)
+
+    async def _run(self):
+        """The scheduler loop."""
+
+        next_tick = 0.0
+
+        while self._task is asyncio.current_task():
+            # Yield so that subscriptions added at the same time share a scan.
+            await asyncio.sleep(0)
+
+            now = monotonic()
+            due = [sub for sub in self.subscriptions if sub.next_due <= now]
+            due_registers = self.get_due_registers()
+
+            if len(due) > 0 or len(due_registers) > 0:
+                due_registers = self.get_due_registers(opportunistic=True)
+                await self.scan(due, due_registers)
+                for subscription in due:
+                    subscription.next_due = self.align(now + subscription.interval)
+
+                # Do not scan again until the next tick.
+                next_tick = self.next_tick(now)
+
+            self._wakeup.clear()
+
+            next_due = self.get_next_due()
+            if next_due is None:
+                await self._wakeup.wait()
+                continue
+
+            try:
+                delay = max(next_due, next_tick) - monotonic()
+                async with asyncio.timeout(max(delay, 0)):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+
+    async def scan(
+        self,
+        subscriptions: list[Subscription],
+        registers: Iterable[str] = (),
+    ):
+        """Reads the registers for a list of subscriptions and notifies them.
+
+        Parameters
+        ----------
+        subscriptions
+            The subscriptions to notify.
+        registers
+            Other registers to read in the same scan.
+
+        """
+
+        names = {name for sub in subscriptions for name in sub.registers}
+        names.update(registers)
+
+        try:
+            plan = self.modbus.get_plan(names)
+            snapshot = await self.modbus.scan(plan, priority=Priority.BACKGROUND)
+        except Exception as err:
+            log.warning(f"Failed scanning registers: {err}")
+            self.stats["failures"] += 1
+            snapshot = None
+        else:
+            self.stats["scans"] += 1
+
+        for subscription in subscriptions:
+            # Do not queue deliveries for subscribers that are still busy.
+            if subscription.task is not None and not subscription.task.done():
+                self.stats["skipped"] += 1
+                continue
+
+            view = None if snapshot is None else snapshot.view(subscription.registers)
+            subscription.task = asyncio.create_task(self._deliver(subscription, view))
+            self.stats["deliveries"] += 1
+
+    async def _deliver(self, subscription: Subscription, view: SnapshotView | None):
+        """Calls the callback of a subscription."""
+
+        try:
+            result = subscription.callback(view)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as err:
+            log.warning(f"Scan callback for {subscription.name!r} failed: {err}")
@@ -13,6 +13,7 @@ from copy import deepcopy
 
 from typing import Any, cast
 
+import numpy
 from pymodbus.datastore import (
     ModbusServerContext,
     ModbusSlaveContext,
@@ -129,6 +130,27 @@ class Simulator:
             "value": int(self.slave_context.getValues(code, address, 1)[0]),
         }
 
+    def get_packed_bits(self, mode: str, address: int, count: int) -> bytes:
+        """Returns coils or discrete inputs packed as in a read response.
+
+        The bits are packed eight per byte with the first address in the least
+        significant bit, which is how they are stored in the images of a
+        `.RegisterSnapshot`, so that the state of the simulator can be compared
+        with a snapshot byte by byte.
+
+        """
+
+        if mode == "coil":
+            code = 1
+        elif mode == "discrete_input":
+            code = 2
+        else:
+            raise ValueError(f"Invalid mode {mode!r} for packed bits.")
+
+        bits = numpy.array(self.slave_context.getValues(code, address, count), bool)
+
+        return numpy.packbits(bits, bitorder="little").tobytes()
+
     async def _monitor_context(self, interval: float):
         """Monitor the context."""
 
@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: snapshot.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import enum
+import math
+import time
+from collections.abc import Mapping
+from functools import lru_cache
+
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Sequence
+
+import numpy
+
+from lvmecp.planner import BIT_MODES
+
+
+if TYPE_CHECKING:
+    from lvmecp.modbus import ModbusRegister
+    from lvmecp.planner import ReadPlan
+
+
+__all__ = ["Quality", "RegisterSnapshot", "SnapshotView", "unpack_bits"]
+
+
+#: The data returned by a block read: words, bits, or packed bits.
+BlockData = Sequence[int | bool] | bytes | memoryview
+
+
+class Quality(enum.Enum):
+    """The quality of the values in a `.SnapshotView`."""
+
+    #: The values are within the maximum age of the registers.
+    GOOD = "good"
+    #: The values are older than the maximum age of the registers but were
+    #: accepted by the caller. A refresh is running in the background.
+    STALE = "stale"
+
+
+class RegisterSnapshot(Mapping[str, Any]):
+    """An immutable set of register values acquired in a single scan.
+
+    The raw bits and words returned by the block reads are stored in one
+    array per data block in which the blocks of the plan are concatenated in
+    read order. Holding and input registers are stored in a ``uint16`` array.
+    Coils and discrete inputs are stored packed in a ``uint8`` array, eight
+    bits per byte with the first bit in the least significant position (the
+    layout of a Modbus response), and each block starts at a byte boundary.
+    Register values are decoded from those arrays when accessed.
+
+    Parameters
+    ----------
+    plan
+        The `.ReadPlan` used to acquire the data.
+    images
+        A mapping of data block mode to an array with the values read for that
+        mode. The position of each register is given by `.ReadPlan.index`.
+        Bits must be packed as described above.
+    timestamp
+        The Unix time at which the scan started.
+    monotonic
+        The value of :func:`time.monotonic` at which the scan started. Used
+        to determine the age of the snapshot.
+    overrides
+        A mapping of register name to value that replaces the value read.
+    generation
+        The write generation of the `.Modbus` connection when the scan started.
+
+    """
+
+    def __init__(
+        self,
+        plan: ReadPlan,
+        images: dict[str, numpy.ndarray],
+        timestamp: float | None = None,
+        monotonic: float | None = None,
+        overrides: Mapping[str, Any] = {},
+        generation: int = 0,
+    ):
+        self.plan = plan
+
+        for image in images.values():
+            image.flags.writeable = False
+        self.images = images
+
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.monotonic = monotonic if monotonic is not None else time.monotonic()
+        self.generation = generation
+
+        self._registers = plan.by_name
+        self._index = plan.index
+        self._overrides = {
+            name: value for name, value in overrides.items() if name in self._registers
+        }
+
+        # Decoded values, populated on first access.
+        self._values: dict[str, Any] = {}
+
+    @classmethod
+    def from_blocks(
+        cls,
+        plan: ReadPlan,
+        data: Sequence[BlockData],
+        **kwargs,
+    ):
+        """Creates a snapshot from the data returned by each block in a plan.
+
+        Parameters
+        ----------
+        plan
+            The `.ReadPlan` that was executed.
+        data
+            A list with the bits or words returned by each block read in ``plan``.
+            The bits of a block can be a sequence of booleans or the packed
+            bytes of the response, which are copied without unpacking them.
+        kwargs
+            Other arguments to pass to `.RegisterSnapshot`.
+
+        """
+
+        images: dict[str, numpy.ndarray] = {}
+        for mode, size in plan.sizes.items():
+            if mode in BIT_MODES:
+                images[mode] = numpy.zeros(math.ceil(size / 8), dtype=numpy.uint8)
+            else:
+                images[mode] = numpy.zeros(size, dtype=numpy.uint16)
+
+        for block, offset, block_data in zip(plan.blocks, plan.offsets, data):
+            count = block.count
+
+            if not block.is_bits:
+                images[block.mode][offset : offset + count] = block_data[:count]
+                continue
+
+            n_bytes = math.ceil(count / 8)
+            if isinstance(block_data, (bytes, bytearray, memoryview)):
+                packed = numpy.frombuffer(block_data, dtype=numpy.uint8, count=n_bytes)
+            else:
+                bits = numpy.asarray(block_data[:count], dtype=numpy.bool_)
+                packed = numpy.packbits(bits, bitorder="little")
+
+            images[block.mode][offset >> 3 : (offset >> 3) + n_bytes] = packed
+
+        return cls(plan, images, **kwargs)
+
+    def __getitem__(self, name: str) -> Any:
+        values = self._values
+        if name in values:
+            return values[name]
+
+        value = values[name] = self._decode(self._registers[name])
+
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._registers)
+
+    def __len__(self) -> int:
+        return len(self._registers)
+
+    def __repr__(self) -> str:
+        return f"<RegisterSnapshot (n_registers={len(self)}, age={self.age:.3f})>"
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was acquired."""
+
+        return time.monotonic() - self.monotonic
+
+    def raw(self, name: str) -> numpy.ndarray:
+        """Returns the raw bits or words of a register.
+
+        Words are returned as a read-only view of the image. Bits are unpacked
+        into a new boolean array.
+
+        """
+
+        mode, start = self._index[name]
+        count = self._registers[name].count
+
+        if mode in BIT_MODES:
+            return unpack_bits(self.images[mode], start, count)
+
+        return self.images[mode][start : start + count]
+
+    def view(
+        self,
+        names: Iterable[str],
+        quality: Quality = Quality.GOOD,
+    ) -> SnapshotView:
+        """Returns a view of the snapshot restricted to some registers."""
+
+        return SnapshotView(self, names, quality=quality)
+
+    def group(self, group: str) -> SnapshotView:
+        """Returns a view of the snapshot with the registers in a group."""
+
+        names = [name for name, reg in self._registers.items() if reg.group == group]
+
+        return SnapshotView(self, names)
+
+    def _decode(self, register: ModbusRegister) -> Any:
+        """Extracts the value of a register from the images and decodes it.
+
+        Overrides replace the decoded value. All the registers that need
+        decoding are decoded at once by the `.BatchDecoder` of the plan.
+
+        """
+
+        name = register.name
+
+        if name in self._overrides:
+            return self._overrides[name]
+
+        if name in self.plan.decoder:
+            decoded = self.plan.decoder.decode(self.images)
+            for override in self._overrides:
+                decoded.pop(override, None)
+            self._values.update(decoded)
+            return decoded[name]
+
+        if name in self.plan.bit_index:
+            mode, byte, mask = self.plan.bit_index[name]
+            return bool(self.images[mode][byte] & mask)
+
+        mode, start = self._index[name]
+
+        if mode in BIT_MODES:
+            return unpack_bits(self.images[mode], start, register.count).tolist()
+
+        image = self.images[mode]
+
+        if register.count == 1:
+            return image[start].item()
+
+        return image[start : start + register.count].tolist()
+
+
+def unpack_bits(image: numpy.ndarray, start: int, count: int) -> numpy.ndarray:
+    """Unpacks ``count`` bits starting at bit ``start`` of a packed image."""
+
+    first = start >> 3
+    last = (start + count + 7) >> 3
+
+    bits = numpy.unpackbits(image[first:last], bitorder="little")
+    offset = start - 8 * first
+
+    return bits[offset : offset + count].view(numpy.bool_)
+
+
+@lru_cache(maxsize=256)
+def _get_name_set(names: tuple[str, ...]) -> frozenset[str]:
+    """Returns a set of names. Cached so that views of the same registers share it."""
+
+    return frozenset(names)
+
+
+class SnapshotView(Mapping[str, Any]):
+    """A view of a subset of the registers in a `.RegisterSnapshot`.
+
+    Values are not copied; they are retrieved from the snapshot when accessed.
+    Registers can also be accessed as attributes of the view.
+
+    Parameters
+    ----------
+    snapshot
+        The `.RegisterSnapshot` with the values.
+    names
+        The names of the registers in the view.
+    quality
+        The `.Quality` of the values, as seen by the caller that requested them.
+
+    """
+
+    def __init__(
+        self,
+        snapshot: RegisterSnapshot,
+        names: Iterable[str],
+        quality: Quality = Quality.GOOD,
+    ):
+        self._snapshot = snapshot
+        self._names = tuple(names)
+        self._name_set = _get_name_set(self._names)
+        self._quality = quality
+
+        if not self._name_set.issubset(snapshot._registers):
+            unknown = sorted(self._name_set.difference(snapshot._registers))
+            raise KeyError(f"Registers {unknown!r} not in snapshot.")
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._name_set:
+            raise KeyError(name)
+
+        return self._snapshot[name]
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(f"Register {name!r} not in view.")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __repr__(self) -> str:
+        return f"<SnapshotView (n_registers={len(self)}, quality={self.quality.value})>"
+
+    @property
+    def snapshot(self) -> RegisterSnapshot:
+        """The snapshot from which the values are retrieved."""
+
+        return self._snapshot
+
+    @property
+    def timestamp(self) -> float:
+        """The Unix time at which the snapshot was acquired."""
+
+        return self._snapshot.timestamp
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was acquired."""
+
+        return self._snapshot.age
+
+    @property
+    def quality(self) -> Quality:
+        """The `.Quality` of the values."""
+
+        return self._quality
+
+    def raw(self, name: str) -> numpy.ndarray:
+        """Returns the raw bits or words of a register. See `.RegisterSnapshot.raw`."""
+
+        if name not in self._name_set:
+            raise KeyError(name)
+
+        return self._snapshot.raw(name)
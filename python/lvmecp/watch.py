@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: watch.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+
+if TYPE_CHECKING:
+    from lvmecp.modbus import Modbus
+    from lvmecp.scheduler import Subscription
+    from lvmecp.snapshot import RegisterSnapshot
+
+
+__all__ = ["RegisterChange", "RegisterWatch"]
+
+
+WatchPredicate = Callable[["RegisterChange"], bool]
+
+
+@dataclass(frozen=True)
+class RegisterChange:
+    """A change in the value of a register.
+
+    Parameters
+    ----------
+    name
+        The name of the register.
+    old
+        The previous value of the register, or :obj:`None` if it was not known
+        when the watch started.
+    new
+        The new value of the register.
+    timestamp
+        The Unix time at which the scan that read the new value started.
+
+    """
+
+    name: str
+    old: Any
+    new: Any
+    timestamp: float
+
+
+class RegisterWatch:
+    """An async iterator of the changes in a set of registers.
+
+    Created by `.Modbus.watch`. The watch does not read the registers. It is
+    fed with every snapshot acquired by the `.Modbus` connection (by the scan
+    scheduler, other callers, or sessions) and compares the values of its
+    registers with the last values it has seen. Iterate over the watch to get
+    each `.RegisterChange` as soon as the scan that shows it finishes::
+
+        async with modbus.watch(["dome_open", "dome_closed"]) as watch:
+            async for change in watch:
+                ...
+
+    The watch must be closed with `.close`, or by using it as a context manager,
+    to stop receiving snapshots.
+
+    Parameters
+    ----------
+    modbus
+        The `.Modbus` connection.
+    names
+        The names of the registers to watch.
+    predicate
+        A function that receives each `.RegisterChange` and returns whether it
+        should be yielded.
+    interval
+        If set, the registers are read by the scan scheduler of the connection
+        at least every ``interval`` seconds while the watch is open. Otherwise
+        the watch relies on the scans that happen anyway.
+
+    """
+
+    def __init__(
+        self,
+        modbus: Modbus,
+        names: Iterable[str],
+        predicate: WatchPredicate | None = None,
+        interval: float | None = None,
+    ):
+        self.modbus = modbus
+        self.names = tuple(names)
+        self.predicate = predicate
+
+        if unknown := set(self.names).difference(modbus):
+            raise ValueError(f"Unknown registers {sorted(unknown)!r}.")
+
+        self._name_set = frozenset(self.names)
+        # A None in the queue marks the end of the changes after close().
+        self._queue: asyncio.Queue[RegisterChange | None] = asyncio.Queue()
+        self._closed: bool = False
+
+        # The last value of each register and the monotonic time of its scan.
+        # Only fresh cached values are used, so that a value that is still the
+        # same but was last seen long ago is reported again.
+        self._last: dict[str, tuple[Any, float]] = {}
+        for name in self.names:
+            if (cached := modbus.get_cached([name])) is not None:
+                self._last[name] = (cached[name], cached.snapshot.monotonic)
+
+        self._subscription: Subscription | None = None
+        if interval is not None:
+            if modbus.scheduler is None:
+                raise ValueError("The connection does not have a scan scheduler.")
+            self._subscription = modbus.scheduler.subscribe(
+                "watch",
+                self.names,
+                interval,
+                lambda _: None,
+            )
+
+        modbus._watches.append(self)
+
+    def __aiter__(self) -> RegisterWatch:
+        return self
+
+    async def __anext__(self) -> RegisterChange:
+        if self._closed and self._queue.empty():
+            raise StopAsyncIteration
+
+        change = await self._queue.get()
+        if change is None:
+            # Leave the marker for any other consumer waiting on the watch.
+            self._queue.put_nowait(None)
+            raise StopAsyncIteration
+
+        return change
+
+    async def __aenter__(self) -> RegisterWatch:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def __repr__(self) -> str:
+        return f"<RegisterWatch (names={list(self.names)}, closed={self._closed})>"
+
+    def get(self, name: str) -> Any:
+        """Returns the last value of a register seen by the watch, if any."""
+
+        last = self._last.get(name)
+
+        return last[0] if last is not None else None
+
+    async def close(self):
+        """Stops watching the registers.
+
+        Changes that have already been queued can still be iterated over, after
+        which the iteration stops. Consumers waiting for a change are woken up.
+
+        """
+
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.put_nowait(None)
+
+        if self in self.modbus._watches:
+            self.modbus._watches.remove(self)
+
+        scheduler = self.modbus.scheduler
+        if self._subscription is not None and scheduler is not None:
+            await scheduler.unsubscribe(self._subscription)
+            self._subscription = None
+
+    def feed(self, snapshot: RegisterSnapshot):
+        """Queues the changes of the watched registers in a snapshot.
+
+        Registers that are not in the snapshot, or for which a more recent scan
+        has already been seen, are ignored.
+
+        """
+
+        names = self._name_set.intersection(snapshot.plan.names)
+        if len(names) == 0:
+            return
+
+        for name in self.names:
+            if name not in names:
+                continue
+
+            new = snapshot[name]
+
+            last = self._last.get(name)
+            if last is not None:
+                if last[1] > snapshot.monotonic or last[0] == new:
+                    continue
+
+            self._last[name] = (new, snapshot.monotonic)
+
+            change = RegisterChange(
+                name=name,
+                old=last[0] if last is not None else None,
+                new=new,
+                timestamp=snapshot.timestamp,
+            )
+
+            if self.predicate is None or self.predicate(change):
+                self._queue.put_nowait(change)
@@ -70,6 +70,17 @@ async def modbus(simulator: Simulator, test_config: dict):
 
     yield _modbus
 
+    await _modbus.close()
+
+
+@pytest.fixture()
+async def native_modbus(simulator: Simulator, test_config: dict):
+    _modbus = Modbus({**test_config["modbus"], "backend": "native"})
+
+    yield _modbus
+
+    await _modbus.close()
+
 
 @pytest.fixture()
 async def actor(
@@ -88,3 +99,65 @@ async def actor(
 
     _actor.mock_replies.clear()
     await _actor.stop()
+
+
+class LatencyProxy:
+    """A TCP proxy that delays the data sent in each direction by ``delay``."""
+
+    def __init__(self, target: tuple[str, int], delay: float, port: int = 5021):
+        self.target = target
+        self.delay = delay
+        self.port = port
+
+        self.server: asyncio.Server | None = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", self.port)
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        target_reader, target_writer = await asyncio.open_connection(*self.target)
+
+        with suppress(asyncio.CancelledError):
+            await asyncio.gather(
+                self._pipe(reader, target_writer),
+                self._pipe(target_reader, writer),
+                return_exceptions=True,
+            )
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+
+        try:
+            while data := await reader.read(4096):
+                # Data is forwarded in order after the delay, like on a slow link.
+                loop.call_later(self.delay, writer.write, data)
+        finally:
+            loop.call_later(self.delay, writer.close)
+
+
+@pytest.fixture()
+async def latency_proxy(simulator: Simulator):
+    # 10 ms each way.
+    proxy = LatencyProxy((simulator.host, simulator.port), 0.01)
+    await proxy.start()
+
+    yield proxy
+
+    await proxy.stop()
+
+
+@pytest.fixture()
+async def slow_modbus(latency_proxy: LatencyProxy, test_config: dict):
+    modbus_config = deepcopy(test_config["modbus"])
+    modbus_config["port"] = latency_proxy.port
+
+    _modbus = Modbus(modbus_config)
+
+    yield _modbus
+
+    await _modbus.close()
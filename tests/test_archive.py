@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_archive.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import asyncio
+import pathlib
+from copy import deepcopy
+
+from typing import TYPE_CHECKING
+
+import numpy
+import pytest
+
+import lvmecp.archive
+from lvmecp.archive import ArchiveReader, ArchiveWriter, get_sjd, read_header
+from lvmecp.modbus import Modbus
+from lvmecp.planner import BIT_MODES
+from lvmecp.snapshot import RegisterSnapshot
+
+
+if TYPE_CHECKING:
+    from pymodbus.datastore import ModbusSlaveContext
+
+
+def create_snapshot(modbus: Modbus, timestamp: float, counter: int = 0):
+    """Returns a snapshot of all the registers with a given ``dome_counter``."""
+
+    images: dict[str, numpy.ndarray] = {}
+    for mode, size in modbus.plan.sizes.items():
+        if mode in BIT_MODES:
+            images[mode] = numpy.zeros((size + 7) // 8, dtype=numpy.uint8)
+        else:
+            images[mode] = numpy.zeros(size, dtype=numpy.uint16)
+
+    _, position = modbus.plan.index["dome_counter"]
+    images["holding_register"][position] = counter
+
+    return RegisterSnapshot(modbus.plan, images, timestamp=timestamp)
+
+
+async def test_archive(
+    test_config: dict,
+    context: ModbusSlaveContext,
+    tmp_path: pathlib.Path,
+):
+    modbus = Modbus({**test_config["modbus"], "archive_dir": str(tmp_path)})
+    assert isinstance(modbus.archive, ArchiveWriter)
+
+    for value in [1, 2, 3]:
+        context.setValues(3, modbus["dome_counter"].address, [value])
+        await modbus.read_all(use_cache=False)
+
+    context.setValues(1, modbus["drive_enabled"].address, [1])
+    await modbus.scan(modbus.get_plan(["drive_enabled"]))
+
+    await modbus.close()
+
+    path = modbus.archive.path
+    assert path is not None
+    assert path.name == f"plc-{get_sjd(modbus.history.timestamps[0])}.ecp"
+    assert modbus.archive.stats["records"] == 4
+    assert modbus.archive.stats["dropped"] == 0
+
+    header, offset = read_header(path)
+    assert header["record_size"] == modbus.archive.record_dtype.itemsize
+    assert header["host"] == "127.0.0.1"
+    assert path.stat().st_size == offset + 4 * header["record_size"]
+
+    with ArchiveReader(path) as reader:
+        assert len(reader) == 4
+        assert reader.sjd == header["sjd"]
+
+        # The records are the same as the rows of the history.
+        assert reader.records.tobytes() == modbus.history.records[:4].tobytes()
+
+        times, values = reader.get("dome_counter")
+        assert values.tolist() == [1, 2, 3]
+        assert times.tolist() == modbus.history.get("dome_counter")[0].tolist()
+
+        assert reader.get("drive_enabled")[1].tolist() == [False] * 3 + [True]
+
+        view = reader.view("dome_counter")
+        assert view.shape == (4, 1)
+        assert view[:, 0].tolist() == [1, 2, 3, 3]
+        assert not view.flags.owndata and not view.flags.writeable
+
+        assert reader.view("drive_enabled").dtype == numpy.uint8
+
+
+async def test_archive_rotation(test_config: dict, tmp_path: pathlib.Path):
+    modbus = Modbus(test_config["modbus"])
+
+    writer = ArchiveWriter(modbus.plan, tmp_path, name="test")
+
+    # The SJD changes at 14:24 UTC.
+    rollover = (60000 - 40587 - 0.4) * 86400
+    for ii, timestamp in enumerate([rollover - 2, rollover - 1, rollover + 1]):
+        writer.write(create_snapshot(modbus, timestamp, counter=ii))
+
+    await writer.close()
+
+    assert writer.stats["files"] == 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "test-59999.ecp",
+        "test-60000.ecp",
+    ]
+
+    with ArchiveReader(tmp_path / "test-59999.ecp") as reader:
+        assert reader.get("dome_counter")[1].tolist() == [0, 1]
+
+    with ArchiveReader(tmp_path / "test-60000.ecp") as reader:
+        assert reader.get("dome_counter")[1].tolist() == [2]
+
+
+async def test_archive_reopen(test_config: dict, tmp_path: pathlib.Path):
+    modbus = Modbus(test_config["modbus"])
+    timestamp = (60000 - 40587) * 86400
+
+    writer = ArchiveWriter(modbus.plan, tmp_path, name="test")
+    writer.write(create_snapshot(modbus, timestamp, counter=1))
+    await writer.close()
+
+    path = writer.path
+    assert path is not None
+
+    # An incomplete record, as if the writer crashed, is ignored by the reader.
+    with open(path, "ab") as file:
+        file.write(b"\1\2\3")
+
+    with ArchiveReader(path) as reader:
+        assert len(reader) == 1
+
+    # And removed when the file is opened again.
+    writer = ArchiveWriter(modbus.plan, tmp_path, name="test")
+    writer.write(create_snapshot(modbus, timestamp + 1, counter=2))
+    await writer.close()
+
+    assert writer.path == path
+
+    with ArchiveReader(path) as reader:
+        assert reader.get("dome_counter")[1].tolist() == [1, 2]
+
+    # A different set of registers is written to a new file.
+    modbus_config = deepcopy(test_config["modbus"])
+    modbus_config["registers"].pop("door_locked")
+
+    other = Modbus(modbus_config)
+    writer = ArchiveWriter(other.plan, tmp_path, name="test")
+    writer.write(create_snapshot(other, timestamp + 2, counter=3))
+    await writer.close()
+
+    assert writer.path == path.with_name(f"{path.stem}-1.ecp")
+
+    with ArchiveReader(writer.path) as reader:
+        assert "door_locked" not in reader
+        assert reader.get("dome_counter")[1].tolist() == [3]
+
+
+async def test_archive_write_error(
+    test_config: dict,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    modbus = Modbus(test_config["modbus"])
+    assert modbus.archive is None
+
+    monkeypatch.setattr(lvmecp.archive, "REOPEN_INTERVAL", 0.2)
+
+    # The directory cannot be created because there is a file with its name.
+    (tmp_path / "archive").touch()
+
+    writer = ArchiveWriter(modbus.plan, tmp_path / "archive", name="test")
+    writer.write(create_snapshot(modbus, 1e9))
+
+    await asyncio.sleep(0.05)
+
+    # The thread keeps running and the records are dropped until it can retry.
+    assert isinstance(writer.error, OSError)
+    assert writer.running
+    assert writer.stats["errors"] == 1
+
+    writer.write(create_snapshot(modbus, 1e9 + 1))
+    await asyncio.sleep(0.05)
+    assert writer.stats["dropped"] == 2
+    assert writer.stats["errors"] == 1
+
+    # Once the directory can be created the file is reopened.
+    (tmp_path / "archive").unlink()
+    await asyncio.sleep(0.2)
+
+    writer.write(create_snapshot(modbus, 1e9 + 2, counter=2))
+    await writer.close()
+
+    assert writer.stats["records"] == 1
+    assert writer.path is not None
+
+    with ArchiveReader(writer.path) as reader:
+        assert reader.get("dome_counter")[1].tolist() == [2]
+
+
+def test_read_header_invalid(tmp_path: pathlib.Path):
+    path = tmp_path / "invalid.ecp"
+    path.write_bytes(b"not an archive file")
+
+    with pytest.raises(ValueError):
+        read_header(path)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_cache.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import math
+from time import monotonic
+
+import numpy
+import pytest
+from pytest_mock import MockerFixture
+
+from lvmecp import config
+from lvmecp.cache import RegisterCache
+from lvmecp.exceptions import DeadlineExceededError
+from lvmecp.modbus import Modbus
+from lvmecp.snapshot import Quality, RegisterSnapshot
+
+
+@pytest.fixture()
+async def offline_modbus():
+    # A Modbus instance that is never connected.
+    yield Modbus(config["modbus"])
+
+
+def create_snapshot(modbus: Modbus, names: list[str] | None, age: float = 0.0):
+    plan = modbus.plan if names is None else modbus.get_plan(names)
+
+    return RegisterSnapshot(plan, {}, monotonic=monotonic() - age)
+
+
+async def test_cache_update(offline_modbus: Modbus):
+    cache = RegisterCache({"door_locked": None, "door_closed": 10, "local": None})
+
+    assert cache.oldest == -math.inf
+    assert cache.age("door_locked") == math.inf
+
+    snapshot = create_snapshot(offline_modbus, ["door_locked", "door_closed"], age=2)
+    cache.update(snapshot)
+
+    assert cache.latest("door_locked") is snapshot
+    assert cache.latest("local") is None
+    assert 2 <= cache.age("door_locked") < 3
+
+    # The registers of the snapshot that are not in the cache are ignored.
+    assert len(cache) == 3
+
+    # Only "door_closed" has a max_age longer than its age.
+    stale = cache.stale(timeout=1)
+    assert stale.tolist() == [True, False, True]
+    assert cache.is_fresh(["door_closed"], timeout=1)
+    assert not cache.is_fresh(timeout=1)
+
+
+async def test_cache_keeps_newest(offline_modbus: Modbus):
+    cache = RegisterCache({"door_locked": None, "door_closed": None})
+
+    new = create_snapshot(offline_modbus, ["door_locked"], age=0)
+    old = create_snapshot(offline_modbus, ["door_locked", "door_closed"], age=5)
+
+    cache.update(new)
+    cache.update(old)
+
+    assert cache.latest("door_locked") is new
+    assert cache.latest("door_closed") is old
+
+
+async def test_cache_oldest_watermark(offline_modbus: Modbus):
+    cache = RegisterCache({name: None for name in offline_modbus})
+
+    full = create_snapshot(offline_modbus, None, age=3)
+    cache.update(full)
+
+    # A snapshot with all the registers sets the watermark directly.
+    assert cache._oldest_valid
+    assert cache.oldest == full.monotonic
+
+    partial = create_snapshot(offline_modbus, ["door_locked"], age=1)
+    cache.update(partial)
+
+    assert not cache._oldest_valid
+    assert cache.oldest == full.monotonic
+    assert 3 <= cache.oldest_age < 4
+
+    assert cache.is_fresh(timeout=5)
+    assert not cache.is_fresh(timeout=2)
+
+
+async def test_cache_get(offline_modbus: Modbus):
+    cache = RegisterCache({name: None for name in offline_modbus})
+
+    snapshot = create_snapshot(offline_modbus, ["door_locked", "door_closed"], age=2)
+    cache.update(snapshot)
+
+    view = cache.get(["door_locked", "door_closed"], timeout=5)
+    assert view is not None and view.snapshot is snapshot
+
+    assert cache.get(["door_locked"], timeout=1) is None
+    assert cache.get(["door_locked", "local"], timeout=5) is None
+    assert cache.get(["not_a_register"], timeout=5) is None
+    assert cache.get([], timeout=5) is None
+
+
+async def test_cache_get_stale(offline_modbus: Modbus):
+    cache = RegisterCache({name: None for name in offline_modbus})
+    cache.update(create_snapshot(offline_modbus, ["door_locked"], age=2))
+
+    view = cache.get(["door_locked"], timeout=5)
+    assert view is not None and view.quality == Quality.GOOD
+
+    view = cache.get(["door_locked"], timeout=1, max_age=10)
+    assert view is not None and view.quality == Quality.STALE
+
+    assert cache.get(["door_locked"], timeout=1, max_age=1.5) is None
+
+
+async def test_cache_invalidate(offline_modbus: Modbus):
+    cache = RegisterCache({name: None for name in offline_modbus})
+    cache.update(create_snapshot(offline_modbus, None))
+
+    assert cache.is_fresh(timeout=1)
+
+    cache.invalidate()
+
+    assert cache.oldest == -math.inf
+    assert numpy.isinf(cache.ages()).all()
+    assert cache.get(["door_locked"], timeout=1) is None
+
+
+async def test_modbus_cache_invalidated_by_write(modbus: Modbus):
+    await modbus.read_all(use_cache=False)
+    assert modbus.cache.is_fresh(timeout=1)
+
+    await modbus.write_register("drive_enabled", True)
+
+    # Only the written register expires.
+    assert modbus.cache.oldest == -math.inf
+    assert modbus.get_age("drive_enabled") == math.inf
+    assert modbus.get_age("door_locked") < 1
+
+    assert modbus.get_cached(["door_locked"]) is not None
+    assert modbus.get_cached(["drive_enabled"]) is None
+
+    # The value read before the write is still returned as stale.
+    view = modbus.get_cached(["drive_enabled"], max_age=10)
+    assert view is not None
+    assert view.quality == Quality.STALE
+    assert view["drive_enabled"] is False
+
+
+async def test_modbus_cache_failed_write(modbus: Modbus, mocker: MockerFixture):
+    await modbus.read_all(use_cache=False)
+
+    client = modbus.pool.clients[0]
+    write_coil = mocker.patch.object(
+        client,
+        "write_coil",
+        side_effect=ConnectionError(),
+    )
+
+    with pytest.raises(DeadlineExceededError):
+        await modbus["drive_enabled"].write(True, timeout=0.2)
+
+    write_coil.assert_called()
+
+    # Failed writes do not expire the cache.
+    assert modbus.cache.is_fresh(timeout=1)
@@ -419,3 +419,74 @@ async def test_dome_drive_error(
 
     with pytest.raises(DomeError, match="Dome drive is in error state"):
         await actor.plc.dome.open()
+
+
+async def test_dome_motion_polling(
+    actor: ECPActor,
+    context: ModbusSlaveContext,
+    mocker: MockerFixture,
+):
+    dome = actor.plc.dome
+    modbus = actor.plc.modbus
+
+    mocker.patch.object(dome, "_interval", 1)
+    execute_plan = mocker.spy(modbus, "execute_plan")
+
+    context.setValues(1, modbus["drive_enabled"].address, [1])
+    await dome.update(use_cache=False)
+
+    subscription = dome._motion_subscription
+    assert subscription is not None
+    assert subscription.interval == dome.motion_interval
+
+    execute_plan.reset_mock()
+    await asyncio.sleep(0.5)
+
+    # The motion registers are read in a single request on each tick.
+    plans = [call.args[0] for call in execute_plan.call_args_list]
+    assert 2 <= len(plans) <= 3
+    assert all(plan.n_requests == 1 for plan in plans)
+    assert dome.status is not None and dome.status & DomeStatus.MOVING
+
+    # Once the drive is disabled the polling slows down until it stops.
+    context.setValues(1, modbus["drive_enabled"].address, [0])
+    await asyncio.sleep(0.3)
+
+    assert subscription.interval > dome.motion_interval
+
+    await asyncio.sleep(1.5)
+
+    assert dome._motion_subscription is None
+    assert subscription not in actor.plc.scheduler.subscriptions
+
+
+async def test_dome_wait_until_movement_done(
+    actor: ECPActor,
+    context: ModbusSlaveContext,
+):
+    modbus = actor.plc.modbus
+
+    context.setValues(1, modbus["drive_enabled"].address, [1])
+    context.setValues(1, modbus["dome_closed"].address, [0])
+
+    async def open_with_delay():
+        await asyncio.sleep(0.3)
+
+        context.setValues(1, modbus["dome_open"].address, [1])
+        context.setValues(1, modbus["drive_enabled"].address, [0])
+
+    asyncio.create_task(open_with_delay())
+
+    await asyncio.wait_for(actor.plc.dome._wait_until_movement_done(True), 1)
+
+    assert actor.plc.dome._motion_waiters == 0
+
+
+async def test_dome_wait_until_movement_done_timeout(
+    actor: ECPActor,
+    context: ModbusSlaveContext,
+):
+    context.setValues(1, actor.plc.modbus["drive_enabled"].address, [1])
+
+    with pytest.raises(DomeError, match="Timeout waiting for dome"):
+        await actor.plc.dome._wait_until_movement_done(True, timeout=0.3)
@@ -10,6 +10,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+from lvmecp.priority import Priority
+
 
 if TYPE_CHECKING:
     from pytest_mock import MockerFixture
@@ -25,7 +27,7 @@ async def test_command_heartbeat(actor: ECPActor, mocker: MockerFixture):
 
     assert cmd.status.did_succeed
 
-    hb_set_mock.assert_called_once_with(True)
+    hb_set_mock.assert_called_once_with(True, priority=Priority.HEARTBEAT)
 
 
 async def test_command_heartbeat_fails(actor: ECPActor, mocker: MockerFixture):
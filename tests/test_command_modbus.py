@@ -12,6 +12,8 @@ from typing import TYPE_CHECKING
 
 from pytest_mock import MockerFixture
 
+from lvmecp.modbus import ModbusSession
+
 
 if TYPE_CHECKING:
     from pymodbus.datastore import ModbusSlaveContext
@@ -88,7 +90,7 @@ async def test_modbus_write_register_readonly(actor: ECPActor):
 
 async def test_modbus_write_register_fails(actor: ECPActor, mocker: MockerFixture):
     mocker.patch.object(
-        actor.plc.modbus["motor_direction"],
+        ModbusSession,
         "write",
         side_effect=ValueError("cannot write"),
     )
@@ -8,10 +8,21 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+import json
+import pathlib
+from unittest.mock import AsyncMock
+
+from typing import TYPE_CHECKING, cast
+
+import jsonschema
+import pytest
 
 
 if TYPE_CHECKING:
+    from pymodbus.datastore import ModbusSlaveContext
+    from pytest_mock import MockerFixture
+
     from lvmecp.actor import ECPActor
 
 
@@ -22,3 +33,191 @@ async def test_command_status(actor: ECPActor):
     assert cmd.status.did_succeed
     assert isinstance(cmd.replies.get("registers"), dict)
     assert cmd.replies.get("register_overrides") == []
+
+    ages = cmd.replies.get("register_ages")
+    assert set(ages) == set(cmd.replies.get("registers")) | set(actor.plc.hvac_modbus)
+    assert ages["door_locked"] is not None and ages["door_locked"] < 1
+
+    quality = cmd.replies.get("register_quality")
+    assert set(quality) == set(ages)
+    assert quality["door_locked"] == "good"
+
+
+async def test_command_status_burst(actor: ECPActor, mocker: MockerFixture):
+    modbus = actor.plc.modbus
+
+    # Disable the cache so that all the reads go to the PLC.
+    mocker.patch.object(modbus, "cache_timeout", 0)
+
+    execute_plan = mocker.spy(modbus, "execute_plan")
+
+    commands = [await actor.invoke_mock_command("status") for _ in range(5)]
+    await asyncio.gather(*commands)
+
+    assert all(cmd.status.did_succeed for cmd in commands)
+    assert all(len(cmd.replies.get("registers")) == len(modbus) for cmd in commands)
+
+    # The five commands share one full scan, one scan of the registers of the
+    # modules, and one of the engineering mode registers.
+    assert execute_plan.call_count == 3
+
+    plans = [call.args[0].names for call in execute_plan.call_args_list]
+    assert modbus.plan.names in plans
+    assert frozenset(modbus.groups["engineering_mode"]) in plans
+
+
+async def test_command_status_stale(actor: ECPActor, mocker: MockerFixture):
+    modbus = actor.plc.modbus
+
+    await (await actor.invoke_mock_command("status"))
+
+    # The values have expired, but are younger than the stale_max_age.
+    mocker.patch.object(modbus, "cache_timeout", 0)
+    execute_plan = mocker.spy(modbus, "execute_plan")
+
+    cmd = await actor.invoke_mock_command("status")
+    await cmd
+
+    assert cmd.status.did_succeed
+    assert modbus._revalidate_task is not None
+
+    # Only the registers without a poll tier expire with the cache timeout.
+    quality = cmd.replies.get("register_quality")
+    assert quality["door_locked"] == "stale"
+    assert quality["rain_sensor_alarm"] == "good"
+
+    # The registers are read once, in the background.
+    await modbus._revalidate_task
+    assert execute_plan.call_count == 1
+
+
+async def test_command_status_snapshot(actor: ECPActor, mocker: MockerFixture):
+    modbus = actor.plc.modbus
+    read_all = modbus.read_all
+
+    snapshot = await read_all(use_cache=False)
+    await asyncio.sleep(0.2)
+
+    # A refresh replaces the last scan before the status is output.
+    async def read_stale(*args, **kwargs):
+        await read_all(use_cache=False)
+        return snapshot
+
+    mocker.patch.object(modbus, "read_all", side_effect=read_stale)
+
+    cmd = await actor.invoke_mock_command("status")
+    await cmd
+
+    assert modbus.snapshot is not snapshot
+
+    # The ages are those of the scan with the values that are output.
+    assert cmd.replies.get("register_ages")["door_locked"] >= 0.2
+
+
+async def test_command_status_scaled(actor: ECPActor, context: ModbusSlaveContext):
+    modbus = actor.plc.modbus
+    context.setValues(3, modbus["oxygen_read_utilities_room"].address, [209])
+
+    cmd = await actor.invoke_mock_command("status --no-cache")
+    await cmd
+
+    assert cmd.status.did_succeed
+
+    # Registers with a scale are output with their decoded value, not the raw one.
+    assert cmd.replies.get("registers")["oxygen_read_utilities_room"] == 20.9
+
+
+async def test_command_status_delta(actor: ECPActor, context: ModbusSlaveContext):
+    modbus = actor.plc.modbus
+
+    # The values last emitted by the actor.
+    await actor.plc.read_all_registers(use_cache=False)
+    actor.plc.get_register_changes(actor.status_baseline)
+
+    context.setValues(3, modbus["dome_counter"].address, [42])
+
+    # A full status does not consume the changes of the next delta.
+    cmd = await actor.invoke_mock_command("status --no-cache")
+    await cmd
+    assert cmd.replies.get("registers")["dome_counter"] == 42
+
+    for _ in range(2):
+        cmd = await actor.invoke_mock_command("status --delta --no-cache")
+        await cmd
+
+        assert cmd.status.did_succeed
+        assert cmd.replies.get("registers_delta") == {"dome_counter": 42}
+        assert list(cmd.replies.get("register_ages")) == ["dome_counter"]
+        assert cmd.replies.get("register_quality") == {"dome_counter": "good"}
+
+        with pytest.raises(KeyError):
+            cmd.replies.get("registers")
+
+    # Once the actor emits the change, nothing has changed. Neither the registers
+    # nor the module status are output.
+    actor.plc.get_register_changes(actor.status_baseline)
+
+    cmd = await actor.invoke_mock_command("status --delta --no-cache")
+    await cmd
+
+    assert cmd.status.did_succeed
+    for keyword in ("registers_delta", "dome_status"):
+        with pytest.raises(KeyError):
+            cmd.replies.get(keyword)
+
+
+async def test_emit_status(
+    actor: ECPActor,
+    context: ModbusSlaveContext,
+    mocker: MockerFixture,
+):
+    modbus = actor.plc.modbus
+
+    mocker.patch.object(actor, "send_command")
+    mocker.patch.object(
+        actor.plc.hvac_modbus,
+        "scan",
+        side_effect=ConnectionError("HVAC not available."),
+    )
+
+    write = mocker.spy(actor, "write")
+    read_all = mocker.spy(modbus, "read_all")
+
+    task = asyncio.create_task(actor.emit_status(delay=0.1, keyframe_interval=100))
+    await asyncio.sleep(0.15)
+
+    context.setValues(3, modbus["dome_counter"].address, [42])
+    await asyncio.sleep(0.2)
+
+    task.cancel()
+
+    replies = [call.kwargs for call in write.call_args_list]
+
+    # A keyframe with all the registers from the scan, then only the changes.
+    assert set(replies[0]["registers"]) == set(modbus)
+    assert set(replies[0]["register_quality"].values()) == {"good"}
+    assert {"dome_counter": 42} in [reply.get("registers_delta") for reply in replies]
+
+    # The registers are not read again to output them.
+    read_all.assert_not_called()
+
+    send_command = cast(AsyncMock, actor.send_command)
+    send_command.assert_any_call(actor.name, "status --no-registers", internal=True)
+
+
+def test_status_schema_register_names(actor: ECPActor):
+    schema = json.loads(pathlib.Path(actor.config["actor"]["schema"]).read_text())
+
+    # The pattern applies to all the register names, including digits.
+    delta = {"registers_delta": {"dome_counter": 42, "e_stop_ln2_button1": True}}
+    jsonschema.validate(delta, schema)
+
+    with pytest.raises(jsonschema.ValidationError):
+        jsonschema.validate({"registers_delta": {"e_stop_ln2_button1": "on"}}, schema)
+
+    with pytest.raises(jsonschema.ValidationError):
+        jsonschema.validate({"register_ages": {"dome_counter": "old"}}, schema)
+
+    jsonschema.validate({"register_quality": {"dome_counter": "stale"}}, schema)
+    with pytest.raises(jsonschema.ValidationError):
+        jsonschema.validate({"register_quality": {"dome_counter": "bad"}}, schema)
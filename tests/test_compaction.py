@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_compaction.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import pathlib
+
+import numpy
+import pytest
+
+from lvmecp.archive import ArchiveReader, ArchiveWriter
+from lvmecp.compaction import CompactReader, compact, decode_column, encode_column
+from lvmecp.modbus import Modbus
+from lvmecp.planner import BIT_MODES
+from lvmecp.snapshot import RegisterSnapshot
+
+
+async def create_archive(test_config: dict, path: pathlib.Path, n_scans: int = 50):
+    """Archives random scans, reading ``drive_enabled`` only in the even ones."""
+
+    modbus = Modbus(test_config["modbus"])
+    rng = numpy.random.default_rng(0)
+
+    partial = modbus.get_plan([name for name in modbus if name != "drive_enabled"])
+
+    writer = ArchiveWriter(modbus.plan, path, name="test")
+    for ii in range(n_scans):
+        plan = modbus.plan if ii % 2 == 0 else partial
+
+        images: dict[str, numpy.ndarray] = {}
+        for mode, size in plan.sizes.items():
+            if mode in BIT_MODES:
+                images[mode] = rng.integers(0, 256, (size + 7) // 8, dtype=numpy.uint8)
+            else:
+                images[mode] = rng.integers(0, 2**16, size, dtype=numpy.uint16)
+
+        writer.write(RegisterSnapshot(plan, images, timestamp=1e9 + ii * 0.1))
+
+    await writer.close()
+
+    assert writer.path is not None
+    return writer.path
+
+
+async def test_compact(test_config: dict, tmp_path: pathlib.Path):
+    path = await create_archive(test_config, tmp_path)
+
+    output = compact(path, chunk_size=16)
+    assert output == path.with_suffix(".ecpz")
+
+    with ArchiveReader(path) as archive, CompactReader(output) as reader:
+        assert len(reader) == len(archive) == 50
+        assert reader.names == archive.names
+        assert len(reader.chunks) == 4
+
+        series = reader.load()
+        assert list(series) == list(archive.names)
+
+        for name, (times, values) in series.items():
+            archive_times, archive_values = archive.get(name)
+
+            numpy.testing.assert_allclose(times, archive_times, rtol=0, atol=1e-6)
+            if values.dtype.kind == "f":
+                numpy.testing.assert_array_equal(values, archive_values)
+            else:
+                assert values.dtype == archive_values.dtype
+                assert values.tolist() == archive_values.tolist()
+
+        assert len(series["drive_enabled"][0]) == 25
+
+
+async def test_compact_range(test_config: dict, tmp_path: pathlib.Path):
+    path = await create_archive(test_config, tmp_path)
+    output = compact(path, tmp_path / "compact.ecpz", chunk_size=16)
+
+    with ArchiveReader(path) as archive, CompactReader(output) as reader:
+        start = 1e9 + 2.05
+        end = 1e9 + 3.55
+
+        times, values = reader.get("dome_counter", start, end)
+        archive_times, archive_values = archive.get("dome_counter", start, end)
+
+        assert len(times) == 15
+        numpy.testing.assert_allclose(times, archive_times, rtol=0, atol=1e-6)
+        assert values.tolist() == archive_values.tolist()
+
+        # Only the chunks in the range are decoded.
+        assert list(reader._times) == [1, 2]
+
+        assert len(reader.get("dome_counter", start=1e10)[0]) == 0
+
+        with pytest.raises(KeyError):
+            reader.get("invalid")
+
+
+def test_compact_invalid(tmp_path: pathlib.Path):
+    path = tmp_path / "invalid.ecpz"
+    path.write_bytes(b"not a compacted archive")
+
+    with pytest.raises(ValueError):
+        CompactReader(path)
+
+
+@pytest.mark.parametrize(
+    "values,encoding",
+    [
+        (numpy.repeat([True, False, True], 1000), "rle"),
+        (numpy.random.default_rng(0).integers(0, 2, 1000).astype(bool), "bits"),
+        (numpy.zeros((0,), dtype=bool), "bits"),
+        (numpy.arange(1000, dtype=numpy.uint16).reshape(500, 2), "delta"),
+        (numpy.array([1, -(2**40), 2**40], dtype=numpy.int64), "delta"),
+        (numpy.array([numpy.nan, 1.5, numpy.inf]), "raw"),
+    ],
+)
+def test_encode_column(values: numpy.ndarray, encoding: str):
+    spec, data = encode_column(values)
+
+    assert spec["encoding"] == encoding
+
+    decoded = decode_column(spec, data)
+    assert decoded.dtype == values.dtype
+    numpy.testing.assert_array_equal(decoded, values)
+
+
+def test_encode_column_float():
+    values = numpy.cumsum(numpy.random.default_rng(0).normal(0, 0.1, 1000))
+
+    spec, data = encode_column(values, precision=0.01)
+    assert spec["encoding"] == "quantised"
+
+    decoded = decode_column(spec, data)
+    assert numpy.abs(decoded - values).max() <= 0.005 + 1e-12
+    assert (numpy.round(decoded, 2) == decoded).all()
+
+    assert encode_column(values, precision=None)[0]["encoding"] == "raw"
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_decoders.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+from copy import deepcopy
+
+from typing import TYPE_CHECKING
+
+import numpy
+import pytest
+from pytest_mock import MockerFixture
+
+from lvmecp.decoders import DECODERS, decode_words, get_decoder, register_decoder
+from lvmecp.modbus import Modbus, ModbusRegister
+from lvmecp.planner import compile_read_plan
+from lvmecp.snapshot import RegisterSnapshot
+
+
+if TYPE_CHECKING:
+    from pymodbus.datastore import ModbusSlaveContext
+
+    from lvmecp.actor import ECPActor
+
+
+def create_registers(modbus: Modbus, **kwargs) -> list[ModbusRegister]:
+    return [
+        ModbusRegister(
+            modbus,
+            name=f"{decoder}_{ii}",
+            address=10 * ii + 2 * jj,
+            mode="holding_register",
+            count=2,
+            decoder=decoder,
+            **kwargs,
+        )
+        for ii in range(3)
+        for jj, decoder in enumerate(["float_32bit", "int_32bit", "uint_32bit"])
+    ]
+
+
+def encode_words(values: numpy.ndarray, byteorder: str, wordorder: str):
+    """Encodes values as the words that the server would return."""
+
+    words = values.astype(values.dtype.newbyteorder(">")).view(">u2").astype("u2")
+    if byteorder == "little":
+        words = words.byteswap()
+
+    words = words.reshape(len(values), -1)
+    if wordorder == "little":
+        words = words[:, ::-1]
+
+    return words
+
+
+@pytest.mark.parametrize("byteorder", ["big", "little"])
+@pytest.mark.parametrize("wordorder", ["big", "little"])
+def test_decode_words(byteorder: str, wordorder: str):
+    values = numpy.array([0.25, -1.5, 3.14159, 1e6], dtype=numpy.float32)
+    words = encode_words(values, byteorder, wordorder)
+
+    decoded = decode_words(words, "f4", byteorder, wordorder)  # type: ignore
+
+    numpy.testing.assert_array_equal(decoded, values)
+
+
+@pytest.mark.parametrize("byteorder", ["big", "little"])
+@pytest.mark.parametrize("wordorder", ["big", "little"])
+def test_batch_decoder(modbus: Modbus, byteorder: str, wordorder: str):
+    registers = create_registers(modbus, byteorder=byteorder, wordorder=wordorder)
+    plan = compile_read_plan(registers)
+
+    rng = numpy.random.default_rng(42)
+    words = rng.integers(0, 2**16, plan.sizes["holding_register"], numpy.uint16)
+
+    # Use floats of a reasonable magnitude.
+    floats = rng.uniform(-1000, 1000, len(registers)).astype(numpy.float32)
+    encoded = encode_words(floats, byteorder, wordorder)
+    for register, float_words in zip(registers, encoded):
+        if register.decoder == "float_32bit":
+            _, position = plan.index[register.name]
+            words[position : position + 2] = float_words
+
+    decoded = plan.decoder.decode({"holding_register": words})
+    assert len(plan.decoder) == len(decoded) == len(registers)
+
+    # The batch decoder matches the per-register path.
+    for register in registers:
+        _, position = plan.index[register.name]
+        value = register.decode(words[position : position + 2].tolist())
+        assert decoded[register.name] == pytest.approx(value, abs=1e-9)
+        assert type(decoded[register.name]) is type(value)
+
+
+async def test_snapshot_batch_decoding(
+    context: ModbusSlaveContext,
+    modbus: Modbus,
+    mocker: MockerFixture,
+):
+    registers = create_registers(modbus)
+    context.setValues(3, 0, [4000, 16000] * 15)
+
+    plan = compile_read_plan(registers)
+    decode = mocker.spy(plan.decoder, "decode")
+
+    snapshot = await modbus.scan(plan)
+    assert isinstance(snapshot, RegisterSnapshot)
+
+    assert snapshot["float_32bit_0"] == 0.25
+    assert snapshot["int_32bit_0"] == 16000 * 2**16 + 4000
+    assert snapshot["uint_32bit_2"] == 16000 * 2**16 + 4000
+
+    # All the registers are decoded in a single pass.
+    decode.assert_called_once()
+
+
+async def test_modbus_byte_order_invalid(test_config: dict):
+    with pytest.raises(ValueError, match="Invalid byte or word order"):
+        Modbus({**test_config["modbus"], "wordorder": "middle"})
+
+
+@pytest.mark.parametrize(
+    "decoder,value",
+    [
+        ("int16", -1234),
+        ("uint16", 61234),
+        ("int32", -123456789),
+        ("uint32", 3123456789),
+        ("float32", 12.5),
+        ("float64", -1234.125),
+    ],
+)
+async def test_decoder_registry(modbus: Modbus, decoder: str, value: int | float):
+    codec = get_decoder(decoder)
+    register = ModbusRegister(
+        modbus,
+        name="test_register",
+        address=0,
+        mode="holding_register",
+        decoder=decoder,
+    )
+    assert register.count == codec.count
+
+    encoded = encode_words(numpy.array([value], dtype=codec.dtype), "big", "little")
+    words = encoded.ravel()
+
+    plan = compile_read_plan([register])
+    decoded = plan.decoder.decode({"holding_register": words})
+
+    assert register.decode(words.tolist()) == value
+    assert decoded["test_register"] == value
+
+
+async def test_decoder_unknown(modbus: Modbus):
+    with pytest.raises(ValueError, match="Unknown decoder"):
+        ModbusRegister(modbus, "test", 0, mode="holding_register", decoder="bad")
+
+    with pytest.raises(ValueError, match="requires 2 words"):
+        ModbusRegister(modbus, "test", 0, "holding_register", count=1, decoder="int32")
+
+    with pytest.raises(ValueError, match="holding or input register"):
+        ModbusRegister(modbus, "test", 0, mode="coil", decoder="int16")
+
+
+async def test_register_decoder(modbus: Modbus, mocker: MockerFixture):
+    mocker.patch.dict(DECODERS)
+    register_decoder("int64", "q")
+
+    register = ModbusRegister(modbus, "test", 0, "holding_register", decoder="int64")
+    assert register.count == 4
+    assert register.decode([1, 0, 0, 0]) == 1
+
+
+async def test_decoder_scale(context: ModbusSlaveContext, actor: ECPActor):
+    modbus = actor.plc.modbus
+    context.setValues(3, modbus["oxygen_read_utilities_room"].address, [203])
+
+    registers = await modbus.read_registers(
+        ["oxygen_read_utilities_room", "oxygen_error_code_utilities_room"],
+        use_cache=False,
+    )
+
+    assert registers["oxygen_read_utilities_room"] == 20.3
+    assert registers["oxygen_error_code_utilities_room"] == 0
+
+    await actor.plc.safety.update(use_cache=False)
+    assert actor.plc.safety.o2_level_utilities == 20.3
+
+
+async def test_decoder_bits(context: ModbusSlaveContext, test_config: dict):
+    modbus_config = deepcopy(test_config["modbus"])
+    modbus_config["registers"]["dome_present_fault_record"]["bits"] = {
+        "fault_a": 0,
+        "fault_b": 3,
+    }
+
+    modbus = Modbus(modbus_config)
+    context.setValues(3, modbus["dome_present_fault_record"].address, [0b1001])
+
+    assert modbus["fault_a"].readonly
+    assert modbus.groups["dome"][-2:] == ["fault_a", "fault_b"]
+
+    registers = await modbus.read_registers(["fault_a", "fault_b"], use_cache=False)
+    assert dict(registers) == {"fault_a": True, "fault_b": True}
+
+    snapshot = await modbus.read_all(use_cache=False)
+    assert snapshot["dome_present_fault_record"] == 9
+    assert snapshot["fault_a"] is True
+
+    modbus_config["registers"]["dome_present_fault_record"]["bits"] = {"local": 1}
+    with pytest.raises(ValueError, match="Duplicate register"):
+        Modbus(modbus_config)
+
+
+async def test_decoder_overrides(
+    context: ModbusSlaveContext,
+    modbus: Modbus,
+    mocker: MockerFixture,
+):
+    registers = create_registers(modbus)
+    context.setValues(3, 0, [4000, 16000] * 15)
+
+    mocker.patch.dict(modbus.overrides, {"float_32bit_0": 1.5, "int_32bit_1": 7})
+
+    snapshot = await modbus.scan(compile_read_plan(registers))
+
+    # Overrides replace the decoded value and are not decoded.
+    assert snapshot["float_32bit_0"] == 1.5
+    assert snapshot["int_32bit_1"] == 7
+    assert snapshot["float_32bit_1"] == 0.25
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_diff.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+from copy import deepcopy
+
+from typing import TYPE_CHECKING
+
+from lvmecp.diff import ChangeSet, diff_snapshots
+from lvmecp.modbus import Modbus
+
+
+if TYPE_CHECKING:
+    from pymodbus.datastore import ModbusSlaveContext
+
+
+async def test_diff_no_changes(modbus: Modbus):
+    old = await modbus.read_all(use_cache=False)
+    new = await modbus.read_all(use_cache=False)
+
+    changes = diff_snapshots(old, new)
+
+    assert isinstance(changes, ChangeSet)
+    assert len(changes) == 0
+    assert changes.timestamp == new.timestamp
+
+
+async def test_diff_changes(modbus: Modbus, context: ModbusSlaveContext):
+    old = await modbus.read_all(use_cache=False)
+
+    context.setValues(1, modbus["drive_enabled"].address, [1])
+    context.setValues(1, modbus["door_locked"].address, [0])
+    context.setValues(3, modbus["dome_counter"].address, [42])
+    context.setValues(3, modbus["oxygen_read_utilities_room"].address, [190])
+
+    new = await modbus.read_all(use_cache=False)
+    changes = diff_snapshots(old, new)
+
+    # The changes are in read order.
+    assert set(changes.names) == {
+        "door_locked",
+        "drive_enabled",
+        "dome_counter",
+        "oxygen_read_utilities_room",
+    }
+    assert list(changes.names) == [name for name in new if name in changes.names]
+
+    assert changes.as_dict() == {
+        "door_locked": False,
+        "drive_enabled": True,
+        "dome_counter": 42,
+        "oxygen_read_utilities_room": 19.0,
+    }
+    assert dict(zip(changes.names, changes.old))["door_locked"] is True
+
+
+async def test_diff_bits_of_word(context: ModbusSlaveContext, test_config: dict):
+    modbus_config = deepcopy(test_config["modbus"])
+    modbus_config["registers"]["dome_present_fault_record"]["bits"] = {
+        "fault_a": 0,
+        "fault_b": 3,
+    }
+
+    modbus = Modbus(modbus_config)
+    address = modbus["dome_present_fault_record"].address
+
+    context.setValues(3, address, [0b0001])
+    old = await modbus.read_all(use_cache=False)
+
+    context.setValues(3, address, [0b1001])
+    new = await modbus.read_all(use_cache=False)
+
+    # Only the bit that changed is reported, not the other bit of the word.
+    changes = diff_snapshots(old, new)
+    assert changes.as_dict() == {"dome_present_fault_record": 9, "fault_b": True}
+
+    await modbus.close()
+
+
+async def test_diff_first_and_different_plans(modbus: Modbus):
+    full = await modbus.read_all(use_cache=False)
+
+    changes = diff_snapshots(None, full)
+    assert changes.names == tuple(full)
+    assert set(changes.old) == {None}
+
+    partial = await modbus.scan(modbus.get_plan(["door_locked", "door_closed"]))
+    assert len(diff_snapshots(full, partial)) == 0
+
+
+async def test_diff_overrides(modbus: Modbus):
+    old = await modbus.read_all(use_cache=False)
+
+    modbus.overrides["dome_counter"] = 100
+    new = await modbus.read_all(use_cache=False)
+
+    changes = diff_snapshots(old, new)
+    assert changes.as_dict() == {"dome_counter": 100}
+
+
+def test_change_set_merge():
+    merged = ChangeSet.merge(
+        [
+            ChangeSet(("a",), (1,), (2,), timestamp=10.0),
+            ChangeSet(("b", "c"), (None, 3), (True, 4), timestamp=12.0),
+        ]
+    )
+
+    assert merged.names == ("a", "b", "c")
+    assert merged.as_dict() == {"a": 2, "b": True, "c": 4}
+    assert merged.timestamp == 12.0
+
+    assert len(ChangeSet.merge([])) == 0
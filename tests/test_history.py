@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_history.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+from copy import deepcopy
+
+from typing import TYPE_CHECKING
+
+import numpy
+import pytest
+
+from lvmecp.history import RegisterHistory, downsample
+from lvmecp.modbus import Modbus
+from lvmecp.planner import BIT_MODES
+from lvmecp.snapshot import RegisterSnapshot
+
+
+if TYPE_CHECKING:
+    from pymodbus.datastore import ModbusSlaveContext
+
+    from lvmecp.actor import ECPActor
+
+
+async def test_history(modbus: Modbus, context: ModbusSlaveContext):
+    history = modbus.history
+    assert isinstance(history, RegisterHistory)
+
+    for value in [1, 2, 3]:
+        context.setValues(3, modbus["dome_counter"].address, [value])
+        await modbus.read_all(use_cache=False)
+
+    assert len(history) == 3
+
+    times, values = history.get("dome_counter")
+    assert values.tolist() == [1, 2, 3]
+    assert numpy.all(numpy.diff(times) >= 0)
+
+    _, door_locked = history.get("door_locked")
+    assert door_locked.dtype == numpy.bool_
+    assert door_locked.tolist() == [True] * 3
+
+    _, oxygen = history.get("oxygen_read_utilities_room")
+    assert oxygen.dtype.kind == "f"
+
+    with pytest.raises(KeyError):
+        history.get("bad_register")
+
+
+async def test_history_partial_scans(modbus: Modbus, context: ModbusSlaveContext):
+    history = modbus.history
+    assert history is not None
+
+    await modbus.read_all(use_cache=False)
+
+    context.setValues(1, modbus["drive_enabled"].address, [1])
+    context.setValues(3, modbus["dome_counter"].address, [42])
+    await modbus.scan(modbus.get_plan(["drive_enabled", "door_locked"]))
+
+    assert len(history) == 2
+
+    # Registers not read in the partial scan only have the value of the full scan.
+    _, dome_counter = history.get("dome_counter")
+    assert dome_counter.tolist() == [0]
+
+    _, drive_enabled = history.get("drive_enabled")
+    assert drive_enabled.tolist() == [False, True]
+
+    _, door_locked = history.get("door_locked")
+    assert door_locked.tolist() == [True, True]
+
+    # A full scan after the partial one.
+    snapshot = await modbus.read_all(use_cache=False)
+    for name in ["drive_enabled", "dome_counter", "door_locked"]:
+        assert history.get(name)[1][-1] == snapshot[name]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_history_partial_copy(modbus: Modbus, seed: int):
+    history = RegisterHistory(modbus.plan, 10)
+    rng = numpy.random.default_rng(seed)
+
+    def random_snapshot(plan):
+        images = {}
+        for mode, size in plan.sizes.items():
+            if mode in BIT_MODES:
+                images[mode] = rng.integers(0, 256, (size + 7) // 8, dtype=numpy.uint8)
+            else:
+                images[mode] = rng.integers(0, 2**16, size, dtype=numpy.uint16)
+        return RegisterSnapshot(plan, images, timestamp=1e9)
+
+    full = random_snapshot(modbus.plan)
+    history.append(full)
+
+    # A random subset of registers, whose bits are not aligned with the full image.
+    names = list(modbus)
+    subset = [str(name) for name in rng.choice(names, len(names) // 3, replace=False)]
+
+    partial = random_snapshot(modbus.get_plan(subset))
+    history.append(partial)
+
+    last = history.last
+    assert last is not None
+
+    for name in names:
+        layout = history.layouts[name]
+        value = layout.decode(last[layout.mode][None, :])[0]
+        expected = partial[name] if name in subset else full[name]
+        assert numpy.array_equal(value, expected, equal_nan=True), name
+
+
+async def test_history_ring(test_config: dict, context: ModbusSlaveContext):
+    modbus = Modbus({**test_config["modbus"], "history_size": 4})
+    history = modbus.history
+    assert history is not None
+
+    nbytes = history.nbytes
+
+    for value in range(10):
+        context.setValues(3, modbus["dome_counter"].address, [value])
+        await modbus.read_all(use_cache=False)
+
+    assert len(history) == 4
+    assert history.n_appended == 10
+    assert history.nbytes == nbytes
+    assert history.get("dome_counter")[1].tolist() == [6, 7, 8, 9]
+
+    times, _ = history.get("dome_counter")
+    assert history.span == pytest.approx(times[-1] - times[0])
+
+    times, values = history.get("dome_counter", start=float(times[2]))
+    assert values.tolist() == [8, 9]
+
+    await modbus.close()
+
+
+async def test_history_bits_of_word(test_config: dict, context: ModbusSlaveContext):
+    modbus_config = deepcopy(test_config["modbus"])
+    modbus_config["registers"]["dome_present_fault_record"]["bits"] = {
+        "fault_a": 0,
+        "fault_b": 3,
+    }
+
+    modbus = Modbus(modbus_config)
+    assert modbus.history is not None
+
+    for value in [0b0001, 0b1001]:
+        context.setValues(3, modbus["dome_present_fault_record"].address, [value])
+        await modbus.read_all(use_cache=False)
+
+    assert modbus.history.get("fault_a")[1].tolist() == [True, True]
+    assert modbus.history.get("fault_b")[1].tolist() == [False, True]
+
+    await modbus.close()
+
+
+async def test_history_disabled(test_config: dict):
+    modbus = Modbus({**test_config["modbus"], "history_size": 0})
+    assert modbus.history is None
+
+
+def test_downsample():
+    values = numpy.zeros(1000)
+    values[500] = 10
+    values[700] = -5
+
+    keep = downsample(values, 20)
+    assert len(keep) <= 20
+    assert 500 in keep and 700 in keep
+    assert numpy.all(numpy.diff(keep) > 0)
+
+    # A short transition of a boolean register is kept.
+    bits = numpy.zeros(1000, dtype=numpy.bool_)
+    bits[333] = True
+    assert 333 in downsample(bits, 10)
+
+    assert len(downsample(values[:10], 20)) == 10
+
+
+async def test_command_history(actor: ECPActor):
+    await actor.plc.modbus.read_all(use_cache=False)
+
+    cmd = await actor.invoke_mock_command("history door_locked --points 10")
+    await cmd
+
+    assert cmd.status.did_succeed
+
+    buffers = cmd.replies.get("history_buffers")
+    assert buffers["plc"]["n_scans"] >= 1
+    assert buffers["plc"]["nbytes"] == actor.plc.modbus.history.nbytes
+
+    register_history = cmd.replies.get("register_history")
+    assert register_history["name"] == "door_locked"
+    assert len(register_history["times"]) == len(register_history["values"])
+    assert register_history["values"][-1] is True
+
+
+async def test_command_history_unknown(actor: ECPActor):
+    cmd = await actor.invoke_mock_command("history bad_register")
+    await cmd
+
+    assert cmd.status.did_fail
@@ -9,20 +9,35 @@
 from __future__ import annotations
 
 import asyncio
+import gc
+import math
+from copy import deepcopy
+from time import monotonic
 
 from typing import TYPE_CHECKING, cast
 
+import numpy
 import pytest
 from pytest_mock import MockerFixture
 
 import lvmecp.modbus
-from lvmecp.modbus import ModbusRegister, RegisterModes
+from lvmecp.exceptions import CircuitOpenError, DeadlineExceededError, ECPError
+from lvmecp.modbus import (
+    BreakerState,
+    CircuitBreaker,
+    Modbus,
+    ModbusRegister,
+    RegisterModes,
+    supports_pipelining,
+)
+from lvmecp.priority import Priority
+from lvmecp.snapshot import Quality
 
 
 if TYPE_CHECKING:
     from pymodbus.datastore import ModbusSlaveContext
 
-    from lvmecp.modbus import Modbus
+    from lvmecp.simulator import Simulator
 
 
 async def test_modbus_read(modbus: Modbus):
@@ -151,3 +166,785 @@ async def test_modbus_lock_release(modbus: Modbus, mocker: MockerFixture):
 
         assert not modbus.client.connected
         assert not modbus.lock.locked()
+
+
+async def test_modbus_lease_expired_logs_holder(
+    modbus: Modbus,
+    mocker: MockerFixture,
+):
+    mocker.patch.object(lvmecp.modbus, "CONNECTION_TIMEOUT", 0.1)
+    warning = mocker.patch.object(lvmecp.modbus.log, "warning")
+
+    async with modbus:
+        await asyncio.sleep(0.2)
+
+        assert modbus.watchdog_stats["expired"] == 1
+        assert modbus.lease is None
+
+        warning.assert_called_once()
+        assert "test_modbus_lease_expired_logs_holder" in warning.call_args[0][0]
+
+        # Another task gets the connection. Returning the expired lease when
+        # exiting the context must not release it.
+        await asyncio.create_task(modbus.connect(Priority.INTERACTIVE, timeout=5))
+
+    assert modbus.lock.locked()
+    assert modbus.lease is not None
+
+    await modbus._release()
+    assert not modbus.lock.locked()
+
+
+async def test_modbus_lease_watchdog_no_tasks(modbus: Modbus, mocker: MockerFixture):
+    await modbus.read_register("door_locked", use_cache=False)
+
+    create_task = mocker.spy(asyncio, "create_task")
+    watchdog_task = modbus._watchdog_task
+    wakeups = modbus.watchdog_stats["wakeups"]
+
+    for _ in range(50):
+        await modbus.read_registers(["door_locked"], use_cache=False)
+
+    # No task is created per transaction and the watchdog is not woken up.
+    create_task.assert_not_called()
+    assert modbus._watchdog_task is watchdog_task
+    assert modbus.watchdog_stats["wakeups"] == wakeups
+    assert modbus.lease is None
+
+
+async def test_modbus_connection_persists(modbus: Modbus):
+    for _ in range(3):
+        await modbus.read_register("door_locked", use_cache=False)
+
+    assert modbus.client.connected
+    assert not modbus.lock.locked()
+
+    assert modbus.pool.stats["connects"] == 1
+    assert modbus.pool.stats["reconnects"] == 0
+
+
+async def test_modbus_pool_reconnects(modbus: Modbus):
+    await modbus.read_register("door_locked", use_cache=False)
+
+    # Drop the connection. The next read should reopen it.
+    modbus.client.close()
+    assert not modbus.client.connected
+
+    assert (await modbus.read_register("door_locked", use_cache=False)) == 1
+
+    assert modbus.pool.stats["connects"] == 2
+    assert modbus.pool.stats["reconnects"] == 1
+
+
+async def test_modbus_pool_keepalive(modbus: Modbus):
+    modbus.keepalive_interval = 0.05
+
+    await modbus.read_register("door_locked", use_cache=False)
+
+    await asyncio.sleep(0.12)
+    assert modbus.pool.stats["keepalives"] >= 1
+
+    # The keepalive task is started when the connection is first opened.
+    keepalive_task = modbus._keepalive_task
+    assert keepalive_task is not None
+
+    # The keepalive task should reopen the connection in the background.
+    modbus.client.close()
+    await asyncio.sleep(0.12)
+
+    assert modbus.client.connected
+    assert modbus.pool.stats["reconnects"] == 1
+    assert modbus._keepalive_task is keepalive_task
+
+
+async def test_modbus_keepalive_priority(modbus: Modbus, mocker: MockerFixture):
+    modbus.keepalive_interval = 0.05
+
+    await modbus.read_register("door_locked", use_cache=False)
+
+    # No keepalive is sent while the connection is in use.
+    async with modbus.request(Priority.CONTROL):
+        await asyncio.sleep(0.12)
+        assert modbus.pool.stats["keepalives"] == 0
+
+    # Failed keepalives count against the breaker.
+    mocker.patch.object(
+        modbus.pool.clients[0],
+        "read_coils",
+        side_effect=ConnectionError("Connection reset."),
+    )
+
+    await asyncio.sleep(0.08)
+    assert modbus.pool.stats["keepalives"] == 0
+    assert modbus.breaker.failures >= 1
+
+    # The lock is released after a failed keepalive.
+    modbus.keepalive_interval = 1000
+    await asyncio.sleep(0.1)
+    assert not modbus.lock.locked()
+
+
+async def test_modbus_read_group_partial(modbus: Modbus, mocker: MockerFixture):
+    read_block = mocker.spy(modbus, "_read_block")
+
+    lights = modbus.groups["lights"]
+    registers = await modbus.read_group("lights", use_cache=False)
+
+    assert set(registers) == set(lights)
+
+    plan = modbus.get_plan(lights)
+    assert read_block.call_count == plan.n_requests < modbus.plan.n_requests
+
+    # The plan is cached regardless of the order of the registers.
+    assert modbus.get_plan(lights[::-1]) is plan
+
+
+async def test_modbus_read_group_cache(modbus: Modbus, mocker: MockerFixture):
+    await modbus.read_group("dome", use_cache=False)
+
+    read_block = mocker.spy(modbus, "_read_block")
+    registers = await modbus.read_group("dome")
+
+    assert set(registers) == set(modbus.groups["dome"])
+    read_block.assert_not_called()
+
+
+async def test_modbus_read_group_unknown(modbus: Modbus):
+    assert (await modbus.read_group("bad_group")) == {}
+
+
+async def test_modbus_read_registers_unknown(modbus: Modbus):
+    with pytest.raises(ValueError, match="Unknown registers"):
+        await modbus.read_registers(["door_locked", "bad_register"])
+
+
+async def test_modbus_scan_single_flight(modbus: Modbus, mocker: MockerFixture):
+    execute_plan = mocker.spy(modbus, "execute_plan")
+
+    results = await asyncio.gather(
+        *[modbus.read_all(use_cache=False) for _ in range(5)],
+        modbus.read_group("dome", use_cache=False),
+        modbus.read_register("door_locked", use_cache=False),
+    )
+
+    assert execute_plan.call_count == 1
+    assert modbus.scan_stats == {"scans": 1, "joined": 6}
+
+    assert results[0] == results[4]
+    assert results[5] == {name: results[0][name] for name in modbus.groups["dome"]}
+    assert results[6] == 1
+
+
+async def test_modbus_scan_not_shared_after_write(
+    modbus: Modbus,
+    mocker: MockerFixture,
+):
+    execute_plan = mocker.spy(modbus, "execute_plan")
+
+    scan_task = asyncio.create_task(modbus.read_all(use_cache=False))
+    await asyncio.sleep(0)
+
+    # Simulate a write that completes while the scan is in progress.
+    modbus._invalidate(["door_locked"])
+
+    # Registers that were not written can still join the scan.
+    await modbus.read_register("door_closed", use_cache=False)
+    assert modbus.scan_stats["joined"] == 1
+
+    await modbus.read_register("door_locked", use_cache=False)
+    await scan_task
+
+    assert execute_plan.call_count == 2
+    assert modbus.scan_stats["joined"] == 1
+
+    # The written register is not cached from the scan that started before.
+    assert modbus.cache.snapshots[modbus.cache.slots["door_closed"]] is (
+        modbus.snapshot
+    )
+    assert modbus.get_cached(["door_locked"]).snapshot is not modbus.snapshot
+
+
+async def test_modbus_scan_failure_shared(modbus: Modbus, mocker: MockerFixture):
+    mocker.patch.object(modbus, "_read_block", side_effect=ValueError("bad read"))
+
+    results = await asyncio.gather(
+        modbus.read_all(use_cache=False),
+        modbus.read_group("dome", use_cache=False),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert modbus.scan_stats == {"scans": 1, "joined": 0}
+
+
+async def test_modbus_poll_tier(test_config: dict):
+    test_config["modbus"]["poll_tiers"] = {"fast": 0.2}
+    test_config["modbus"]["registers"]["door_locked"]["max_age"] = 3
+    test_config["modbus"]["registers"]["door_closed"]["poll_tier"] = "slow"
+
+    modbus = Modbus(test_config["modbus"])
+
+    assert modbus["e_status"].max_age == 0.2
+    assert modbus["door_locked"].max_age == 3
+    assert modbus["door_closed"].max_age == 60
+    assert modbus["drive_enabled"].max_age is None
+
+
+async def test_modbus_poll_tier_invalid(test_config: dict):
+    test_config["modbus"]["registers"]["door_locked"]["poll_tier"] = "bad_tier"
+
+    with pytest.raises(ValueError, match="Invalid poll tier"):
+        Modbus(test_config["modbus"])
+
+
+async def test_modbus_cache_max_age(
+    simulator: Simulator,
+    test_config: dict,
+    mocker: MockerFixture,
+):
+    test_config["modbus"]["registers"]["door_locked"]["max_age"] = 10
+    modbus = Modbus(test_config["modbus"])
+
+    mocker.patch.object(modbus, "cache_timeout", 0)
+
+    await modbus.read_registers(["door_locked", "door_closed"], use_cache=False)
+
+    # The max age of the register is used instead of the cache timeout, but only
+    # if all the requested registers have one.
+    assert modbus.get_cached(["door_locked"]) is not None
+    assert modbus.get_cached(["door_locked", "door_closed"]) is None
+
+    assert modbus.get_age("door_locked") < 10
+    assert modbus.get_age("dome_open") == float("inf")
+
+    await modbus.close()
+
+
+async def test_modbus_pipelined_scan(slow_modbus: Modbus, mocker: MockerFixture):
+    modbus = slow_modbus
+    n_requests = modbus.plan.n_requests
+
+    await modbus.read_register("e_stop", use_cache=False)
+
+    start = monotonic()
+    sequential = await modbus.read_all(use_cache=False)
+    sequential_time = monotonic() - start
+
+    mocker.patch.object(modbus, "pipeline_window", n_requests)
+    read_block = mocker.spy(modbus, "_read_block")
+
+    start = monotonic()
+    pipelined = await modbus.read_all(use_cache=False)
+    pipelined_time = monotonic() - start
+
+    read_block.assert_not_called()
+    assert dict(pipelined) == dict(sequential)
+
+    # All the requests share the round-trip time.
+    assert n_requests > 4
+    assert pipelined_time < 3 * sequential_time / n_requests
+
+
+async def test_modbus_pipelined_timeout(slow_modbus: Modbus, mocker: MockerFixture):
+    modbus = slow_modbus
+
+    await modbus.read_register("e_stop", use_cache=False)
+
+    # The responses take longer than the request timeout.
+    mocker.patch.object(lvmecp.modbus, "REQUEST_TIMEOUT", 0.001)
+
+    async with modbus.request() as client:
+        with pytest.raises(ConnectionError):
+            await modbus._read_pipelined(modbus.plan.blocks[:2])
+
+        # The connection is closed so that late responses are not mismatched.
+        assert not client.connected
+
+
+async def test_modbus_pipelined_window(modbus: Modbus, mocker: MockerFixture):
+    mocker.patch.object(modbus, "pipeline_window", 3)
+    read_pipelined = mocker.spy(modbus, "_read_pipelined")
+
+    snapshot = await modbus.read_all(use_cache=False)
+
+    n_batches = math.ceil(modbus.plan.n_requests / 3)
+    assert read_pipelined.call_count in (n_batches, n_batches - 1)
+    assert all(len(call.args[0]) <= 3 for call in read_pipelined.call_args_list)
+    assert snapshot["door_locked"] is True
+
+
+async def test_modbus_pipelined_supported(modbus: Modbus):
+    async with modbus.request() as client:
+        assert supports_pipelining(client)
+
+
+async def test_modbus_pipelined_fallback(modbus: Modbus, mocker: MockerFixture):
+    sequential = await modbus.read_all(use_cache=False)
+
+    # A version of pymodbus without one of the internals used for pipelining.
+    internals = (*lvmecp.modbus.PIPELINE_INTERNALS, "transaction.getNextTIDs")
+    mocker.patch.object(lvmecp.modbus, "PIPELINE_INTERNALS", internals)
+    mocker.patch.object(modbus, "pipeline_window", 3)
+    read_block = mocker.spy(modbus, "_read_block")
+
+    # The blocks are read one by one.
+    snapshot = await modbus.read_all(use_cache=False)
+
+    assert read_block.call_count == modbus.plan.n_requests
+    assert dict(snapshot) == dict(sequential)
+
+
+async def test_modbus_pipeline_window_invalid(test_config: dict):
+    test_config["modbus"]["pipeline_window"] = -1
+
+    with pytest.raises(ValueError, match="pipeline_window"):
+        Modbus(test_config["modbus"])
+
+
+async def test_modbus_write_many(
+    modbus: Modbus,
+    context: ModbusSlaveContext,
+    mocker: MockerFixture,
+):
+    client = modbus.pool.clients[0]
+    write_coils = mocker.spy(client, "write_coils")
+    write_coil = mocker.spy(client, "write_coil")
+
+    snapshot = await modbus.read_all(use_cache=False)
+    generation = modbus.cache.generation
+
+    blocks = await modbus.write_many(
+        {
+            "bypass_hardware_remote": True,
+            "bypass_software_remote": True,
+            "drive_mode_overcurrent": True,
+        }
+    )
+
+    # The adjacent bypass coils are written with a single FC15 request.
+    assert sorted(block.function_code for block in blocks) == [5, 15]
+    write_coils.assert_called_once()
+    write_coil.assert_called_once()
+
+    for name in ["bypass_hardware_remote", "drive_mode_overcurrent"]:
+        assert context.getValues(1, modbus[name].address)[0] == 1
+
+    # The cache is invalidated once for the whole batch, only for the registers
+    # that were written.
+    assert modbus.cache.generation == generation + 1
+    assert modbus.get_cached(["drive_mode_overcurrent"]) is None
+    assert modbus.get_cached(["door_locked"]) is not None
+    assert (await modbus.read_all()) is not snapshot
+
+
+async def test_modbus_write_many_retry(
+    modbus: Modbus,
+    context: ModbusSlaveContext,
+    mocker: MockerFixture,
+):
+    client = modbus.pool.clients[0]
+    write_coil = client.write_coil
+
+    n_calls = 0
+
+    async def _write_coil(address: int, value: bool, slave: int = 0):
+        nonlocal n_calls
+        n_calls += 1
+
+        # The second block fails once.
+        if n_calls == 2:
+            raise ConnectionError("Connection reset.")
+
+        return await write_coil(address, value, slave=slave)
+
+    mock = mocker.patch.object(client, "write_coil", side_effect=_write_coil)
+
+    # Two registers that are not adjacent, written with FC5.
+    blocks = await modbus.write_many(
+        {"drive_mode_overcurrent": True, "bypass_hardware_remote": True}
+    )
+    assert [block.function_code for block in blocks] == [5, 5]
+
+    # The first block is not written again when the second one is retried.
+    addresses = [call.args[0] for call in mock.call_args_list]
+    assert addresses == [blocks[0].address, blocks[1].address, blocks[1].address]
+
+    for name in ["drive_mode_overcurrent", "bypass_hardware_remote"]:
+        assert context.getValues(1, modbus[name].address)[0] == 1
+
+
+def test_modbus_compile_writes_sequence(modbus: Modbus):
+    for value in [(True,), [True], True, numpy.array([True])]:
+        (block,) = modbus._compile_writes({"drive_mode_overcurrent": value})
+        assert list(block.values) == [True]
+
+
+async def test_modbus_write_many_readonly(modbus: Modbus, mocker: MockerFixture):
+    write_blocks = mocker.spy(modbus, "_write_blocks")
+
+    with pytest.raises(ECPError, match="read-only"):
+        await modbus.write_many({"drive_enabled": True, "door_locked": False})
+
+    with pytest.raises(ValueError, match="not found"):
+        await modbus.write_many({"bad_register": True})
+
+    write_blocks.assert_not_called()
+
+
+async def test_modbus_session(context: ModbusSlaveContext, modbus: Modbus):
+    async with modbus.session() as session:
+        await session.write("motor_direction", True)
+        registers = await session.verify({"motor_direction": True})
+
+        # Other requests wait until the session ends.
+        read = asyncio.create_task(modbus.read_register("door_locked", use_cache=False))
+        await session.sleep(0.05)
+        assert not read.done()
+
+    assert registers["motor_direction"] is True
+    assert context.getValues(1, modbus["motor_direction"].address)[0] == 1
+
+    assert await read == 1
+    assert not modbus.lock.locked()
+
+
+async def test_modbus_session_caller_error(modbus: Modbus):
+    # Errors in the code of the caller do not count against the breaker.
+    with pytest.raises(FileNotFoundError):
+        async with modbus.session() as session:
+            await session.read(["door_locked"])
+            raise FileNotFoundError("No such file.")
+
+    assert modbus.breaker.failures == 0
+    assert modbus.breaker.last_error is None
+
+
+async def test_modbus_session_verify_fails(modbus: Modbus):
+    async with modbus.session() as session:
+        with pytest.raises(ECPError, match="verification failed"):
+            await session.verify({"motor_direction": True}, timeout=0.1, interval=0.05)
+
+    assert not modbus.lock.locked()
+
+
+async def test_modbus_session_deadline(modbus: Modbus):
+    start = monotonic()
+
+    with pytest.raises(ECPError, match="deadline"):
+        async with modbus.session(timeout=0.1) as session:
+            await session.sleep(1)
+
+    assert monotonic() - start < 0.5
+    assert not modbus.lock.locked()
+
+    # The connection can be used after the session expired.
+    assert await modbus.read_register("door_locked", use_cache=False) == 1
+
+
+async def test_modbus_read_stale_while_revalidate(
+    modbus: Modbus,
+    mocker: MockerFixture,
+):
+    names = ["door_locked", "door_closed"]
+
+    view = await modbus.read_registers(names, use_cache=False)
+    assert view.quality is Quality.GOOD
+
+    # Expire the cached values.
+    mocker.patch.object(modbus, "cache_timeout", 0)
+    scan = mocker.spy(modbus, "scan")
+
+    stale = await modbus.read_registers(names, max_age=10)
+    assert stale.snapshot is view.snapshot
+    assert stale.quality is Quality.STALE
+
+    # The registers are refreshed once in the background.
+    assert await modbus.read_register("door_locked", max_age=10) is True
+    assert modbus._revalidate_task is not None
+    await modbus._revalidate_task
+
+    assert scan.call_count == 1
+    assert modbus.get_age("door_locked") < view.age
+
+    # Callers without a max_age wait for a new read.
+    fresh = await modbus.read_registers(names)
+    assert fresh.quality is Quality.GOOD
+    assert scan.call_count == 2
+
+
+async def test_modbus_read_all_stale(modbus: Modbus, mocker: MockerFixture):
+    snapshot = await modbus.read_all(use_cache=False)
+
+    mocker.patch.object(modbus, "cache_timeout", 0)
+
+    assert await modbus.read_all(max_age=10) is snapshot
+    assert modbus._revalidate_task is not None
+    await modbus._revalidate_task
+
+    assert modbus.snapshot is not snapshot
+
+
+async def test_modbus_read_stale_after_write(modbus: Modbus, mocker: MockerFixture):
+    snapshot = await modbus.read_all(use_cache=False)
+    await modbus.write_register("drive_enabled", True)
+
+    execute_plan = mocker.spy(modbus, "execute_plan")
+
+    # Callers that accept stale values get the values read before the write.
+    assert await modbus.read_all(max_age=10) is snapshot
+    view = await modbus.read_registers(["drive_enabled"], max_age=10)
+    assert view.quality is Quality.STALE and view["drive_enabled"] is False
+
+    assert modbus._revalidate_task is not None
+    await modbus._revalidate_task
+    assert execute_plan.call_count == 1
+
+    assert modbus.snapshot is not snapshot
+    assert (await modbus.read_registers(["drive_enabled"], max_age=10)).quality is (
+        Quality.GOOD
+    )
+
+
+async def test_modbus_write_invalidates_bits(test_config: dict):
+    modbus_config = deepcopy(test_config["modbus"])
+    modbus_config["registers"]["dome_counter"]["bits"] = {"counter_bit": 0}
+
+    modbus = Modbus(modbus_config)
+    address = modbus["dome_counter"].address
+
+    assert modbus._get_written("holding_register", address, 1) == [
+        "dome_counter",
+        "counter_bit",
+    ]
+    assert "dome_counter" not in modbus._get_written("coil", address, 1)
+
+
+async def test_modbus_get_quality(modbus: Modbus, mocker: MockerFixture):
+    snapshot = await modbus.read_all(use_cache=False)
+    assert set(modbus.get_quality(snapshot).values()) == {Quality.GOOD}
+
+    # Only the registers without a poll tier expire with the cache timeout.
+    mocker.patch.object(modbus, "cache_timeout", 0)
+
+    quality = modbus.get_quality(snapshot)
+    assert quality["door_locked"] is Quality.STALE
+    assert quality["local"] is Quality.GOOD
+
+    # A write only makes the written registers stale.
+    mocker.patch.object(modbus, "cache_timeout", 10)
+    await modbus["e_stop"].write(False)
+
+    quality = modbus.get_quality(snapshot)
+    assert quality["e_stop"] is Quality.STALE
+    assert quality["door_locked"] is Quality.GOOD
+
+
+async def test_modbus_read_stale_too_old(modbus: Modbus, mocker: MockerFixture):
+    view = await modbus.read_registers(["door_locked"], use_cache=False)
+
+    mocker.patch.object(modbus, "cache_timeout", 0)
+
+    new_view = await modbus.read_registers(["door_locked"], max_age=0)
+    assert new_view.snapshot is not view.snapshot
+    assert modbus._revalidate_task is None
+
+
+async def test_modbus_revalidate_fails(modbus: Modbus, mocker: MockerFixture):
+    mocker.patch.object(modbus, "scan", side_effect=ConnectionError("No connection"))
+    warning = mocker.patch.object(lvmecp.modbus.log, "warning")
+
+    task = modbus.revalidate(["door_locked"])
+    assert modbus.revalidate(["door_closed"]) is task
+
+    await task
+
+    # Both requests are merged into a single refresh.
+    assert modbus.scan.call_count == 1  # type: ignore
+    warning.assert_called_once()
+
+
+async def test_circuit_breaker():
+    breaker = CircuitBreaker("test", threshold=2, reset_timeout=0.05)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            with breaker.guard():
+                raise ConnectionError("No connection")
+
+    assert breaker.state == BreakerState.OPEN
+    assert breaker.failures == 2
+
+    with pytest.raises(CircuitOpenError, match="No connection"):
+        with breaker.guard():
+            pass
+
+    await asyncio.sleep(0.06)
+    assert breaker.state == BreakerState.HALF_OPEN
+
+    # Only one probe is allowed while half-open.
+    with breaker.guard():
+        with pytest.raises(CircuitOpenError):
+            with breaker.guard():
+                pass
+
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.failures == 0
+    assert breaker.stats == {"opened": 1, "rejected": 2, "probes": 1}
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            with breaker.guard():
+                raise ConnectionError("No connection")
+
+    # Forced transactions are not rejected, and their failures are recorded.
+    with pytest.raises(ConnectionError):
+        with breaker.guard(force=True):
+            raise ConnectionError("No connection")
+
+    assert breaker.state == BreakerState.OPEN
+    assert breaker.failures == 3
+
+
+async def test_circuit_breaker_probe_fails():
+    breaker = CircuitBreaker("test", threshold=1, reset_timeout=0.05)
+
+    with pytest.raises(TimeoutError):
+        with breaker.guard():
+            raise TimeoutError()
+
+    await asyncio.sleep(0.06)
+
+    # A failed probe opens the breaker again.
+    with pytest.raises(ConnectionError):
+        with breaker.guard():
+            raise ConnectionError()
+
+    assert breaker.state == BreakerState.OPEN
+
+    await asyncio.sleep(0.06)
+
+    # Exception responses mean that the server is alive.
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError("Invalid response")
+
+    assert breaker.state == BreakerState.CLOSED
+
+
+async def test_circuit_breaker_probe_cancelled():
+    breaker = CircuitBreaker("test", threshold=1, reset_timeout=0)
+
+    with pytest.raises(ConnectionError):
+        with breaker.guard():
+            raise ConnectionError()
+
+    # A cancelled probe does not close the breaker but allows a new probe.
+    with pytest.raises(asyncio.CancelledError):
+        with breaker.guard():
+            raise asyncio.CancelledError()
+
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert breaker.allow() is True
+
+
+async def test_modbus_breaker_fails_fast(modbus: Modbus, mocker: MockerFixture):
+    modbus.breaker.threshold = 2
+    modbus.breaker.reset_timeout = 0.1
+
+    acquire = mocker.patch.object(
+        modbus.pool,
+        "acquire",
+        side_effect=ConnectionError("No connection"),
+    )
+
+    # A full collection during the timed section would take longer than the
+    # reset timeout once the test session has allocated many objects.
+    gc.collect()
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await modbus.read_registers(["door_locked"], use_cache=False)
+
+    assert modbus.breaker.state == BreakerState.OPEN
+
+    # The retries stop as soon as the breaker is open.
+    start = monotonic()
+    with pytest.raises(CircuitOpenError):
+        await modbus.read_register("door_locked", use_cache=False)
+    with pytest.raises(CircuitOpenError):
+        await modbus.write_register("drive_enabled", True)
+
+    assert monotonic() - start < 0.05
+    assert acquire.call_count == 2
+    assert not modbus.lock.locked()
+
+    # After the reset timeout, a successful probe closes the breaker.
+    mocker.stop(acquire)
+    await asyncio.sleep(0.1)
+
+    assert await modbus.read_register("door_locked", use_cache=False) == 1
+    assert modbus.breaker.state == BreakerState.CLOSED
+
+
+async def test_modbus_breaker_emergency(
+    modbus: Modbus,
+    context: ModbusSlaveContext,
+    mocker: MockerFixture,
+):
+    modbus.breaker.threshold = 1
+    modbus.breaker.reset_timeout = 100
+
+    acquire = mocker.patch.object(
+        modbus.pool,
+        "acquire",
+        side_effect=ConnectionError("No connection"),
+    )
+
+    with pytest.raises(ConnectionError):
+        await modbus.read_registers(["door_locked"], use_cache=False)
+
+    assert modbus.breaker.state == BreakerState.OPEN
+    mocker.stop(acquire)
+
+    with pytest.raises(CircuitOpenError):
+        await modbus.write_register("e_stop", True)
+
+    # Emergency writes are always sent, and a success closes the breaker.
+    await modbus["e_stop"].write(True, priority=Priority.EMERGENCY)
+
+    assert context.getValues(1, modbus["e_stop"].address, 1) == [True]
+    assert modbus.breaker.state == BreakerState.CLOSED
+
+
+async def test_modbus_deadline_includes_lock(modbus: Modbus):
+    async with modbus:
+        start = monotonic()
+
+        with pytest.raises(DeadlineExceededError):
+            await modbus.read_registers(["door_locked"], use_cache=False, timeout=0.1)
+
+        assert monotonic() - start < 0.2
+
+    # A deadline does not count as a failure of the server.
+    assert modbus.breaker.failures == 0
+    assert not modbus.lock.locked()
+
+
+async def test_modbus_deadline_includes_retries(
+    modbus: Modbus,
+    mocker: MockerFixture,
+):
+    mocker.patch.object(
+        modbus.pool,
+        "acquire",
+        side_effect=ConnectionError("No connection"),
+    )
+
+    start = monotonic()
+
+    # The first retry is after 0.5 seconds.
+    with pytest.raises(DeadlineExceededError):
+        await modbus.write_register("drive_enabled", True, timeout=0.2)
+
+    assert monotonic() - start < 0.4
+    assert modbus.breaker.failures == 1
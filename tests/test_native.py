@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_native.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import asyncio
+
+from typing import TYPE_CHECKING
+
+import numpy
+import pytest
+
+from lvmecp.modbus import Modbus, NativeModbusClient
+
+
+if TYPE_CHECKING:
+    from conftest import LatencyProxy
+    from pymodbus.datastore import ModbusSlaveContext
+
+
+async def test_native_client(native_modbus: Modbus):
+    assert isinstance(native_modbus.pool.clients[0], NativeModbusClient)
+
+    assert await native_modbus.read_register("door_locked", use_cache=False) is True
+    assert await native_modbus.read_register("oxygen_read_utilities_room") == 20.0
+
+
+async def test_native_scan_matches_pymodbus(modbus: Modbus, native_modbus: Modbus):
+    snapshot = await modbus.read_all(use_cache=False)
+    native_snapshot = await native_modbus.read_all(use_cache=False)
+
+    assert native_snapshot.images.keys() == snapshot.images.keys()
+    for mode, image in snapshot.images.items():
+        numpy.testing.assert_array_equal(native_snapshot.images[mode], image)
+
+    assert dict(native_snapshot) == dict(snapshot)
+
+
+@pytest.mark.parametrize("pipeline_window", [1, 5])
+async def test_native_pipelined(native_modbus: Modbus, pipeline_window: int):
+    native_modbus.pipeline_window = pipeline_window
+
+    snapshot = await native_modbus.read_all(use_cache=False)
+
+    assert snapshot["door_locked"] is True
+    assert not native_modbus.lock.locked()
+
+
+async def test_native_write(context: ModbusSlaveContext, native_modbus: Modbus):
+    await native_modbus.write_register("motor_direction", True)
+    assert context.getValues(1, native_modbus["motor_direction"].address)[0] == 1
+
+    blocks = await native_modbus.write_many(
+        {"bypass_hardware_remote": True, "bypass_software_remote": True}
+    )
+    assert [block.function_code for block in blocks] == [15]
+    assert context.getValues(1, native_modbus["bypass_hardware_remote"].address, 2) == [
+        True,
+        True,
+    ]
+
+    client = NativeModbusClient("127.0.0.1", 5020)
+    await client.connect()
+
+    resp = await client.write_register(500, 1234)
+    assert not resp.isError()
+
+    resp = await client.write_registers(501, [1, 65535])
+    assert resp.function_code == 16
+
+    resp = await client.read_holding_registers(500, count=3)
+    assert resp.registers is not None
+    assert resp.registers.tolist() == [1234, 1, 65535]
+
+    client.close()
+
+
+async def test_native_exception_response(native_modbus: Modbus):
+    client = NativeModbusClient("127.0.0.1", 5020)
+    await client.connect()
+
+    resp = await client.read_coils(5000, count=10)
+
+    assert resp.isError()
+    assert resp.function_code == 0x81
+
+    client.close()
+
+
+async def test_native_connection_lost(native_modbus: Modbus):
+    client = NativeModbusClient("127.0.0.1", 5020, timeout=0.5)
+    await client.connect()
+    assert client.connected
+
+    # Do not send the request so that the response never arrives.
+    future = asyncio.get_running_loop().create_future()
+    client._pending[1] = future
+
+    client.close()
+
+    assert not client.connected
+    with pytest.raises(ConnectionError):
+        await future
+
+    with pytest.raises(ConnectionError, match="not connected"):
+        await client.read_coils(0)
+
+
+async def test_native_timeout(latency_proxy: LatencyProxy):
+    client = NativeModbusClient("127.0.0.1", latency_proxy.port, timeout=0.005)
+    await client.connect()
+
+    with pytest.raises(ConnectionError, match="Timed out"):
+        await client.read_coils(0, count=1)
+
+    # The late response is discarded and does not answer the next request.
+    client.timeout = 1
+    resp = await client.read_holding_registers(599, count=1)
+    assert resp.registers is not None and resp.registers.tolist() == [200]
+
+    assert client._pending == {}
+
+    client.close()
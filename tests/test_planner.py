@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_planner.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from lvmecp.modbus import ModbusRegister
+from lvmecp.planner import compile_read_plan, compile_writes
+
+
+if TYPE_CHECKING:
+    from pymodbus.datastore import ModbusSlaveContext
+
+    from lvmecp.modbus import Modbus
+
+
+def _make_registers(modbus: Modbus, addresses: list[int], mode: str = "coil"):
+    return [
+        ModbusRegister(modbus, f"reg_{address}", address, mode=mode)  # type: ignore
+        for address in addresses
+    ]
+
+
+async def test_plan_coalesces(modbus: Modbus):
+    registers = _make_registers(modbus, [5, 0, 1, 2, 10])
+
+    plan = compile_read_plan(registers, gap_tolerance=1)
+
+    assert plan.n_requests == 1
+    assert plan.blocks[0].address == 0
+    assert plan.blocks[0].count == 11
+    assert plan.names == {reg.name for reg in registers}
+
+
+async def test_plan_gap_tolerance(modbus: Modbus):
+    registers = _make_registers(modbus, [0, 10, 20], mode="holding_register")
+
+    plan = compile_read_plan(registers, gap_tolerance=0)
+    assert plan.n_requests == 3
+    assert all(block.count == 1 for block in plan.blocks)
+
+    plan = compile_read_plan(registers, gap_tolerance=20)
+    assert plan.n_requests == 1
+    assert plan.blocks[0].count == 21
+
+
+async def test_plan_max_pdu_size(modbus: Modbus):
+    registers = _make_registers(modbus, [0, 50, 99, 100], mode="holding_register")
+
+    # A PDU of 202 bytes allows reading 100 registers at once.
+    plan = compile_read_plan(registers, max_pdu_size=202, gap_tolerance=200)
+
+    assert plan.n_requests == 2
+    assert (plan.blocks[0].address, plan.blocks[0].count) == (0, 100)
+    assert (plan.blocks[1].address, plan.blocks[1].count) == (100, 1)
+
+
+async def test_plan_register_too_large(modbus: Modbus):
+    register = ModbusRegister(modbus, "big", 0, mode="holding_register", count=200)
+
+    with pytest.raises(ValueError):
+        compile_read_plan([register])
+
+
+async def test_plan_modes(modbus: Modbus):
+    registers = _make_registers(modbus, [0], mode="coil")
+    registers += _make_registers(modbus, [1], mode="discrete_input")
+    registers += _make_registers(modbus, [2], mode="holding_register")
+    registers += _make_registers(modbus, [3], mode="input_register")
+
+    plan = compile_read_plan(registers)
+
+    assert sorted(block.function_code for block in plan.blocks) == [1, 2, 3, 4]
+
+
+async def test_plan_wire_bytes(modbus: Modbus):
+    plan = compile_read_plan(_make_registers(modbus, list(range(16))))
+    assert plan.wire_bytes == 12 + 9 + 2
+
+    plan = compile_read_plan(_make_registers(modbus, [0, 1], "holding_register"))
+    assert plan.wire_bytes == 12 + 9 + 4
+
+
+async def test_plan_fewer_requests_than_fixed(modbus: Modbus):
+    # The old fixed scan used one coil read and eight holding register reads.
+    assert modbus.plan.n_requests < 9
+    assert modbus.plan.names == set(modbus)
+
+
+async def test_read_all_matches_single_reads(
+    context: ModbusSlaveContext,
+    modbus: Modbus,
+):
+    context.setValues(1, modbus["dome_open"].address, [1])
+    context.setValues(3, modbus["dome_position"].address, [1234])
+
+    registers = await modbus.read_all(use_cache=False)
+
+    assert set(registers) == set(modbus)
+    for name in ["dome_open", "dome_position", "door_locked", "rain_sensor_count"]:
+        assert registers[name] == await modbus[name].read(use_cache=False)
+
+
+async def test_compile_writes(modbus: Modbus):
+    coils = _make_registers(modbus, [3, 1, 2, 5])
+    words = _make_registers(modbus, [10, 11], mode="holding_register")
+
+    blocks = compile_writes(
+        [(reg, [True]) for reg in coils] + [(reg, [reg.address]) for reg in words]
+    )
+
+    summary = [(b.function_code, b.address, b.values, b.names) for b in blocks]
+    assert summary == [
+        (15, 1, (True, True, True), ("reg_1", "reg_2", "reg_3")),
+        (5, 5, (True,), ("reg_5",)),
+        (16, 10, (10, 11), ("reg_10", "reg_11")),
+    ]
+
+
+async def test_compile_writes_read_only(modbus: Modbus):
+    registers = _make_registers(modbus, [0], mode="discrete_input")
+
+    with pytest.raises(ValueError, match="read-only"):
+        compile_writes([(registers[0], [True])])
+
+
+async def test_compile_writes_overlap(modbus: Modbus):
+    registers = _make_registers(modbus, [0, 0])
+
+    with pytest.raises(ValueError, match="overlaps"):
+        compile_writes([(reg, [True]) for reg in registers])
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_priority.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import asyncio
+from time import monotonic
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from lvmecp.priority import Priority, PriorityLock
+
+
+if TYPE_CHECKING:
+    from pymodbus.datastore import ModbusSlaveContext
+    from pytest_mock import MockerFixture
+
+    from lvmecp.modbus import Modbus
+
+
+async def test_priority_lock_order():
+    lock = PriorityLock()
+    order: list[str] = []
+
+    async def request(name: str, priority: Priority):
+        await lock.acquire(priority)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        lock.release()
+
+    await lock.acquire(Priority.BACKGROUND)
+
+    tasks = [
+        asyncio.create_task(request("background", Priority.BACKGROUND)),
+        asyncio.create_task(request("interactive1", Priority.INTERACTIVE)),
+        asyncio.create_task(request("emergency", Priority.EMERGENCY)),
+        asyncio.create_task(request("interactive2", Priority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+
+    assert lock.waiting() == 4
+
+    lock.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["emergency", "interactive1", "interactive2", "background"]
+    assert not lock.locked()
+    assert lock.holder is None
+
+
+async def test_priority_lock_cancelled_waiter():
+    lock = PriorityLock()
+    await lock.acquire()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(lock.acquire(Priority.EMERGENCY), 0.01)
+
+    assert lock.waiting() == 0
+
+    lock.release()
+    assert not lock.locked()
+
+
+async def test_priority_lock_release_unlocked():
+    with pytest.raises(RuntimeError):
+        PriorityLock().release()
+
+
+async def test_modbus_scan_interleaves(modbus: Modbus, mocker: MockerFixture):
+    assert modbus.plan.n_requests > 1
+
+    order: list[str] = []
+
+    read_block = modbus._read_block
+    write_coil = modbus.pool.clients[0].write_coil
+
+    async def _read_block(*args, **kwargs):
+        order.append("read")
+        return await read_block(*args, **kwargs)
+
+    async def _write_coil(*args, **kwargs):
+        order.append("write")
+        return await write_coil(*args, **kwargs)
+
+    mocker.patch.object(modbus, "_read_block", side_effect=_read_block)
+    mocker.patch.object(modbus.pool.clients[0], "write_coil", side_effect=_write_coil)
+
+    scan = asyncio.create_task(modbus.read_all(use_cache=False))
+    await asyncio.sleep(0)
+
+    await modbus["e_stop"].write(True, priority=Priority.EMERGENCY)
+    await scan
+
+    # The write does not wait for the whole scan.
+    assert order.index("write") < len(order) - 1
+
+
+async def test_modbus_emergency_under_load(
+    slow_modbus: Modbus,
+    context: ModbusSlaveContext,
+):
+    modbus = slow_modbus
+    plan = modbus.plan
+
+    # Measure the round-trip of a single request through the proxy.
+    await modbus.read_register("e_stop", use_cache=False)
+    start = monotonic()
+    await modbus.read_register("e_stop", use_cache=False)
+    rtt = monotonic() - start
+
+    async def poll():
+        while True:
+            await modbus.execute_plan(plan, priority=Priority.BACKGROUND)
+
+    # Keep the connection busy with several independent full scans.
+    load = [asyncio.create_task(poll()) for _ in range(3)]
+    await asyncio.sleep(5 * rtt)
+
+    assert modbus.lock.waiting() >= 1
+
+    start = monotonic()
+    await modbus["e_stop"].write(True, priority=Priority.EMERGENCY)
+    elapsed = monotonic() - start
+
+    for task in load:
+        task.cancel()
+    await asyncio.gather(*load, return_exceptions=True)
+
+    # The simulator sets the e-stop status when e_stop is written.
+    await asyncio.sleep(0.05)
+    assert context.getValues(1, modbus["e_status"].address)[0] == 1
+
+    # The write waits at most for the request in flight, and then takes its own
+    # round-trip, instead of waiting for a full scan.
+    assert elapsed < 2.5 * rtt
+    assert elapsed < plan.n_requests * rtt
+
+
+async def test_modbus_session_emergency(modbus: Modbus, context: ModbusSlaveContext):
+    order: list[str] = []
+
+    async def scan():
+        await modbus.read_all(use_cache=False, priority=Priority.BACKGROUND)
+        order.append("scan")
+
+    async def emergency():
+        await modbus["e_stop"].write(True, priority=Priority.EMERGENCY)
+        order.append("emergency")
+
+    async with modbus.session() as session:
+        await session.write("motor_direction", True)
+
+        tasks = [asyncio.create_task(scan()), asyncio.create_task(emergency())]
+        await session.sleep(0.1)
+
+        # The emergency write was sent during the session, but not the scan.
+        assert order == ["emergency"]
+
+        await session.verify({"motor_direction": True})
+        order.append("session")
+
+    await asyncio.gather(*tasks)
+
+    assert order == ["emergency", "session", "scan"]
+    assert context.getValues(1, modbus["e_status"].address)[0] == 1
+
+
+async def test_modbus_session_yield_priority(modbus: Modbus):
+    order: list[str] = []
+
+    async def request(name: str, priority: Priority):
+        async with modbus.request(priority):
+            order.append(name)
+
+    async with modbus.session(Priority.CONTROL) as session:
+        tasks = [
+            asyncio.create_task(request("control", Priority.CONTROL)),
+            asyncio.create_task(request("emergency", Priority.EMERGENCY)),
+        ]
+        await asyncio.sleep(0.01)
+
+        # The session yields to the emergency request and then waits behind the
+        # control request queued before it.
+        await session.read(["door_locked"])
+        order.append("session")
+
+    await asyncio.gather(*tasks)
+
+    assert order == ["emergency", "control", "session"]
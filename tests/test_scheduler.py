@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_scheduler.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import asyncio
+
+from typing import TYPE_CHECKING
+
+import pytest
+from pytest_mock import MockerFixture
+
+from lvmecp.maskbits import DomeStatus
+from lvmecp.scheduler import ScanScheduler
+
+
+if TYPE_CHECKING:
+    from lvmecp.actor import ECPActor
+    from lvmecp.modbus import Modbus
+    from lvmecp.snapshot import SnapshotView
+
+
+@pytest.fixture()
+async def scheduler(modbus: Modbus):
+    # Do not poll the registers with a poll tier.
+    for register in modbus.values():
+        register.max_age = None
+
+    _scheduler = ScanScheduler(modbus, tick=0.05)
+
+    yield _scheduler
+
+    await _scheduler.stop()
+
+
+async def test_scheduler_subscribe(scheduler: ScanScheduler):
+    received: list[SnapshotView | None] = []
+
+    scheduler.subscribe("test", ["door_locked", "drive_enabled"], 1, received.append)
+    await asyncio.sleep(0.02)
+
+    assert len(received) == 1
+    assert received[0] is not None
+    assert dict(received[0]) == {"door_locked": True, "drive_enabled": False}
+
+
+async def test_scheduler_shares_scans(scheduler: ScanScheduler, modbus: Modbus):
+    received: dict[str, list[SnapshotView | None]] = {"dome": [], "lights": []}
+
+    scheduler.subscribe("dome", modbus.groups["dome"], 0.05, received["dome"].append)
+    scheduler.subscribe(
+        "lights",
+        modbus.groups["lights"],
+        0.1,
+        received["lights"].append,
+    )
+
+    await asyncio.sleep(0.22)
+
+    assert len(received["dome"]) >= 3
+    assert len(received["lights"]) >= 2
+
+    # Each scan serves all the subscribers that are due, so the number of scans
+    # is bound by the number of ticks.
+    assert scheduler.stats["scans"] <= 5
+    assert scheduler.stats["deliveries"] > scheduler.stats["scans"]
+
+    # Registers delivered in the same tick come from the same snapshot.
+    assert received["dome"][0] is not None and received["lights"][0] is not None
+    assert received["dome"][0].snapshot is received["lights"][0].snapshot
+
+
+async def test_scheduler_unknown_registers(scheduler: ScanScheduler):
+    with pytest.raises(ValueError, match="Unknown registers"):
+        scheduler.subscribe("test", ["bad_register"], 1, lambda _: None)
+
+
+async def test_scheduler_scan_fails(
+    scheduler: ScanScheduler,
+    modbus: Modbus,
+    mocker: MockerFixture,
+):
+    mocker.patch.object(modbus, "scan", side_effect=ConnectionError)
+
+    received: list[SnapshotView | None] = []
+    scheduler.subscribe("test", ["door_locked"], 1, received.append)
+    await asyncio.sleep(0.02)
+
+    assert received == [None]
+    assert scheduler.stats["failures"] == 1
+
+
+async def test_scheduler_busy_subscriber(scheduler: ScanScheduler):
+    calls: list[SnapshotView | None] = []
+
+    async def callback(registers: SnapshotView | None):
+        calls.append(registers)
+        await asyncio.sleep(0.12)
+
+    scheduler.subscribe("test", ["door_locked"], 0.05, callback)
+    await asyncio.sleep(0.25)
+
+    # Scans that happen while the callback is running are not delivered.
+    assert scheduler.stats["skipped"] >= 1
+    assert len(calls) == scheduler.stats["deliveries"] < scheduler.stats["scans"]
+
+
+async def test_scheduler_unsubscribe(scheduler: ScanScheduler):
+    received: list[SnapshotView | None] = []
+
+    subscription = scheduler.subscribe("test", ["door_locked"], 0.05, received.append)
+    await asyncio.sleep(0.02)
+    await scheduler.unsubscribe(subscription)
+    await asyncio.sleep(0.1)
+
+    assert len(received) == 1
+    assert scheduler.subscriptions == []
+
+
+async def test_scheduler_modules(actor: ECPActor, mocker: MockerFixture):
+    scheduler = actor.plc.scheduler
+    execute_plan = mocker.spy(actor.plc.modbus, "execute_plan")
+
+    # There is no HVAC server in the tests.
+    mocker.patch.object(actor.plc.hvac_scheduler, "start")
+
+    await actor.plc.start_modules()
+    await asyncio.sleep(0.1)
+
+    names = {subscription.name for subscription in scheduler.subscriptions}
+    assert names == {"dome", "safety", "lights"}
+
+    # A single scan updates all the modules.
+    assert execute_plan.call_count == 1
+    assert actor.plc.dome.status is not None
+    assert actor.plc.dome.status & DomeStatus.CLOSED
+    assert actor.plc.lights.status is not None
+
+
+async def test_scheduler_poll_tiers(modbus: Modbus, mocker: MockerFixture):
+    for register in modbus.values():
+        register.max_age = None
+
+    modbus["door_locked"].max_age = 0.2
+    modbus["local"].max_age = 0.2
+    modbus["drive_enabled"].max_age = 0.4
+
+    scheduler = ScanScheduler(modbus, tick=0.05)
+    assert scheduler.polled == {"door_locked": 0.2, "local": 0.2, "drive_enabled": 0.4}
+
+    scan = mocker.spy(modbus, "scan")
+
+    scheduler.start()
+
+    ages: list[float] = []
+    for _ in range(14):
+        await asyncio.sleep(0.05)
+        ages.append(modbus.get_age("door_locked"))
+
+    await scheduler.stop()
+
+    # Values are refreshed before they expire.
+    assert max(ages) < 0.2
+
+    # Registers due at the same time share a scan, and the slow register is
+    # always read along with the fast ones.
+    names = [call.args[0].names for call in scan.call_args_list]
+    assert all({"door_locked", "local"} <= plan_names for plan_names in names)
+    assert 4 <= len(names) <= 7
+
+
+async def test_scheduler_poll_tiers_config(modbus: Modbus):
+    scheduler = ScanScheduler(modbus)
+
+    assert scheduler.tick == 0.1
+    assert scheduler.polled["e_status"] == modbus.poll_tiers["fast"]
+    assert "door_locked" not in scheduler.polled
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_snapshot.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy
+import pytest
+from pytest_mock import MockerFixture
+
+from lvmecp.modbus import ModbusRegister
+from lvmecp.planner import compile_read_plan
+from lvmecp.snapshot import RegisterSnapshot, SnapshotView
+
+
+if TYPE_CHECKING:
+    from pymodbus.datastore import ModbusSlaveContext
+
+    from lvmecp.modbus import Modbus
+    from lvmecp.simulator import Simulator
+
+
+async def test_snapshot_read_all(modbus: Modbus):
+    snapshot = await modbus.read_all(use_cache=False)
+
+    assert isinstance(snapshot, RegisterSnapshot)
+    assert set(snapshot) == set(modbus)
+    assert snapshot["door_locked"] is True
+    assert modbus.snapshot is snapshot
+
+
+async def test_snapshot_images(modbus: Modbus):
+    snapshot = await modbus.read_all(use_cache=False)
+
+    assert snapshot.images["coil"].dtype == numpy.uint8
+    assert snapshot.images["holding_register"].dtype == numpy.uint16
+
+    # Coils are packed eight per byte.
+    n_coils = modbus.plan.sizes["coil"]
+    assert snapshot.images["coil"].size == (n_coils + 7) // 8
+
+    with pytest.raises(ValueError):
+        snapshot.images["coil"][0] = 0
+
+
+async def test_snapshot_raw_is_view(modbus: Modbus):
+    snapshot = await modbus.read_all(use_cache=False)
+
+    raw = snapshot.raw("door_locked")
+    assert raw.dtype == numpy.bool_
+    assert raw.tolist() == [True]
+
+    words = snapshot.raw("dome_counter")
+    assert words.base is snapshot.images["holding_register"]
+
+
+async def test_snapshot_bit_index(modbus: Modbus):
+    snapshot = await modbus.read_all(use_cache=False)
+
+    mode, byte, mask = modbus.plan.bit_index["door_locked"]
+    _, position = modbus.plan.index["door_locked"]
+
+    assert mode == "coil"
+    assert byte == position // 8
+    assert mask == 1 << (position % 8)
+    assert bool(snapshot.images["coil"][byte] & mask) is snapshot["door_locked"]
+
+
+async def test_snapshot_matches_simulator(modbus: Modbus, simulator: Simulator):
+    snapshot = await modbus.read_all(use_cache=False)
+    plan = modbus.plan
+
+    for block, offset in zip(plan.blocks, plan.offsets):
+        if not block.is_bits:
+            continue
+
+        expected = simulator.get_packed_bits(block.mode, block.address, block.count)
+        start = offset // 8
+
+        image = snapshot.images[block.mode]
+        assert image[start : start + len(expected)].tobytes() == expected
+
+
+async def test_snapshot_packed_blocks(modbus: Modbus):
+    registers = [
+        ModbusRegister(modbus, "bit_a", 3, mode="coil"),
+        ModbusRegister(modbus, "bits_b", 5, mode="coil", count=10),
+        ModbusRegister(modbus, "bit_c", 500, mode="coil"),
+    ]
+    plan = compile_read_plan(registers, gap_tolerance=0)
+    assert plan.n_requests == 3
+
+    rng = numpy.random.default_rng(0)
+    bits = [rng.integers(0, 2, block.count).astype(bool) for block in plan.blocks]
+
+    # Blocks are aligned to a byte boundary in the packed image.
+    assert all(offset % 8 == 0 for offset in plan.offsets)
+
+    from_bools = RegisterSnapshot.from_blocks(plan, [list(bb) for bb in bits])
+    packed = [numpy.packbits(bb, bitorder="little").tobytes() for bb in bits]
+    from_packed = RegisterSnapshot.from_blocks(plan, packed)
+
+    numpy.testing.assert_array_equal(
+        from_bools.images["coil"], from_packed.images["coil"]
+    )
+
+    for snapshot in (from_bools, from_packed):
+        assert snapshot["bit_a"] is bool(bits[0][0])
+        assert snapshot["bits_b"] == bits[1].tolist()
+        assert snapshot["bit_c"] is bool(bits[2][0])
+        assert snapshot.raw("bits_b").tolist() == bits[1].tolist()
+
+
+async def test_snapshot_view(modbus: Modbus):
+    registers = await modbus.read_group("dome", use_cache=False)
+
+    assert isinstance(registers, SnapshotView)
+    assert list(registers) == modbus.groups["dome"]
+    assert registers.drive_enabled == registers["drive_enabled"]
+
+    with pytest.raises(KeyError):
+        registers["door_locked"]
+
+    with pytest.raises(AttributeError):
+        registers.door_locked
+
+
+async def test_snapshot_view_unknown(modbus: Modbus):
+    snapshot = await modbus.read_all(use_cache=False)
+
+    with pytest.raises(KeyError):
+        snapshot.view(["door_locked", "bad_register"])
+
+
+async def test_snapshot_group(modbus: Modbus):
+    snapshot = await modbus.read_all(use_cache=False)
+
+    assert set(snapshot.group("lights")) == set(modbus.groups["lights"])
+
+
+async def test_snapshot_overrides(modbus: Modbus, mocker: MockerFixture):
+    mocker.patch.dict(modbus.overrides, {"door_locked": False})
+
+    snapshot = await modbus.read_all(use_cache=False)
+
+    assert snapshot["door_locked"] is False
+    assert snapshot.raw("door_locked").tolist() == [True]
+
+
+async def test_snapshot_decoder(context: ModbusSlaveContext, modbus: Modbus):
+    context.setValues(3, 99, [4000, 16000])
+
+    register = ModbusRegister(
+        modbus,
+        name="test_register",
+        address=99,
+        mode="holding_register",
+        count=2,
+        decoder="float_32bit",
+    )
+
+    snapshot = await modbus.scan(compile_read_plan([register]))
+
+    assert snapshot["test_register"] == 0.250
+    assert snapshot.raw("test_register").tolist() == [4000, 16000]
+
+
+async def test_snapshot_cache(modbus: Modbus, mocker: MockerFixture):
+    snapshot = await modbus.read_all(use_cache=False)
+
+    read_block = mocker.spy(modbus, "_read_block")
+
+    assert (await modbus.read_all()) is snapshot
+    assert (await modbus.read_group("dome")).snapshot is snapshot
+    assert (await modbus.read_register("door_locked")) is True
+
+    read_block.assert_not_called()
+
+
+async def test_snapshot_cache_invalidated_by_write(modbus: Modbus):
+    snapshot = await modbus.read_all(use_cache=False)
+
+    await modbus.write_register("drive_enabled", True)
+
+    assert modbus.get_cached(["drive_enabled"]) is None
+    assert (await modbus.read_all()) is not snapshot
+
+
+async def test_snapshot_cache_expires(modbus: Modbus, mocker: MockerFixture):
+    snapshot = await modbus.read_all(use_cache=False)
+
+    mocker.patch.object(modbus, "cache_timeout", 0)
+
+    assert modbus.get_cached(["door_locked"]) is None
+    assert (await modbus.read_all()) is not snapshot
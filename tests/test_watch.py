@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# @Author: José Sánchez-Gallego (gallegoj@uw.edu)
+# @Date: 2026-10-18
+# @Filename: test_watch.py
+# @License: BSD 3-clause (http://www.opensource.org/licenses/BSD-3-Clause)
+
+from __future__ import annotations
+
+import asyncio
+
+from typing import TYPE_CHECKING
+
+import pytest
+from pytest_mock import MockerFixture
+
+from lvmecp.scheduler import ScanScheduler
+from lvmecp.watch import RegisterChange
+
+
+if TYPE_CHECKING:
+    from pymodbus.datastore import ModbusSlaveContext
+
+    from lvmecp.actor import ECPActor
+    from lvmecp.modbus import Modbus
+
+
+async def test_watch(modbus: Modbus, context: ModbusSlaveContext):
+    await modbus.read_all(use_cache=False)
+
+    async with modbus.watch(["drive_enabled", "dome_counter"]) as watch:
+        assert len(modbus._watches) == 1
+        assert watch.get("drive_enabled") is False
+
+        context.setValues(1, modbus["drive_enabled"].address, [1])
+        context.setValues(3, modbus["dome_counter"].address, [42])
+
+        # Scans of other registers do not produce changes.
+        await modbus.read_register("door_locked", use_cache=False)
+        assert watch._queue.empty()
+
+        await modbus.read_all(use_cache=False)
+
+        changes = [await anext(watch), await anext(watch)]
+        assert {change.name for change in changes} == {"drive_enabled", "dome_counter"}
+
+        drive_enabled = [ch for ch in changes if ch.name == "drive_enabled"][0]
+        assert isinstance(drive_enabled, RegisterChange)
+        assert drive_enabled.old is False
+        assert drive_enabled.new is True
+
+        # A scan without changes does not produce events.
+        await modbus.read_all(use_cache=False)
+        assert watch._queue.empty()
+
+    assert len(modbus._watches) == 0
+
+    # The iterator ends once the watch is closed and the queue is empty.
+    assert [change async for change in watch] == []
+
+
+async def test_watch_predicate(modbus: Modbus, context: ModbusSlaveContext):
+    address = modbus["dome_counter"].address
+
+    async with modbus.watch(
+        ["dome_counter"],
+        predicate=lambda change: change.new > 10,
+    ) as watch:
+        for value in [5, 20]:
+            context.setValues(3, address, [value])
+            await modbus.read_all(use_cache=False)
+
+        assert watch._queue.qsize() == 1
+        assert (await anext(watch)).new == 20
+
+
+async def test_watch_unknown_register(modbus: Modbus):
+    with pytest.raises(ValueError):
+        modbus.watch(["bad_register"])
+
+
+async def test_watch_interval_no_scheduler(modbus: Modbus):
+    with pytest.raises(ValueError):
+        modbus.watch(["drive_enabled"], interval=0.1)
+
+
+async def test_watch_interval(modbus: Modbus, context: ModbusSlaveContext):
+    scheduler = ScanScheduler(modbus, tick=0.05)
+    assert modbus.scheduler is scheduler
+
+    async with modbus.watch(["drive_enabled"], interval=0.05) as watch:
+        assert len(scheduler.subscriptions) == 1
+
+        # The first scan reports the value, since it was not cached.
+        change = await asyncio.wait_for(anext(watch), 1)
+        assert change.old is None and change.new is False
+
+        context.setValues(1, modbus["drive_enabled"].address, [1])
+        change = await asyncio.wait_for(anext(watch), 1)
+        assert change.new is True
+
+    assert len(scheduler.subscriptions) == 0
+
+    await scheduler.stop()
+
+
+async def test_wait_for_cached(modbus: Modbus, mocker: MockerFixture):
+    await modbus.read_all(use_cache=False)
+
+    execute_plan = mocker.spy(modbus, "execute_plan")
+    await modbus.wait_for("door_locked", True, timeout=0.1)
+
+    execute_plan.assert_not_called()
+    assert len(modbus._watches) == 0
+
+
+async def test_wait_for(modbus: Modbus, context: ModbusSlaveContext):
+    await modbus.read_all(use_cache=False)
+
+    task = asyncio.create_task(modbus.wait_for("drive_enabled", True, timeout=1))
+    await asyncio.sleep(0.01)
+
+    await modbus.read_all(use_cache=False)
+    assert not task.done()
+
+    context.setValues(1, modbus["drive_enabled"].address, [1])
+    await modbus.read_all(use_cache=False)
+
+    await asyncio.wait_for(task, 0.1)
+    assert len(modbus._watches) == 0
+
+
+async def test_wait_for_timeout(modbus: Modbus):
+    with pytest.raises(TimeoutError):
+        await modbus.wait_for("drive_enabled", True, timeout=0.05)
+
+    assert len(modbus._watches) == 0
+
+
+async def test_watch_close_wakes_consumer(modbus: Modbus, context: ModbusSlaveContext):
+    await modbus.read_all(use_cache=False)
+
+    watch = modbus.watch(["dome_counter"])
+
+    async def consume():
+        return [change.new async for change in watch]
+
+    task = asyncio.create_task(consume())
+
+    context.setValues(3, modbus["dome_counter"].address, [5])
+    await modbus.read_all(use_cache=False)
+    await asyncio.sleep(0.01)
+
+    # The consumer is blocked waiting for the next change.
+    assert not task.done()
+
+    await watch.close()
+    assert await asyncio.wait_for(task, 0.1) == [5]
+
+
+async def test_wait_for_closed(modbus: Modbus):
+    await modbus.read_all(use_cache=False)
+
+    task = asyncio.create_task(modbus.wait_for("drive_enabled", True))
+    await asyncio.sleep(0.01)
+
+    await modbus.close()
+
+    with pytest.raises(ConnectionError):
+        await asyncio.wait_for(task, 0.1)
+
+
+async def test_command_emergency_stop(actor: ECPActor):
+    cmd = await actor.invoke_mock_command("emergency-stop")
+    await cmd
+
+    assert cmd.status.did_succeed
+    assert actor.plc.modbus.get_cached(["e_status"]) is not None
+    assert actor.plc.modbus.get_cached(["e_status"])["e_status"] is True